@@ -0,0 +1,63 @@
+"""Scaling benchmark of the cost matrix functions.
+
+Run: python -m benchmarks.bench_cost_matrix
+"""
+import time
+
+import numpy as np
+
+from object_tracking_cli.object_tracking.cost_matrix import AVAILABLE_COST_MATRIX_FUNCS
+from object_tracking_cli.object_tracking.utils.bbox import iou
+
+SIZES = [10, 100, 500, 1000, 2000]
+LOOP_MAX_SIZE = 500  # the reference python loop gets too slow above that
+
+
+def make_bboxes(rng, n):
+    xy = rng.integers(0, 1920, (n, 2))
+    wh = rng.integers(10, 200, (n, 2))
+    return [
+        (int(x), int(y), int(x + w), int(y + h), 0, 0.9)
+        for (x, y), (w, h) in zip(xy, wh)
+    ]
+
+
+def loop_iou_cost_matrix(bboxes, registered_bboxes):
+    cost_matrix = np.zeros((len(registered_bboxes), len(bboxes)))
+    for i, bbox1 in enumerate(registered_bboxes):
+        for j, bbox2 in enumerate(bboxes):
+            cost_matrix[i, j] = 1.0 - iou(bbox1, bbox2)
+    return cost_matrix
+
+
+def timeit(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    funcs = dict(AVAILABLE_COST_MATRIX_FUNCS)
+    print(f"{'size':>10} " + " ".join(f"{name:>22}" for name in funcs) + " loop_iou")
+    for size in SIZES:
+        bboxes = make_bboxes(rng, size)
+        registered_bboxes = make_bboxes(rng, size)
+        timings = [timeit(func, bboxes, registered_bboxes) for func in funcs.values()]
+        if size <= LOOP_MAX_SIZE:
+            loop_time = timeit(loop_iou_cost_matrix, bboxes, registered_bboxes, 1)
+            loop = f"{loop_time * 1e3:.2f}ms"
+        else:
+            loop = "-"
+        print(
+            f"{f'{size}x{size}':>10} "
+            + " ".join(f"{t * 1e3:>20.2f}ms" for t in timings)
+            + f" {loop}"
+        )
+
+
+if __name__ == "__main__":
+    main()
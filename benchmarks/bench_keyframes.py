@@ -0,0 +1,79 @@
+"""Accuracy and cost of keyframe detection scheduling on a synthetic scene.
+
+Between keyframes the trackers only advance their motion models, so every
+interval divides the detector calls. This reports the CLEAR MOT metrics
+against the scene's ground truth for every interval and motion model:
+
+    python -m benchmarks.bench_keyframes --intervals 1,2,4,8
+"""
+from functools import partial
+
+import click
+
+from object_tracking_cli.keyframes import KeyframeScheduler
+from object_tracking_cli.object_tracking.assignment import hungarian_assignment
+from object_tracking_cli.object_tracking.cost_matrix import iou_cost_matrix
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+from object_tracking_cli.object_tracking.motion_model import AVAILABLE_MOTION_MODELS
+
+from .metrics import ClearMOT
+from .scene import SyntheticScene
+
+DEFAULT_INTERVALS = (1, 2, 4, 8)
+
+
+def scene_frames(n_objects, n_frames, seed=0):
+    """Detections and ground truth of each frame."""
+    scene = SyntheticScene(n_objects, seed=seed)
+    return [
+        (detections, *scene.ground_truth()) for detections, _ in scene.frames(n_frames)
+    ]
+
+
+def run(intervals, n_objects, n_frames, max_missing_frames=5):
+    frames = scene_frames(n_objects, n_frames)
+    results = {}
+    for model_name, model_cls in AVAILABLE_MOTION_MODELS.items():
+        for interval in intervals:
+            tracker = MultiObjectTracker(
+                assignment_func=partial(hungarian_assignment, th=0.9),
+                cost_matrix_func=iou_cost_matrix,
+                motion_model_cls=model_cls,
+                max_missing_frames=max_missing_frames,
+            )
+            scheduler = KeyframeScheduler(interval=interval)
+            metrics = ClearMOT()
+            for detections, gt_boxes, gt_ids in frames:
+                if scheduler.is_keyframe(None, {model_name: tracker}):
+                    tracker.update(detections)
+                else:
+                    tracker.predict()
+                metrics.update_from_tracker(gt_boxes, gt_ids, tracker)
+            results[f"{model_name}/interval={interval}"] = {
+                "detection_rate": scheduler.summary()["detection_rate"],
+                **metrics.summary(),
+            }
+    return results
+
+
+@click.command()
+@click.option("--intervals", default=",".join(map(str, DEFAULT_INTERVALS)))
+@click.option("--objects", "n_objects", default=50, show_default=True)
+@click.option("--frames", "n_frames", default=300, show_default=True)
+def main(intervals, n_objects, n_frames):
+    intervals = [int(interval) for interval in intervals.split(",")]
+    results = run(intervals, n_objects, n_frames)
+    click.echo(
+        f"{'':<50} {'detect':>7} {'MOTA':>7} {'MOTP':>7} {'recall':>7} "
+        f"{'prec.':>7} {'IDsw':>6}"
+    )
+    for key, metrics in results.items():
+        click.echo(
+            f"{key:<50} {metrics['detection_rate']:7.2f} {metrics['mota']:7.3f} "
+            f"{metrics['motp']:7.3f} {metrics['recall']:7.3f} "
+            f"{metrics['precision']:7.3f} {metrics['id_switches']:6d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark of one predict + update step of the Kalman motion models.
+
+Run: python -m benchmarks.bench_motion_model
+"""
+import time
+
+import numpy as np
+
+from object_tracking_cli.object_tracking.motion_model import (
+    BatchedKFCentroidVelocityModel,
+    KFCentroidVelocityModel,
+)
+
+NO_TRACKS = [1, 100, 5000]
+NO_STEPS = 10
+
+
+def make_bboxes(rng, n):
+    xy = rng.integers(0, 1920, (n, 2))
+    wh = rng.integers(10, 200, (n, 2))
+    return [
+        (int(x), int(y), int(x + w), int(y + h), 0, 0.9)
+        for (x, y), (w, h) in zip(xy, wh)
+    ]
+
+
+def bench_per_track(bboxes, measurements):
+    models = [KFCentroidVelocityModel(bbox) for bbox in bboxes]
+    start = time.perf_counter()
+    for step_measurements in measurements:
+        for model in models:
+            model.predict_bbox()
+        for model, measurement in zip(models, step_measurements):
+            model.update_bbox(measurement)
+    return (time.perf_counter() - start) / len(measurements)
+
+
+def bench_batched(bboxes, measurements):
+    bank = BatchedKFCentroidVelocityModel()
+    for bbox in bboxes:
+        bank.append(bbox)
+    indices = np.arange(len(bboxes))
+    start = time.perf_counter()
+    for step_measurements in measurements:
+        bank.predict()
+        bank.update(indices, step_measurements)
+    return (time.perf_counter() - start) / len(measurements)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'tracks':>8} {'per-track':>12} {'batched':>12} {'speedup':>8}")
+    for no_tracks in NO_TRACKS:
+        bboxes = make_bboxes(rng, no_tracks)
+        measurements = [make_bboxes(rng, no_tracks) for _ in range(NO_STEPS)]
+        per_track = bench_per_track(bboxes, measurements)
+        batched = bench_batched(bboxes, measurements)
+        print(
+            f"{no_tracks:>8} {per_track * 1e3:>10.3f}ms {batched * 1e3:>10.3f}ms "
+            f"{per_track / batched:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Startup time of the CLI, each measured in a fresh interpreter.
+
+`help` is `object_tracking --help`, `import` imports the processing pipeline.
+With `--detector` it also times a fresh process until its first detection,
+loading the configured detector itself and then through a warm detector
+server:
+
+    python -m benchmarks.bench_startup --detector
+"""
+import statistics
+import subprocess
+import sys
+import time
+from multiprocessing.connection import Client
+
+import click
+
+from object_tracking_cli.cli import DEFAULT_CONFIG_FILE
+from object_tracking_cli.object_detection.server import load_authkey, parse_address
+
+HELP = ["-c", "from object_tracking_cli.cli import cli; cli()", "--help"]
+IMPORT = ["-c", "import object_tracking_cli.processing"]
+FIRST_DETECTION = [
+    "-c",
+    """
+import sys
+import numpy as np
+from object_tracking_cli.cli import load_config
+from object_tracking_cli.object_detection.detection import make_object_detector
+detection_config = load_config(sys.argv[1])["detection"]
+if len(sys.argv) > 2:
+    detection_config["server"] = sys.argv[2]
+make_object_detector(detection_config).predict(np.zeros((480, 640, 3), np.uint8))
+""",
+]
+
+
+def time_command(args, repeat: int) -> float:
+    """Median wall time of `python <args>` in seconds."""
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times)
+
+
+def wait_for_server(address: str, timeout: float = 300.0) -> None:
+    """Return once the server accepts connections, its detector loaded."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            Client(parse_address(address), authkey=load_authkey()).close()
+            return
+        except ConnectionRefusedError:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def run(
+    repeat: int = 3,
+    detector: bool = False,
+    config=DEFAULT_CONFIG_FILE,
+    address="localhost:7356",
+):
+    results = {
+        "help": time_command(HELP, repeat),
+        "import": time_command(IMPORT, repeat),
+    }
+    if not detector:
+        return results
+    config = str(config)
+    results["detector_local"] = time_command([*FIRST_DETECTION, config], repeat)
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "object_tracking_cli.object_detection.server",
+            "--address",
+            address,
+            "--config",
+            config,
+        ]
+    )
+    try:
+        wait_for_server(address)
+        results["detector_server"] = time_command(
+            [*FIRST_DETECTION, config, address], repeat
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+@click.command()
+@click.option("--repeat", default=3, show_default=True)
+@click.option("--detector", is_flag=True, help="Also time the first detection.")
+@click.option(
+    "--config",
+    default=str(DEFAULT_CONFIG_FILE),
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+)
+def main(repeat, detector, config):
+    for name, seconds in run(repeat, detector, config).items():
+        click.echo(f"{name:<16} {seconds * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
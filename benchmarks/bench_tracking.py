@@ -0,0 +1,253 @@
+"""Benchmark of the tracking core on synthetic crowded scenes.
+
+Times every registered cost matrix function, assignment function and motion
+model on its own and composed in MultiObjectTracker.update, across object
+counts. Results are stored as JSON so they can be compared to a baseline:
+
+    python -m benchmarks.bench_tracking --output benchmarks/baselines/tracking.json
+    python -m benchmarks.bench_tracking --compare benchmarks/baselines/tracking.json
+"""
+import itertools
+import json
+import pathlib
+import platform
+import sys
+import time
+from functools import partial, wraps
+
+import click
+import numpy as np
+
+from object_tracking_cli.object_tracking.assignment import AVAILABLE_ASSIGNMENT_FUNCS
+from object_tracking_cli.object_tracking.cost_matrix import (
+    AVAILABLE_COST_MATRIX_FUNCS,
+    iou_cost_matrix,
+)
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+from object_tracking_cli.object_tracking.motion_model import (
+    AVAILABLE_MOTION_MODELS,
+    is_motion_model_bank,
+)
+from object_tracking_cli.object_tracking.utils.kernels import BACKEND
+
+from .scene import SyntheticScene
+
+ASSIGNMENT_PARAMS = {
+    "hungarian_assignment": {"th": 0.9},
+    "jv_assignment": {"th": 0.9},
+}
+DEFAULT_COUNTS = (10, 100, 500)
+
+
+def make_assignment_func(name):
+    return partial(AVAILABLE_ASSIGNMENT_FUNCS[name], **ASSIGNMENT_PARAMS.get(name, {}))
+
+
+def scene_frames(n_objects, n_frames, seed=0):
+    scene = SyntheticScene(n_objects, seed=seed)
+    return [detections for detections, _ in scene.frames(n_frames)]
+
+
+def best_of(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_cost_matrices(frames):
+    bboxes, registered_bboxes = frames[-1], frames[-2]
+    return {
+        name: best_of(lambda: func(bboxes, registered_bboxes))
+        for name, func in AVAILABLE_COST_MATRIX_FUNCS.items()
+    }
+
+
+def bench_assignments(frames):
+    cost_matrix = iou_cost_matrix(frames[-1], frames[-2])
+    return {
+        name: best_of(lambda: make_assignment_func(name)(cost_matrix))
+        for name in AVAILABLE_ASSIGNMENT_FUNCS
+    }
+
+
+def bench_motion_models(frames):
+    """Time of one predict + update step of all the tracks."""
+    bboxes, measurements = frames[0], frames[1][: len(frames[0])]
+    results = {}
+    for name, model_cls in AVAILABLE_MOTION_MODELS.items():
+        if is_motion_model_bank(model_cls):
+            bank = model_cls()
+            for bbox in bboxes:
+                bank.append(bbox)
+            indices = np.arange(len(measurements))
+
+            def step():
+                bank.predict()
+                bank.update(indices, measurements)
+
+        else:
+            models = [model_cls(bbox) for bbox in bboxes]
+
+            def step():
+                for model in models:
+                    model.predict_bbox()
+                for model, measurement in zip(models, measurements):
+                    model.update_bbox(measurement)
+
+        results[name] = best_of(step)
+    return results
+
+
+def bench_trackers(frames):
+    """Mean time of MultiObjectTracker.update per frame for every composition."""
+    results = {}
+    for cost_name, assignment_name, model_name in itertools.product(
+        AVAILABLE_COST_MATRIX_FUNCS, AVAILABLE_ASSIGNMENT_FUNCS, AVAILABLE_MOTION_MODELS
+    ):
+        tracker = MultiObjectTracker(
+            assignment_func=make_assignment_func(assignment_name),
+            cost_matrix_func=AVAILABLE_COST_MATRIX_FUNCS[cost_name],
+            motion_model_cls=AVAILABLE_MOTION_MODELS[model_name],
+            max_missing_frames=5,
+        )
+        tracker.update(frames[0])
+        start = time.perf_counter()
+        for bboxes in frames[1:]:
+            tracker.update(bboxes)
+        results[f"{cost_name}+{assignment_name}+{model_name}"] = (
+            time.perf_counter() - start
+        ) / (len(frames) - 1)
+    return results
+
+
+def bench_association(frames):
+    """Mean time per frame of the assignments made in MultiObjectTracker.update.
+
+    Consecutive frames are close, which is where warm starts can help.
+    """
+    variants = {
+        name: make_assignment_func(name)
+        for name in ("hungarian_assignment", "jv_assignment")
+    }
+    variants["jv_assignment+warm_start"] = partial(
+        make_assignment_func("jv_assignment"), warm_start=True
+    )
+    results = {}
+    for name, assignment_func in variants.items():
+        elapsed = 0.0
+
+        @wraps(assignment_func)
+        def timed(cost_matrix, _func=assignment_func, **kwargs):
+            nonlocal elapsed
+            start = time.perf_counter()
+            assignment = _func(cost_matrix, **kwargs)
+            elapsed += time.perf_counter() - start
+            return assignment
+
+        tracker = MultiObjectTracker(
+            assignment_func=timed,
+            cost_matrix_func=iou_cost_matrix,
+            motion_model_cls=AVAILABLE_MOTION_MODELS["BatchedKFCentroidVelocityModel"],
+            max_missing_frames=5,
+        )
+        tracker.update(frames[0])
+        elapsed = 0.0
+        for bboxes in frames[1:]:
+            tracker.update(bboxes)
+        results[name] = elapsed / (len(frames) - 1)
+    return results
+
+
+def run(counts, n_frames):
+    results = {}
+    for n_objects in counts:
+        frames = scene_frames(n_objects, n_frames)
+        for group, bench in (
+            ("cost_matrix", bench_cost_matrices),
+            ("assignment", bench_assignments),
+            ("motion_model", bench_motion_models),
+            ("tracker_update", bench_trackers),
+            ("association", bench_association),
+        ):
+            for name, seconds in bench(frames).items():
+                results[f"{group}/{name}/n={n_objects}"] = seconds
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, seconds in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        ratio = seconds / reference
+        if ratio > tolerance:
+            regressions.append((key, reference, seconds, ratio))
+    return regressions
+
+
+@click.command()
+@click.option("--counts", default=",".join(map(str, DEFAULT_COUNTS)))
+@click.option("--frames", "n_frames", default=30, show_default=True)
+@click.option(
+    "--output", type=click.Path(dir_okay=False), help="Save the results as JSON."
+)
+@click.option(
+    "--compare",
+    "baseline_path",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Baseline JSON to compare against. Exit with 1 on regressions.",
+)
+@click.option(
+    "--tolerance",
+    default=1.5,
+    show_default=True,
+    help="Allowed slowdown ratio against the baseline.",
+)
+def main(counts, n_frames, output, baseline_path, tolerance):
+    counts = [int(count) for count in counts.split(",")]
+    click.echo(f"kernels: {BACKEND}")
+    results = run(counts, n_frames)
+    for key, seconds in results.items():
+        click.echo(f"{key:<90} {seconds * 1e3:10.3f}ms")
+    if output:
+        pathlib.Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "python": platform.python_version(),
+                        "numpy": np.__version__,
+                        "machine": platform.machine(),
+                        "frames": n_frames,
+                        "kernels": BACKEND,
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if baseline_path:
+        with open(baseline_path, "r") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, tolerance)
+        unchecked = [key for key in results if key not in baseline]
+        if unchecked:
+            click.echo(
+                f"{len(unchecked)} results are not in the baseline and were not "
+                f"checked, e.g. {unchecked[0]}. Update it with --output."
+            )
+        for key, reference, seconds, ratio in regressions:
+            click.echo(
+                f"REGRESSION {key}: {reference * 1e3:.3f}ms -> "
+                f"{seconds * 1e3:.3f}ms ({ratio:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+"""CLEAR MOT metrics of a tracker against the ground truth of a synthetic scene."""
+from object_tracking_cli.object_tracking.metrics import ClearMOT  # noqa: F401
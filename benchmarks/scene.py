@@ -0,0 +1,108 @@
+"""Synthetic crowded scenes for benchmarking the tracking core."""
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from object_tracking_cli.object_detection.detection import (
+    Bbox_xyxy_with_class_and_score,
+)
+
+
+class SyntheticScene:
+    """Boxes moving at constant velocity, bouncing off the frame borders.
+
+    Every frame each object dies with probability `death_rate` and on average
+    `death_rate * n_objects` objects are born, so the population stays around
+    `n_objects`. A living object is not detected (occluded) with probability
+    `occlusion_rate`, and detected boxes get gaussian noise of `noise_std` px.
+    """
+
+    def __init__(
+        self,
+        n_objects: int,
+        width: int = 1920,
+        height: int = 1080,
+        speed: Tuple[float, float] = (1.0, 5.0),
+        size: Tuple[int, int] = (20, 80),
+        death_rate: float = 0.01,
+        occlusion_rate: float = 0.05,
+        noise_std: float = 1.0,
+        n_classes: int = 3,
+        seed: int = 0,
+    ) -> None:
+        self.n_objects = n_objects
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.size = size
+        self.death_rate = death_rate
+        self.occlusion_rate = occlusion_rate
+        self.noise_std = noise_std
+        self.n_classes = n_classes
+        self.rng = np.random.default_rng(seed)
+        self._next_id = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.sizes = np.zeros((0, 2))
+        self.classes = np.zeros(0, dtype=np.int64)
+        self._spawn(n_objects)
+
+    def _spawn(self, n: int):
+        sizes = self.rng.uniform(*self.size, (n, 2))
+        positions = self.rng.uniform(0, 1, (n, 2)) * (
+            np.array([self.width, self.height]) - sizes
+        )
+        angles = self.rng.uniform(0, 2 * np.pi, n)
+        speeds = self.rng.uniform(*self.speed, n)
+        velocities = np.column_stack((np.cos(angles), np.sin(angles))) * speeds[:, None]
+        self.ids = np.concatenate((self.ids, np.arange(n) + self._next_id))
+        self._next_id += n
+        self.positions = np.concatenate((self.positions, positions))
+        self.velocities = np.concatenate((self.velocities, velocities))
+        self.sizes = np.concatenate((self.sizes, sizes))
+        self.classes = np.concatenate(
+            (self.classes, self.rng.integers(0, self.n_classes, n))
+        )
+
+    def _step(self):
+        alive = self.rng.random(len(self.ids)) >= self.death_rate
+        self.ids = self.ids[alive]
+        self.positions = self.positions[alive]
+        self.velocities = self.velocities[alive]
+        self.sizes = self.sizes[alive]
+        self.classes = self.classes[alive]
+        self._spawn(self.rng.poisson(self.death_rate * self.n_objects))
+
+        self.positions += self.velocities
+        limits = np.array([self.width, self.height]) - self.sizes
+        out = (self.positions < 0) | (self.positions > limits)
+        self.velocities[out] *= -1
+        self.positions = np.clip(self.positions, 0, limits)
+
+    def ground_truth(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Noise-free (N, 4) xyxy boxes of all the living objects and their ids."""
+        return np.hstack((self.positions, self.positions + self.sizes)), self.ids
+
+    def frames(
+        self, n_frames: int
+    ) -> Iterator[Tuple[List[Bbox_xyxy_with_class_and_score], List[int]]]:
+        """Yield the detections of each frame with their ground truth ids."""
+        for _ in range(n_frames):
+            self._step()
+            detected = self.rng.random(len(self.ids)) >= self.occlusion_rate
+            order = self.rng.permutation(np.flatnonzero(detected))
+            boxes = np.hstack(
+                (self.positions[order], self.positions[order] + self.sizes[order])
+            )
+            boxes += self.rng.normal(0, self.noise_std, boxes.shape)
+            scores = self.rng.uniform(0.3, 1.0, len(order))
+            detections = [
+                (x1, y1, x2, y2, class_, score)
+                for (x1, y1, x2, y2), class_, score in zip(
+                    boxes.astype(int).tolist(),
+                    self.classes[order].tolist(),
+                    scores.tolist(),
+                )
+            ]
+            yield detections, self.ids[order].tolist()
@@ -4,8 +4,6 @@ import pathlib
 import click
 import yaml
 
-from .processing import process_video
-
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
@@ -20,11 +18,12 @@ def load_config(path=DEFAULT_CONFIG_FILE):
 
 @click.command()
 @click.argument(
-    "video_file",
+    "video_files",
+    nargs=-1,
     type=click.Path(
         exists=True,
         file_okay=True,
-        dir_okay=False,
+        dir_okay=True,
         readable=True,
     ),
     required=True,
@@ -34,9 +33,65 @@ def load_config(path=DEFAULT_CONFIG_FILE):
     type=click.Path(exists=True, dir_okay=False, readable=True),
     help="Path to YAML configuration file.",
 )
-def cli(video_file, config):
+@click.option(
+    "--headless",
+    is_flag=True,
+    help="Process as fast as possible without a display and report throughput.",
+)
+@click.option(
+    "--output",
+    type=click.Path(writable=True),
+    help=(
+        "Write the side-by-side video to this file, or to this directory when "
+        "several videos are given."
+    ),
+)
+@click.option(
+    "--detection-cache",
+    type=click.Path(file_okay=False, writable=True),
+    help="Directory where detections are cached between runs.",
+)
+@click.option(
+    "--frame-cache",
+    type=click.Path(file_okay=False, writable=True),
+    help="Directory where videos are decoded and resized once, then memory-mapped.",
+)
+@click.option(
+    "--realtime",
+    is_flag=True,
+    help="Follow the video timestamps, dropping stale frames to bound latency.",
+)
+def cli(video_files, config, headless, output, detection_cache, frame_cache, realtime):
+    # imported here so that --help does not wait for OpenCV and the detector
+    from .processing import process_video, process_video_headless, process_videos
+
     if config:
         config = load_config(config)
     else:
         config = load_config()
-    process_video(video_file, config)
+    if realtime:
+        config["video"]["realtime"] = True
+    if frame_cache:
+        config["video"]["frame_cache"] = frame_cache
+    if len(video_files) > 1:
+        if detection_cache or realtime:
+            raise click.UsageError(
+                "--detection-cache and --realtime support a single video only."
+            )
+        process_videos(video_files, config, headless=headless, output_dir=output)
+        return
+    (video_file,) = video_files
+    if headless:
+        process_video_headless(
+            video_file,
+            config,
+            output_path=output,
+            detection_cache_dir=detection_cache,
+        )
+    else:
+        process_video(
+            video_file,
+            config,
+            detection_cache_dir=detection_cache,
+            output_path=output,
+        )
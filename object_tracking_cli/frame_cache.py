@@ -0,0 +1,119 @@
+"""Decode and resize a clip once into a raw frame file, see `FrameFile`.
+
+Later runs memory-map the file instead of decoding the video again:
+
+    python -m object_tracking_cli.frame_cache test_car.mp4 test_car.frames \\
+        --width 800
+"""
+import hashlib
+import json
+import logging
+import pathlib
+from typing import Optional
+
+import click
+import cv2
+import numpy as np
+
+from .object_detection.cache import file_hash
+from .utils.image_utils import resize_with_aspect_ratio
+from .video_streaming import (
+    DEFAULT_FPS,
+    FRAME_FILE_EXTENSION,
+    FRAME_FILE_HEADER,
+    FRAME_FILE_MAGIC,
+    HEADER_SIZE,
+    FrameFile,
+    open_capture,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def frame_cache_path(
+    video_path, output_width: Optional[int], frame_cache_dir
+) -> pathlib.Path:
+    """Where the frames of the video, resized to `output_width`, are cached."""
+    payload = json.dumps(
+        {"video": file_hash(video_path), "output_width": output_width}, sort_keys=True
+    )
+    key = hashlib.sha256(payload.encode()).hexdigest()[:32]
+    return pathlib.Path(frame_cache_dir) / f"{key}{FRAME_FILE_EXTENSION}"
+
+
+def write_frame_file(video_path, path, output_width: Optional[int] = None) -> FrameFile:
+    """Decode a video or a directory of images into a frame file at `path`.
+
+    Frames are resized to `output_width` on the way, all of them must have the
+    same size. The file is written under a temporary name and renamed once
+    complete, so an interrupted run never leaves a partial file behind.
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    cap = open_capture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    no_frames = 0
+    shape = None
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(bytes(HEADER_SIZE))
+            while True:
+                is_grabbed, frame = cap.read()
+                if not is_grabbed:
+                    break
+                if output_width is not None:
+                    frame = resize_with_aspect_ratio(frame, target_width=output_width)
+                if shape is None:
+                    shape = frame.shape
+                elif frame.shape != shape:
+                    raise ValueError(
+                        f"Frame {no_frames} of {video_path} is {frame.shape}, "
+                        f"the first one was {shape}."
+                    )
+                f.write(np.ascontiguousarray(frame).data)
+                no_frames += 1
+            if no_frames == 0:
+                raise ValueError(f"No frames could be read from {video_path}.")
+            height, width, channels = shape
+            f.seek(0)
+            f.write(
+                FRAME_FILE_HEADER.pack(
+                    FRAME_FILE_MAGIC, no_frames, height, width, channels, fps
+                )
+            )
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        cap.release()
+    tmp_path.replace(path)
+    logger.info("Stored %d decoded frames of %s in %s", no_frames, video_path, path)
+    return FrameFile(path)
+
+
+def cached_frame_file(
+    video_path, output_width: Optional[int], frame_cache_dir
+) -> pathlib.Path:
+    """Path of the frame file of the video, decoded into it on first use."""
+    path = frame_cache_path(video_path, output_width, frame_cache_dir)
+    if path.exists():
+        logger.info("Using decoded frames from %s", path)
+    else:
+        write_frame_file(video_path, path, output_width)
+    return path
+
+
+@click.command()
+@click.argument("video_file", type=click.Path(exists=True, readable=True))
+@click.argument("output_file", type=click.Path(dir_okay=False, writable=True))
+@click.option("--width", type=int, help="Resize the frames to this width.")
+def main(video_file, output_file, width):
+    """Decode VIDEO_FILE, a video or a directory of images, into OUTPUT_FILE."""
+    frame_file = write_frame_file(video_file, output_file, width)
+    _, height, width, _ = frame_file.frames.shape
+    click.echo(f"{len(frame_file)} frames of {width}x{height} at {frame_file.fps} FPS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+QUANTILES = (50, 95, 99)
+EXPORT_FORMATS = ("jsonl", "prometheus")
+
+
+class Profiler:
+    """Low-overhead per-stage timers with a rolling window of recent samples.
+
+    `lap` times the stage that just ended since the previous lap, `measure`
+    times a block. Each stage keeps the last `window` samples in a
+    preallocated array to compute rolling percentiles, plus running totals.
+    Different stages can be recorded from different threads.
+    """
+
+    def __init__(self, window: int = 300) -> None:
+        self.window = window
+        self._samples: Dict[str, np.ndarray] = {}
+        self._counts = defaultdict(int)
+        self._totals = defaultdict(float)
+        self._lock = threading.Lock()
+        self._last = time.perf_counter()
+
+    @property
+    def stages(self):
+        return list(self._samples.keys())
+
+    def record(self, stage: str, seconds: float) -> None:
+        samples = self._samples.get(stage)
+        if samples is None:
+            with self._lock:
+                samples = self._samples.setdefault(stage, np.zeros(self.window))
+        samples[self._counts[stage] % self.window] = seconds
+        self._counts[stage] += 1
+        self._totals[stage] += seconds
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.record(stage, now - self._last)
+        self._last = now
+
+    def restart_lap(self) -> None:
+        self._last = time.perf_counter()
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def total(self, stage: str) -> float:
+        return self._totals[stage]
+
+    def percentiles(self, stage: str) -> Dict[int, float]:
+        """Rolling percentiles of the stage in seconds."""
+        samples = self._samples[stage][: min(self._counts[stage], self.window)]
+        return dict(zip(QUANTILES, np.percentile(samples, QUANTILES)))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for stage in self.stages:
+            stage_summary = {
+                "count": self._counts[stage],
+                "total_s": self._totals[stage],
+            }
+            for quantile, seconds in self.percentiles(stage).items():
+                stage_summary[f"p{quantile}_ms"] = 1e3 * seconds
+            summary[stage] = stage_summary
+        return summary
+
+
+def to_prometheus(summary: Dict[str, Dict[str, float]]) -> str:
+    lines = [
+        "# HELP object_tracking_stage_seconds Rolling stage duration quantiles.",
+        "# TYPE object_tracking_stage_seconds summary",
+    ]
+    for stage, stage_summary in summary.items():
+        for quantile in QUANTILES:
+            seconds = stage_summary[f"p{quantile}_ms"] / 1e3
+            lines.append(
+                f'object_tracking_stage_seconds{{stage="{stage}",'
+                f'quantile="{quantile / 100}"}} {seconds:.9f}'
+            )
+        lines.append(
+            f'object_tracking_stage_seconds_sum{{stage="{stage}"}} '
+            f'{stage_summary["total_s"]:.9f}'
+        )
+        lines.append(
+            f'object_tracking_stage_seconds_count{{stage="{stage}"}} '
+            f'{stage_summary["count"]}'
+        )
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Periodically export a profiler summary.
+
+    `jsonl` appends one line per export, `prometheus` atomically rewrites the
+    file in the text exposition format (e.g. for node_exporter's textfile
+    collector).
+    """
+
+    def __init__(self, path, fmt: str = "jsonl", interval_s: float = 10.0) -> None:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Only these formats are supported: {EXPORT_FORMATS}")
+        self.path = path
+        self.fmt = fmt
+        self.interval_s = interval_s
+        self._last_export = time.monotonic()
+
+    def maybe_export(self, profiler: Profiler, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now - self._last_export < self.interval_s:
+            return False
+        self._last_export = now
+        summary = profiler.summary()
+        if self.fmt == "jsonl":
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"time": time.time(), "stages": summary}) + "\n")
+        else:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(to_prometheus(summary))
+            os.replace(tmp_path, self.path)
+        return True
+
+
+def make_exporter(config) -> Optional[MetricsExporter]:
+    instrumentation = config.get("instrumentation") or {}
+    if not instrumentation.get("export_path"):
+        return None
+    return MetricsExporter(
+        instrumentation["export_path"],
+        fmt=instrumentation.get("export_format", "jsonl"),
+        interval_s=instrumentation.get("export_interval_s", 10.0),
+    )
+
+
+def make_profiler(config) -> Profiler:
+    instrumentation = config.get("instrumentation") or {}
+    return Profiler(window=instrumentation.get("window", 300))
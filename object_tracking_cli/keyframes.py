@@ -0,0 +1,93 @@
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from .object_tracking.mot import MultiObjectTracker
+
+
+class KeyframeScheduler:
+    """Decide which frames go through the detector.
+
+    A frame is a keyframe if `interval` frames went by since the last keyframe
+    (so `interval` is the longest gap between detections), if the position
+    variance of a track exceeds `max_position_variance` (px²), or if the mean
+    absolute difference between the frame and the last keyframe, both
+    downscaled to a grayscale thumbnail, exceeds `scene_change_threshold`
+    (0-255). The first frame is always a keyframe. Between keyframes the
+    trackers advance with their motion models only.
+    """
+
+    def __init__(
+        self,
+        interval: int = 1,
+        max_position_variance: Optional[float] = None,
+        scene_change_threshold: Optional[float] = None,
+        thumbnail_size: int = 32,
+    ) -> None:
+        if interval < 1:
+            raise ValueError(f"interval must be at least 1, got {interval}")
+        self.interval = interval
+        self.max_position_variance = max_position_variance
+        self.scene_change_threshold = scene_change_threshold
+        self.thumbnail_size = thumbnail_size
+        self.no_frames = 0
+        self.no_keyframes = 0
+        self._frames_since_keyframe = None
+        self._keyframe_thumbnail = None
+
+    def is_keyframe(self, frame, trackers: Dict[str, MultiObjectTracker]) -> bool:
+        """Decide for the next frame. `frame` may be None if it was not decoded."""
+        self.no_frames += 1
+        thumbnail = None
+        if self.scene_change_threshold is not None and frame is not None:
+            thumbnail = self._thumbnail(frame)
+        keyframe = (
+            self._frames_since_keyframe is None
+            or self._frames_since_keyframe + 1 >= self.interval
+            or self._uncertain(trackers)
+            or self._scene_changed(thumbnail)
+        )
+        if keyframe:
+            self.no_keyframes += 1
+            self._frames_since_keyframe = 0
+            self._keyframe_thumbnail = thumbnail
+        else:
+            self._frames_since_keyframe += 1
+        return keyframe
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "frames": self.no_frames,
+            "keyframes": self.no_keyframes,
+            "detection_rate": self.no_keyframes / max(self.no_frames, 1),
+        }
+
+    def _uncertain(self, trackers) -> bool:
+        if self.max_position_variance is None:
+            return False
+        return any(
+            tracker.max_position_variance() > self.max_position_variance
+            for tracker in trackers.values()
+        )
+
+    def _scene_changed(self, thumbnail) -> bool:
+        if thumbnail is None or self._keyframe_thumbnail is None:
+            return False
+        difference = np.abs(thumbnail - self._keyframe_thumbnail).mean()
+        return difference > self.scene_change_threshold
+
+    def _thumbnail(self, frame) -> np.ndarray:
+        size = (self.thumbnail_size, self.thumbnail_size)
+        thumbnail = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        return thumbnail.astype(np.float32)
+
+
+def make_keyframe_scheduler(config) -> Optional[KeyframeScheduler]:
+    """Return None if every frame goes through the detector."""
+    keyframes = config.get("keyframes") or {}
+    if keyframes.get("interval", 1) <= 1:
+        return None
+    return KeyframeScheduler(**keyframes)
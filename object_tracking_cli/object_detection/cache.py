@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import pathlib
+import shutil
+from typing import Dict, List
+
+import numpy as np
+
+from .detection import Bbox_xyxy_with_class_and_score
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(path) -> str:
+    """SHA-256 of a file, or of the files of a directory in name order."""
+    path = pathlib.Path(path)
+    paths = (
+        sorted(p for p in path.iterdir() if p.is_file()) if path.is_dir() else [path]
+    )
+    sha = hashlib.sha256()
+    for file_path in paths:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                sha.update(chunk)
+    return sha.hexdigest()
+
+
+def detection_cache_key(video_path, weights_path, detector_settings: Dict) -> str:
+    """Key of the detections of a video for the given weights and settings."""
+    weights_path = pathlib.Path(weights_path)
+    weights_id = file_hash(weights_path) if weights_path.exists() else weights_path.name
+    payload = json.dumps(
+        {
+            "video": file_hash(video_path),
+            "weights": weights_id,
+            "settings": detector_settings,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class CachedDetector:
+    """Replays detections stored by DetectionRecorder, one frame per `predict`.
+
+    Columns are memory-mapped, so only the rows of the requested frame are read.
+    """
+
+    def __init__(self, path) -> None:
+        path = pathlib.Path(path)
+        with open(path / META_FILE, "r") as f:
+            meta = json.load(f)
+        self.class_id_to_name = {int(k): v for k, v in meta["class_id_to_name"].items()}
+        self.frame_offsets = np.load(path / "frame_offsets.npy", mmap_mode="r")
+        self.boxes = np.load(path / "boxes.npy", mmap_mode="r")
+        self.classes = np.load(path / "classes.npy", mmap_mode="r")
+        self.scores = np.load(path / "scores.npy", mmap_mode="r")
+        self._next_frame = 0
+        self.batch_size = 1
+
+    def __len__(self):
+        return len(self.frame_offsets) - 1
+
+    @property
+    def available_classes(self):
+        return self.class_id_to_name.values()
+
+    def detections(self, frame_idx: int) -> List[Bbox_xyxy_with_class_and_score]:
+        start, end = self.frame_offsets[frame_idx], self.frame_offsets[frame_idx + 1]
+        return [
+            (x1, y1, x2, y2, class_, score)
+            for (x1, y1, x2, y2), class_, score in zip(
+                self.boxes[start:end].tolist(),
+                self.classes[start:end].tolist(),
+                self.scores[start:end],
+            )
+        ]
+
+    def predict(self, frame) -> List[Bbox_xyxy_with_class_and_score]:
+        frame_idx = self._next_frame
+        self._next_frame += 1
+        if frame_idx >= len(self):
+            return []
+        return self.detections(frame_idx)
+
+    def preprocess(self, frame, display_width=None) -> None:
+        """Detections are replayed, the frames are not needed."""
+        return None
+
+    def skip(self) -> None:
+        """Move past a frame that does not go through the detector."""
+        self._next_frame += 1
+
+    def predict_batch(self, frames) -> List[List[Bbox_xyxy_with_class_and_score]]:
+        return [self.predict(frame) for frame in frames]
+
+
+class DetectionRecorder:
+    """Wraps a detector and stores its detections in a columnar cache directory.
+
+    The cache is only written by `finish`, i.e. when the whole video was
+    processed, so an interrupted run never leaves a partial cache behind.
+    """
+
+    def __init__(self, detector, path) -> None:
+        self.detector = detector
+        self.path = pathlib.Path(path)
+        self.class_id_to_name = detector.class_id_to_name
+        self.batch_size = detector.batch_size
+        if hasattr(detector, "preprocess"):
+            self.preprocess = detector.preprocess
+        self._counts = []
+        self._boxes = []
+        self._classes = []
+        self._scores = []
+
+    @property
+    def available_classes(self):
+        return self.detector.available_classes
+
+    def predict(self, frame) -> List[Bbox_xyxy_with_class_and_score]:
+        bboxes = self.detector.predict(frame)
+        self._record(bboxes)
+        return bboxes
+
+    def predict_batch(self, frames) -> List[List[Bbox_xyxy_with_class_and_score]]:
+        batch_bboxes = self.detector.predict_batch(frames)
+        for bboxes in batch_bboxes:
+            self._record(bboxes)
+        return batch_bboxes
+
+    def _record(self, bboxes: List[Bbox_xyxy_with_class_and_score]):
+        self._counts.append(len(bboxes))
+        for x1, y1, x2, y2, class_, score in bboxes:
+            self._boxes.append((x1, y1, x2, y2))
+            self._classes.append(class_)
+            self._scores.append(score)
+
+    def finish(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        frame_offsets = np.zeros(len(self._counts) + 1, dtype=np.int64)
+        np.cumsum(self._counts, out=frame_offsets[1:])
+        np.save(tmp_path / "frame_offsets.npy", frame_offsets)
+        np.save(
+            tmp_path / "boxes.npy",
+            np.array(self._boxes, dtype=np.int32).reshape(-1, 4),
+        )
+        np.save(tmp_path / "classes.npy", np.array(self._classes, dtype=np.int32))
+        np.save(tmp_path / "scores.npy", np.array(self._scores, dtype=np.float32))
+        with open(tmp_path / META_FILE, "w") as f:
+            json.dump(
+                {
+                    "no_frames": len(self._counts),
+                    "class_id_to_name": {
+                        str(k): v for k, v in self.class_id_to_name.items()
+                    },
+                },
+                f,
+            )
+        shutil.rmtree(self.path, ignore_errors=True)
+        tmp_path.rename(self.path)
+        logger.info(
+            "Stored detections of %d frames in %s", len(self._counts), self.path
+        )
+
+
+def is_cached(path) -> bool:
+    return (pathlib.Path(path) / META_FILE).exists()
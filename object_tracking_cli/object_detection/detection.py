@@ -1,43 +1,377 @@
+import ast
+import logging
 import pathlib
-from typing import List, Tuple
+import shutil
+from abc import ABC, abstractmethod
+from multiprocessing import AuthenticationError
+from typing import Dict, List, Optional, Tuple
 
-from ultralytics import YOLO
+import cv2
+import numpy as np
+
+from .preprocessing import PreprocessedFrame, letterbox, stack_images, to_display_boxes
+
+logger = logging.getLogger(__name__)
 
 Bbox_xyxy = Tuple[int, int, int, int]  # top-left, bottom-right
 Bbox_xyxy_with_class = Tuple[int, int, int, int, int]
 Bbox_xyxy_with_class_and_score = Tuple[int, int, int, int, int, float]
 
 HERE = pathlib.Path(__file__).parent
+DEFAULT_WEIGHTS = HERE / "yolov3-tinyu.pt"
+# files made at runtime, the package itself can be installed read-only
+CACHE_DIR = pathlib.Path.home() / ".cache" / "object_tracking"
 
+AVAILABLE_DETECTORS = {}
+DEFAULT_BACKEND = "ultralytics"
 
-class YOLODetector:
-    def __init__(self, conf=0.3, iou=0.7) -> None:
-        self.model = YOLO(HERE / "yolov3-tinyu.pt")
-        self.model.TASK = "detect"
-        self.class_id_to_name = self.model.model.names
-        self.predict_cfg = {"conf": conf, "iou": iou, "verbose": False}
+
+def register_detector(name: str):
+    def register(cls):
+        AVAILABLE_DETECTORS[name] = cls
+        return cls
+
+    return register
+
+
+class Detector(ABC):
+    """Finds objects in frames, all backends share this contract.
+
+    Subclasses set `class_id_to_name`, `batch_size`, `imgsz` and `stride`.
+    """
+
+    class_id_to_name: Dict[int, str]
+    batch_size: int
+    imgsz: int
+    stride: int
 
     @property
     def available_classes(self):
         return self.class_id_to_name.values()
 
+    def preprocess(self, frame, display_width=None) -> PreprocessedFrame:
+        """Make the detector input straight from the decoded BGR frame.
+
+        Boxes predicted on it are in the coordinates of the frame resized to
+        `display_width`, so the frame only needs a display copy if it is shown.
+        """
+        return letterbox(frame, self.imgsz, self.stride, display_width)
+
+    def predict(self, frame) -> List[Bbox_xyxy_with_class_and_score]:
+        return self.predict_batch([frame])[0]
+
+    @abstractmethod
+    def predict_batch(self, frames) -> List[List[Bbox_xyxy_with_class_and_score]]:
+        """Detect in BGR frames or preprocessed ones, one list of boxes per frame."""
+
+    def get_class_name(self, bbox: Bbox_xyxy_with_class):
+        return self.class_id_to_name[bbox[-1]]
+
+
+@register_detector("ultralytics")
+class YOLODetector(Detector):
+    def __init__(self, conf=0.3, iou=0.7, batch_size=1, imgsz=640) -> None:
+        from ultralytics import YOLO
+
+        self.model = YOLO(DEFAULT_WEIGHTS)
+        self.model.TASK = "detect"
+        self.class_id_to_name = self.model.model.names
+        self.predict_cfg = {"conf": conf, "iou": iou, "imgsz": imgsz, "verbose": False}
+        self.batch_size = batch_size
+        self.imgsz = imgsz
+        self.stride = int(self.model.model.stride.max())
+
     def predict(self, frame) -> List[Bbox_xyxy_with_class]:
+        if isinstance(frame, PreprocessedFrame):
+            return self.predict_batch([frame])[0]
         results = self.model.predict(frame, **self.predict_cfg)[0]
         bboxes_xyxy_with_class_and_score = (
             self._yolo_bboxes_to_bboxes_xyxy_with_classes_and_scores(results.boxes)
         )
         return bboxes_xyxy_with_class_and_score
 
-    def get_class_name(self, bbox: Bbox_xyxy_with_class):
-        return self.class_id_to_name[bbox[-1]]
+    def predict_batch(self, frames) -> List[List[Bbox_xyxy_with_class]]:
+        """Run one forward pass on all the frames, BGR frames or preprocessed ones."""
+        import torch
 
-    def _yolo_bboxes_to_bboxes_xyxy_with_classes_and_scores(self, yolo_bboxes):
-        def to_tuple(bbox):
-            xyxy = bbox.xyxy.numpy()[0]
-            x1, y1, x2, y2 = xyxy
-            class_ = bbox.cls.numpy()[0]
-            score = bbox.conf.numpy()[0]
-            return (int(x1), int(y1), int(x2), int(y2), int(class_), score)
+        frames = list(frames)
+        if frames and isinstance(frames[0], PreprocessedFrame):
+            # already letterboxed, Ultralytics feeds tensors to the model as is
+            batch = torch.from_numpy(stack_images(frames)).permute(0, 3, 1, 2)
+            results = self.model.predict(batch.float() / 255, **self.predict_cfg)
+        else:
+            results = self.model.predict(frames, **self.predict_cfg)
+            frames = [None] * len(frames)
+        return [
+            self._yolo_bboxes_to_bboxes_xyxy_with_classes_and_scores(
+                result.boxes, frame
+            )
+            for result, frame in zip(results, frames)
+        ]
 
-        bboxes_xyxy_with_classes = [to_tuple(bbox) for bbox in yolo_bboxes]
+    def _yolo_bboxes_to_bboxes_xyxy_with_classes_and_scores(
+        self, yolo_bboxes, frame: Optional[PreprocessedFrame] = None
+    ):
+        # convert the whole tensors at once instead of box by box
+        xyxy = yolo_bboxes.xyxy.cpu().numpy()
+        if frame is not None:
+            xyxy = to_display_boxes(xyxy, frame)
+        xyxy = xyxy.astype(int).tolist()
+        classes = yolo_bboxes.cls.cpu().numpy().astype(int).tolist()
+        scores = yolo_bboxes.conf.cpu().numpy()
+        bboxes_xyxy_with_classes = [
+            (x1, y1, x2, y2, class_, score)
+            for (x1, y1, x2, y2), class_, score in zip(xyxy, classes, scores)
+        ]
         return bboxes_xyxy_with_classes
+
+
+def export_onnx(imgsz: int = 640, directory=CACHE_DIR) -> pathlib.Path:
+    """Export the bundled weights into `directory`, once.
+
+    Ultralytics writes the export next to the .pt file, so it is exported from
+    a copy there, downloaded by Ultralytics if the package has no weights. The
+    model takes any batch and image size.
+    """
+    from ultralytics import YOLO
+
+    directory = pathlib.Path(directory)
+    weights = directory / DEFAULT_WEIGHTS.with_suffix(".onnx").name
+    if not weights.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        source = directory / DEFAULT_WEIGHTS.name
+        if DEFAULT_WEIGHTS.exists():
+            shutil.copyfile(DEFAULT_WEIGHTS, source)
+        logger.info("Exporting %s to ONNX in %s", DEFAULT_WEIGHTS, directory)
+        YOLO(source).export(format="onnx", dynamic=True, imgsz=imgsz)
+    return weights
+
+
+def read_calibration_frames(video_path, no_frames: int = 32):
+    """Read `no_frames` frames spread over the video."""
+    capture = cv2.VideoCapture(str(video_path))
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for idx in np.linspace(0, max(total - 1, 0), no_frames).astype(int):
+        capture.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        ok, frame = capture.read()
+        if ok:
+            frames.append(frame)
+    capture.release()
+    if not frames:
+        raise ValueError(f"No frames to calibrate on in {video_path}")
+    return frames
+
+
+def quantize_onnx(weights, frames, output_path, imgsz: int = 640) -> pathlib.Path:
+    """Quantize weights and activations to int8, calibrated on the BGR frames.
+
+    Static quantization keeps the convolutions in int8 end to end, dynamic
+    quantization converts activations at every layer and is slower than fp32
+    on CPU for convolutional models.
+    """
+    import onnxruntime
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    session = onnxruntime.InferenceSession(
+        str(weights), providers=["CPUExecutionProvider"]
+    )
+    input_name = session.get_inputs()[0].name
+    stride = int(session.get_modelmeta().custom_metadata_map.get("stride", 32))
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self._frames, None)
+            if frame is None:
+                return None
+            image = letterbox(frame, imgsz, stride).image
+            return {input_name: _to_input_batch(image[None])}
+
+    logger.info("Quantizing %s to int8 on %d frames", weights, len(frames))
+    # unsigned activations with signed weights take the fast int8 kernels on x86
+    quantize_static(
+        str(weights),
+        str(output_path),
+        FrameReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    return pathlib.Path(output_path)
+
+
+def _to_input_batch(images: np.ndarray) -> np.ndarray:
+    """(B, H, W, 3) uint8 RGB to the (B, 3, H, W) float 0-1 model input."""
+    batch = np.ascontiguousarray(images.transpose(0, 3, 1, 2), dtype=np.float32)
+    batch *= 1 / 255
+    return batch
+
+
+@register_detector("onnx")
+class ONNXDetector(Detector):
+    """YOLO inference on ONNX Runtime's CPU execution provider.
+
+    `weights` is a model with a YOLOv8-style head, (B, 4 + classes, anchors)
+    with center boxes, as exported by Ultralytics. Without it the bundled
+    weights are exported to CACHE_DIR on first use. With `quantize` the int8 model
+    `<name>-int8.onnx` next to the weights is used, made on first use by
+    calibrating on `calibration_frames` frames of `calibration_video`.
+    Frames are letterboxed like for YOLODetector and boxes go through
+    per-class NMS. `intra_op_threads` and `inter_op_threads` size ONNX
+    Runtime's thread pools, 0 lets it decide.
+    """
+
+    def __init__(
+        self,
+        conf=0.3,
+        iou=0.7,
+        batch_size=1,
+        imgsz=640,
+        weights=None,
+        quantize=False,
+        calibration_video=None,
+        calibration_frames=32,
+        intra_op_threads=0,
+        inter_op_threads=0,
+        max_det=300,
+    ) -> None:
+        try:
+            import onnxruntime
+        except ImportError as error:
+            raise ImportError(
+                "The onnx detection backend needs onnxruntime: pip install onnxruntime"
+            ) from error
+        weights = pathlib.Path(weights) if weights else export_onnx(imgsz)
+        if quantize:
+            quantized = weights.with_name(f"{weights.stem}-int8.onnx")
+            if not quantized.exists():
+                if calibration_video is None:
+                    raise ValueError(
+                        f"{quantized} does not exist, "
+                        "set calibration_video to quantize the weights"
+                    )
+                frames = read_calibration_frames(calibration_video, calibration_frames)
+                quantize_onnx(weights, frames, quantized, imgsz)
+            weights = quantized
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        self.session = onnxruntime.InferenceSession(
+            str(weights), options, providers=["CPUExecutionProvider"]
+        )
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+        self.batch_size = batch_size
+        self.imgsz = imgsz
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.stride = int(metadata.get("stride", 32))
+        if "names" in metadata:
+            self.class_id_to_name = ast.literal_eval(metadata["names"])
+        else:
+            no_classes = self.session.get_outputs()[0].shape[1] - 4
+            self.class_id_to_name = {idx: str(idx) for idx in range(no_classes)}
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        batch, _, height, width = model_input.shape
+        # symbolic dimensions are strings, fixed ones ints
+        self._fixed_batch = batch if isinstance(batch, int) else None
+        self._min_size = tuple(
+            dim if isinstance(dim, int) else 0 for dim in (height, width)
+        )
+
+    def predict_batch(self, frames) -> List[List[Bbox_xyxy_with_class_and_score]]:
+        frames = [
+            frame if isinstance(frame, PreprocessedFrame) else self.preprocess(frame)
+            for frame in frames
+        ]
+        if not frames:
+            return []
+        batch = _to_input_batch(stack_images(frames, self._min_size))
+        outputs = self._run(batch)
+        return [self._decode(output, frame) for output, frame in zip(outputs, frames)]
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        size = self._fixed_batch
+        if size is None or len(batch) == size:
+            return self.session.run(None, {self._input_name: batch})[0]
+        outputs = []
+        for start in range(0, len(batch), size):
+            chunk = np.zeros((size, *batch.shape[1:]), dtype=batch.dtype)
+            no_frames = len(batch[start : start + size])
+            chunk[:no_frames] = batch[start : start + size]
+            output = self.session.run(None, {self._input_name: chunk})[0]
+            outputs.append(output[:no_frames])
+        return np.concatenate(outputs)
+
+    def _decode(
+        self, output: np.ndarray, frame: PreprocessedFrame
+    ) -> List[Bbox_xyxy_with_class_and_score]:
+        predictions = output.T  # (anchors, 4 + classes)
+        classes = predictions[:, 4:].argmax(axis=1)
+        scores = predictions[np.arange(len(predictions)), 4 + classes]
+        keep = scores > self.conf
+        predictions, classes, scores = predictions[keep], classes[keep], scores[keep]
+        xywh = predictions[:, :4]
+        xyxy = np.concatenate(
+            (xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2), axis=1
+        )
+        boxes_tlwh = np.concatenate((xyxy[:, :2], xywh[:, 2:]), axis=1)
+        indices = cv2.dnn.NMSBoxesBatched(
+            boxes_tlwh.tolist(), scores.tolist(), classes.tolist(), self.conf, self.iou
+        )
+        indices = np.asarray(indices, dtype=int).reshape(-1)[: self.max_det]
+        xyxy = to_display_boxes(xyxy[indices], frame).astype(int).tolist()
+        return [
+            (x1, y1, x2, y2, class_, score)
+            for (x1, y1, x2, y2), class_, score in zip(
+                xyxy, classes[indices].tolist(), scores[indices]
+            )
+        ]
+
+
+def detector_params(detection_config) -> Tuple[str, Dict]:
+    """Backend name and its params from the `detection` config section.
+
+    Scalar settings are shared by all backends, the section named after the
+    backend adds its own.
+    """
+    backend = detection_config.get("backend") or DEFAULT_BACKEND
+    if backend not in AVAILABLE_DETECTORS:
+        raise ValueError(
+            f"Unknown detection backend {backend}, "
+            f"expected one of {list(AVAILABLE_DETECTORS)}"
+        )
+    params = {
+        key: value
+        for key, value in detection_config.items()
+        if key not in ("backend", "server") and not isinstance(value, dict)
+    }
+    params.update(detection_config.get(backend) or {})
+    return backend, params
+
+
+def make_object_detector(detection_config) -> Detector:
+    """Build the configured detector, or use it from a running detector server.
+
+    With `server` set and no server listening there, or one with another
+    key, the detector is loaded in this process.
+    """
+    backend, params = detector_params(detection_config)
+    address = detection_config.get("server")
+    if address:
+        from .server import RemoteDetector
+
+        try:
+            return RemoteDetector(address, backend, params)
+        except (OSError, EOFError, AuthenticationError) as error:
+            logger.warning("No detector server at %s (%s)", address, error)
+    return AVAILABLE_DETECTORS[backend](**params)
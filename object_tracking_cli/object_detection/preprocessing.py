@@ -0,0 +1,78 @@
+from typing import List, NamedTuple, Tuple
+
+import cv2
+import numpy as np
+
+PAD_VALUE = 114  # gray padding, as in Ultralytics' letterbox
+
+
+class PreprocessedFrame(NamedTuple):
+    """Detector input made straight from a decoded frame.
+
+    `image` is the RGB (H, W, 3) letterboxed frame at model resolution. Boxes
+    found on it map back to display coordinates with `(xy - pad) / scale`,
+    within the (width, height) `display_size`.
+    """
+
+    image: np.ndarray
+    scale: float
+    pad: Tuple[int, int]
+    display_size: Tuple[int, int]
+
+
+def letterbox(
+    frame: np.ndarray, imgsz: int = 640, stride: int = 32, display_width=None
+) -> PreprocessedFrame:
+    """Resize the BGR frame once to fit in `imgsz`, padded to a multiple of `stride`.
+
+    The color conversion happens while copying the resized frame into the
+    padded canvas. `display_width` is the width of the frame the boxes are
+    shown on, the decoded frame's own width if None.
+    """
+    height, width = frame.shape[:2]
+    model_scale = min(imgsz / height, imgsz / width)
+    new_width, new_height = round(width * model_scale), round(height * model_scale)
+    padded_width = -(-new_width // stride) * stride
+    padded_height = -(-new_height // stride) * stride
+    left = (padded_width - new_width) // 2
+    top = (padded_height - new_height) // 2
+
+    resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    image = np.full((padded_height, padded_width, 3), PAD_VALUE, dtype=np.uint8)
+    image[top : top + new_height, left : left + new_width] = resized[..., ::-1]
+    if display_width is None:
+        display_size = (width, height)
+    else:
+        # same rounding as resize_with_aspect_ratio
+        display_size = (display_width, int(height * display_width / width))
+    display_scale = display_size[0] / width
+    return PreprocessedFrame(
+        image, model_scale / display_scale, (left, top), display_size
+    )
+
+
+def stack_images(
+    frames: List[PreprocessedFrame], min_size: Tuple[int, int] = (0, 0)
+) -> np.ndarray:
+    """Stack into a (B, H, W, 3) batch, padding smaller images at the bottom right.
+
+    Padding after the image keeps the box mapping of every frame valid. The
+    batch is at least `min_size` (height, width), for models with a fixed input.
+    """
+    height = max(min_size[0], *(frame.image.shape[0] for frame in frames))
+    width = max(min_size[1], *(frame.image.shape[1] for frame in frames))
+    if all(frame.image.shape[:2] == (height, width) for frame in frames):
+        return np.stack([frame.image for frame in frames])
+    batch = np.full((len(frames), height, width, 3), PAD_VALUE, dtype=np.uint8)
+    for idx, frame in enumerate(frames):
+        frame_height, frame_width = frame.image.shape[:2]
+        batch[idx, :frame_height, :frame_width] = frame.image
+    return batch
+
+
+def to_display_boxes(xyxy: np.ndarray, frame: PreprocessedFrame) -> np.ndarray:
+    """Map (N, 4) boxes found on the detector input to display coordinates."""
+    pad_x, pad_y = frame.pad
+    width, height = frame.display_size
+    boxes = (xyxy - np.array([pad_x, pad_y, pad_x, pad_y])) / frame.scale
+    return np.clip(boxes, 0, [width, height, width, height])
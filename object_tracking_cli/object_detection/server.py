@@ -0,0 +1,194 @@
+"""A long-lived local process that keeps detectors loaded between runs.
+
+Start it once, then runs with `detection.server` set send their frames to it
+instead of loading the weights themselves:
+
+    python -m object_tracking_cli.object_detection.server --config config.yaml
+"""
+import json
+import logging
+import os
+import pathlib
+import secrets
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from threading import Lock, Thread
+from typing import Dict, List
+
+import click
+
+from .detection import (
+    AVAILABLE_DETECTORS,
+    CACHE_DIR,
+    Bbox_xyxy_with_class_and_score,
+    Detector,
+    detector_params,
+)
+from .preprocessing import PreprocessedFrame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = "localhost:7355"
+KEY_FILE = CACHE_DIR / "detector_server.key"
+
+
+def parse_address(address: str):
+    """`host:port` for TCP, anything else is a Unix socket path."""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def load_authkey(path=KEY_FILE) -> bytes:
+    """Secret shared by the server and its clients, created on first use.
+
+    Only the user can read the key file, so other users cannot connect.
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return path.read_bytes()
+    with os.fdopen(fd, "wb") as f:
+        f.write(secrets.token_hex(32).encode())
+    return path.read_bytes()
+
+
+class DetectorServer:
+    """Serves `predict_batch` of detectors kept loaded across connections.
+
+    A client sends the backend name and params of the detector it wants, the
+    detector is loaded on the first request for these settings and reused by
+    the following ones. Each connection is served on its own thread, calls to
+    the same detector are serialized.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, authkey=None) -> None:
+        self._authkey = load_authkey() if authkey is None else authkey
+        self._listener = Listener(parse_address(address), authkey=self._authkey)
+        self.address = self._listener.address
+        self._detectors = {}
+        self._detectors_lock = Lock()
+        self._closed = False
+        self._serving = False
+
+    def detector(self, backend: str, params: Dict):
+        """Return the detector for these settings and its lock, loading it once."""
+        key = json.dumps([backend, params], sort_keys=True)
+        with self._detectors_lock:
+            if key not in self._detectors:
+                logger.info("Loading the %s detector with %s", backend, params)
+                detector = AVAILABLE_DETECTORS[backend](**params)
+                self._detectors[key] = (detector, Lock())
+            return self._detectors[key]
+
+    def serve_forever(self) -> None:
+        logger.info("Serving detectors on %s", self.address)
+        self._serving = True
+        while not self._closed:
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError) as error:
+                if not self._closed:
+                    logger.warning("Rejected a connection: %s", error)
+                continue
+            Thread(target=self._serve, args=(connection,), daemon=True).start()
+        self._listener.close()
+
+    def close(self) -> None:
+        """Stop `serve_forever`, waking it up with a connection that hangs up."""
+        self._closed = True
+        if self._serving:
+            Client(self.address).close()
+        else:
+            self._listener.close()
+
+    def _serve(self, connection) -> None:
+        with connection:
+            try:
+                backend, params = connection.recv()
+                detector, lock = self.detector(backend, params)
+                connection.send(("ok", _detector_info(detector)))
+                while True:
+                    frames = connection.recv()
+                    try:
+                        with lock:
+                            result = ("ok", detector.predict_batch(frames))
+                    except Exception as error:
+                        result = ("error", repr(error))
+                    connection.send(result)
+            except (EOFError, OSError):
+                return
+            except Exception as error:
+                logger.exception("Cannot serve a detector")
+                connection.send(("error", repr(error)))
+
+
+def _detector_info(detector: Detector) -> Dict:
+    return {
+        "class_id_to_name": dict(detector.class_id_to_name),
+        "batch_size": detector.batch_size,
+        "imgsz": detector.imgsz,
+        "stride": detector.stride,
+    }
+
+
+class RemoteDetector(Detector):
+    """A detector running in a DetectorServer.
+
+    Frames are letterboxed here and only the detector input crosses the
+    connection, the server returns the boxes.
+    """
+
+    def __init__(self, address: str, backend: str, params: Dict, authkey=None):
+        authkey = load_authkey() if authkey is None else authkey
+        self._connection = Client(parse_address(address), authkey=authkey)
+        self._connection.send((backend, params))
+        info = self._receive()
+        self.class_id_to_name = info["class_id_to_name"]
+        self.batch_size = info["batch_size"]
+        self.imgsz = info["imgsz"]
+        self.stride = info["stride"]
+
+    def predict_batch(self, frames) -> List[List[Bbox_xyxy_with_class_and_score]]:
+        frames = [
+            frame if isinstance(frame, PreprocessedFrame) else self.preprocess(frame)
+            for frame in frames
+        ]
+        self._connection.send(frames)
+        return self._receive()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _receive(self):
+        status, payload = self._connection.recv()
+        if status == "error":
+            raise RuntimeError(f"Detector server error: {payload}")
+        return payload
+
+
+@click.command()
+@click.option("--address", default=DEFAULT_ADDRESS, show_default=True)
+@click.option(
+    "--config",
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    help="Load the detector of this configuration right away.",
+)
+def main(address, config):
+    from ..cli import load_config
+
+    server = DetectorServer(address)
+    if config:
+        server.detector(*detector_params(load_config(config)["detection"]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,8 +1,10 @@
-from typing import Callable, Dict
+from typing import Callable, Dict, Optional
 
 import numpy as np
 from scipy.optimize import linear_sum_assignment
 
+from .utils.kernels import greedy_match, shortest_augmenting_paths
+
 Assignment = Dict[int, int]  # new bbox idx to registered bbox idx
 AssignmentFunction = Callable[[np.ndarray], Assignment]
 
@@ -17,18 +19,11 @@ def register_func(cls):
 @register_func
 def greedy_assignment(cost_matrix) -> Assignment:
     # https://pyimagesearch.com/2018/07/23/simple-object-tracking-with-opencv/ approach
-    rows = cost_matrix.min(axis=1).argsort()
-    cols = cost_matrix.argmin(axis=1)[rows]
-    used_rows = set()
-    used_cols = set()
-    assignment = {}
-    for row, col in zip(rows, cols):
-        if row in used_rows or col in used_cols:
-            continue
-        assignment[col] = row
-        used_rows.add(row)
-        used_cols.add(col)
-    return assignment
+    # rows with the cheapest match go first, ties in row order
+    if cost_matrix.size == 0:
+        return {}
+    rows, cols = greedy_match(cost_matrix)
+    return dict(zip(cols.tolist(), rows.tolist()))
 
 
 @register_func
@@ -49,3 +44,49 @@ def hungarian_assignment(cost_matrix, th: float = 0.0) -> Assignment:
         if row < org_rows and col < org_cols:
             assignment[col] = row
     return assignment
+
+
+@register_func
+def jv_assignment(
+    cost_matrix,
+    th: float = 1.0,
+    warm_start: bool = False,
+    row_prices: Optional[np.ndarray] = None,
+) -> Assignment:
+    """Minimum cost assignment without padding, pairs costing `th` or more stay apart.
+
+    Costs are clipped at `th`, where a pair is worth as much as no pair, and
+    the rectangular problem is solved as it is by a Jonker-Volgenant solver.
+    With `warm_start`, it starts from `row_prices`, the dual prices of the rows
+    (e.g. tracks) in a previous, similar problem, and updates them in place for
+    the next call. The solver needs the compiled kernels, otherwise SciPy
+    solves every problem from scratch.
+    """
+    cost_matrix = np.asarray(cost_matrix, dtype=float)
+    n_rows, n_cols = cost_matrix.shape
+    if n_rows == 0 or n_cols == 0:
+        return {}
+    if shortest_augmenting_paths is None:
+        rows, cols = linear_sum_assignment(np.minimum(cost_matrix, th))
+    else:
+        warm = warm_start and row_prices is not None
+        prices = row_prices if warm else np.zeros(n_rows)
+        if n_rows <= n_cols:
+            u, v = prices.astype(float), np.empty(n_cols)
+            clipped = np.minimum(cost_matrix, th)
+            row_for_col = shortest_augmenting_paths(clipped, u, v, False)
+            cols = np.flatnonzero(row_for_col >= 0)
+            rows = row_for_col[cols]
+            order = np.argsort(rows)
+            rows, cols = rows[order], cols[order]
+            prices[:] = u
+        else:
+            # solved on the transpose, where the rows' prices are column prices
+            u, v = np.empty(n_cols), prices.astype(float)
+            clipped = np.minimum(cost_matrix.T, th, out=np.empty((n_cols, n_rows)))
+            col_for_row = shortest_augmenting_paths(clipped, u, v, True)
+            rows = np.flatnonzero(col_for_row >= 0)
+            cols = col_for_row[rows]
+            prices[:] = v
+    matched = cost_matrix[rows, cols] < th
+    return dict(zip(cols[matched].tolist(), rows[matched].tolist()))
@@ -4,8 +4,16 @@ import numpy as np
 from scipy.spatial import distance as dist
 
 from ..object_detection.detection import Bbox_xyxy_with_class_and_score
-from .utils.bbox import calc_centroids, iou
+from .utils.bbox import (
+    bboxes_to_array,
+    calc_centroids,
+    pairwise_diou,
+    pairwise_giou,
+    pairwise_iou,
+)
 
+# called with the new bboxes and the tracker's registered ones, the latter as
+# an (N, 6) array of x1, y1, x2, y2, class, score
 CostMatrixFunction = Callable[
     [List[Bbox_xyxy_with_class_and_score], List[Bbox_xyxy_with_class_and_score]],
     np.ndarray,
@@ -36,8 +44,27 @@ def iou_cost_matrix(
     bboxes: List[Bbox_xyxy_with_class_and_score],
     registered_bboxes: List[Bbox_xyxy_with_class_and_score],
 ):
-    cost_matrix = np.zeros((len(registered_bboxes), len(bboxes)))
-    for i, bbox1 in enumerate(registered_bboxes):
-        for j, bbox2 in enumerate(bboxes):
-            cost_matrix[i, j] = 1.0 - iou(bbox1, bbox2)
+    cost_matrix = 1.0 - pairwise_iou(
+        bboxes_to_array(registered_bboxes), bboxes_to_array(bboxes)
+    )
+    return cost_matrix
+
+
+@register_func
+def giou_cost_matrix(
+    bboxes: List[Bbox_xyxy_with_class_and_score],
+    registered_bboxes: List[Bbox_xyxy_with_class_and_score],
+):
+    giou = pairwise_giou(bboxes_to_array(registered_bboxes), bboxes_to_array(bboxes))
+    cost_matrix = (1.0 - giou) / 2.0  # GIoU is in [-1, 1]
+    return cost_matrix
+
+
+@register_func
+def diou_cost_matrix(
+    bboxes: List[Bbox_xyxy_with_class_and_score],
+    registered_bboxes: List[Bbox_xyxy_with_class_and_score],
+):
+    diou = pairwise_diou(bboxes_to_array(registered_bboxes), bboxes_to_array(bboxes))
+    cost_matrix = (1.0 - diou) / 2.0  # DIoU is in [-1, 1]
     return cost_matrix
@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from ..object_detection.detection import Bbox_xyxy_with_class_and_score
+from .assignment import Assignment, AssignmentFunction
+from .cost_matrix import CostMatrixFunction
+from .track_store import NO_CLASS
+from .utils.bbox import bboxes_to_array
+
+GATED_COST = 1e9  # cost of a pair rejected by the gate inside a component
+_CELL_KEY_SHIFT = np.int64(2**32)
+_CELL_KEY_OFFSET = np.int64(2**31)
+_NEIGHBOUR_CELLS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def bbox_classes(bboxes) -> np.ndarray:
+    """Class of each bbox, NO_CLASS for bboxes without one."""
+    if isinstance(bboxes, np.ndarray):
+        return bboxes[:, 4].astype(np.int64)
+    return np.array(
+        [NO_CLASS if bbox[4] is None else bbox[4] for bbox in bboxes], dtype=np.int64
+    )
+
+
+def _cell_keys(cells: np.ndarray) -> np.ndarray:
+    return cells[:, 0] * _CELL_KEY_SHIFT + (cells[:, 1] + _CELL_KEY_OFFSET)
+
+
+def grid_candidate_pairs(
+    centroids: np.ndarray, registered_centroids: np.ndarray, max_distance: float
+):
+    """Return (registered_idx, bbox_idx) pairs with centroids within max_distance.
+
+    Bbox centroids are hashed into a grid of max_distance cells, so every
+    registered centroid only has to look at the 3x3 neighbouring cells.
+    """
+    cells = np.floor(centroids / max_distance).astype(np.int64)
+    registered_cells = np.floor(registered_centroids / max_distance).astype(np.int64)
+    order = np.argsort(_cell_keys(cells), kind="stable")
+    sorted_keys = _cell_keys(cells)[order]
+    rows, cols = [], []
+    for offset in _NEIGHBOUR_CELLS:
+        keys = _cell_keys(registered_cells + offset)
+        lo = np.searchsorted(sorted_keys, keys, side="left")
+        hi = np.searchsorted(sorted_keys, keys, side="right")
+        counts = hi - lo
+        total = counts.sum()
+        if total == 0:
+            continue
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        rows.append(np.repeat(np.arange(len(keys)), counts))
+        cols.append(order[np.repeat(lo, counts) + np.arange(total) - first])
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    distances = np.linalg.norm(registered_centroids[rows] - centroids[cols], axis=1)
+    within = distances <= max_distance
+    return rows[within], cols[within]
+
+
+class Gating:
+    """Association stage that only solves pairs passing a spatial and class gate.
+
+    The pairs left by the gate form a bipartite graph between registered and new
+    bboxes. Each connected component is solved independently with the tracker's
+    cost matrix and assignment functions, optionally on a thread pool, shut
+    down by `close`.
+    Assignments are the same as the dense solve wherever the gate does not cut
+    a match, as long as the cost function does not normalize over the whole
+    matrix (e.g. iou_cost_matrix, not euclidean_cost_matrix).
+    """
+
+    def __init__(
+        self,
+        max_distance: float = 100.0,
+        match_classes: bool = True,
+        n_workers: int = 1,
+    ) -> None:
+        self.max_distance = max_distance
+        self.match_classes = match_classes
+        self.n_workers = n_workers
+        self._executor = (
+            ThreadPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+        )
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def candidate_pairs(
+        self,
+        bboxes: List[Bbox_xyxy_with_class_and_score],
+        registered_bboxes: List[Bbox_xyxy_with_class_and_score],
+    ):
+        boxes = bboxes_to_array(bboxes)
+        registered_boxes = bboxes_to_array(registered_bboxes)
+        rows, cols = grid_candidate_pairs(
+            (boxes[:, :2] + boxes[:, 2:]) / 2.0,
+            (registered_boxes[:, :2] + registered_boxes[:, 2:]) / 2.0,
+            self.max_distance,
+        )
+        if self.match_classes:
+            classes = bbox_classes(bboxes)[cols]
+            registered_classes = bbox_classes(registered_bboxes)[rows]
+            same_class = (
+                (classes == registered_classes)
+                | (classes == NO_CLASS)
+                | (registered_classes == NO_CLASS)
+            )
+            rows, cols = rows[same_class], cols[same_class]
+        return rows, cols
+
+    def components(self, rows, cols, n_registered: int, n_bboxes: int):
+        """Split candidate pairs into (registered_idx, bbox_idx, pairs) components."""
+        graph = coo_matrix(
+            (np.ones(len(rows)), (rows, n_registered + cols)),
+            shape=(n_registered + n_bboxes,) * 2,
+        )
+        _, labels = connected_components(graph, directed=False)
+        pair_labels = labels[rows]
+        pair_order = np.argsort(pair_labels, kind="stable")
+        splits = np.flatnonzero(np.diff(pair_labels[pair_order])) + 1
+        for pairs in np.split(pair_order, splits):
+            if len(pairs) == 0:
+                continue
+            yield np.unique(rows[pairs]), np.unique(cols[pairs]), pairs
+
+    def associate(
+        self,
+        bboxes: List[Bbox_xyxy_with_class_and_score],
+        registered_bboxes: List[Bbox_xyxy_with_class_and_score],
+        cost_matrix_func: CostMatrixFunction,
+        assignment_func: AssignmentFunction,
+        row_prices: Optional[np.ndarray] = None,
+    ) -> Assignment:
+        """Solve each component, with the rows' slice of `row_prices` if given."""
+        rows, cols = self.candidate_pairs(bboxes, registered_bboxes)
+
+        def solve(component) -> Assignment:
+            sub_rows, sub_cols, pairs = component
+            sub_bboxes = [bboxes[col] for col in sub_cols]
+            if isinstance(registered_bboxes, np.ndarray):
+                sub_registered_bboxes = registered_bboxes[sub_rows]
+            else:
+                sub_registered_bboxes = [registered_bboxes[row] for row in sub_rows]
+            allowed = np.zeros((len(sub_rows), len(sub_cols)), dtype=bool)
+            allowed[
+                np.searchsorted(sub_rows, rows[pairs]),
+                np.searchsorted(sub_cols, cols[pairs]),
+            ] = True
+            cost_matrix = cost_matrix_func(sub_bboxes, sub_registered_bboxes)
+            cost_matrix = np.where(allowed, cost_matrix, GATED_COST)
+            if row_prices is None:
+                sub_assignment = assignment_func(cost_matrix)
+            else:
+                # components have disjoint rows, threads write separate prices
+                sub_prices = row_prices[sub_rows]
+                sub_assignment = assignment_func(cost_matrix, row_prices=sub_prices)
+                row_prices[sub_rows] = sub_prices
+            return {
+                sub_cols[col]: sub_rows[row]
+                for col, row in sub_assignment.items()
+                if allowed[row, col]
+            }
+
+        components = self.components(rows, cols, len(registered_bboxes), len(bboxes))
+        if self._executor is None:
+            sub_assignments = map(solve, components)
+        else:
+            sub_assignments = self._executor.map(solve, list(components))
+        assignment = {}
+        for sub_assignment in sub_assignments:
+            assignment.update(sub_assignment)
+        return assignment
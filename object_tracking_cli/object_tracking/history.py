@@ -0,0 +1,275 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .assignment import AssignmentFunction
+from .cost_matrix import CostMatrixFunction
+from .gating import GATED_COST, bbox_classes
+from .track_store import NO_CLASS
+
+EVICTION_POLICIES = ("lru", "oldest")
+FREE = -1  # id of an unused slot
+
+
+def _victim(policy: str, first_seen, last_seen, candidates: np.ndarray) -> int:
+    """Slot to evict among `candidates`: seen least recently, or seen first."""
+    order = last_seen if policy == "lru" else first_seen
+    return int(candidates[np.argmin(order[candidates])])
+
+
+def _check_policy(eviction: str) -> None:
+    if eviction not in EVICTION_POLICIES:
+        raise ValueError(
+            f"Unknown eviction policy {eviction}, expected one of {EVICTION_POLICIES}"
+        )
+
+
+class TrajectoryStore:
+    """Fixed-capacity history of the last `length` boxes of each track.
+
+    Each track gets a slot of preallocated arrays. Its ring buffer is written
+    twice, at `head` and `head + length`, so the last `length` boxes are always
+    the contiguous, chronological window `[head, head + length)` and reading a
+    trail never copies. When every slot is taken, the slot of a track that is
+    not being recorded is evicted: the least recently seen one with `lru`, the
+    first seen one with `oldest`. `max_memory_mb` lowers `capacity` so the
+    arrays fit in it.
+    """
+
+    def __init__(
+        self,
+        length: int = 32,
+        capacity: int = 256,
+        eviction: str = "lru",
+        max_memory_mb: Optional[float] = None,
+    ) -> None:
+        _check_policy(eviction)
+        self.length = length
+        self.eviction = eviction
+        if max_memory_mb is not None:
+            slot_bytes = 2 * length * 4 * 8 + 5 * 8
+            capacity = min(capacity, int(max_memory_mb * 2**20 // slot_bytes))
+        self.capacity = capacity
+        self._ids = np.full(capacity, FREE, dtype=np.int64)
+        self._boxes = np.zeros((capacity, 2 * length, 4), dtype=float)
+        self._heads = np.zeros(capacity, dtype=np.int64)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+        self._first_seen = np.zeros(capacity, dtype=np.int64)
+        self._last_seen = np.zeros(capacity, dtype=np.int64)
+        self._slots: Dict[int, int] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in (
+                self._ids,
+                self._boxes,
+                self._heads,
+                self._counts,
+                self._first_seen,
+                self._last_seen,
+            )
+        )
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, id_: int):
+        return id_ in self._slots
+
+    def record(self, frame_idx: int, ids: np.ndarray, boxes: np.ndarray) -> None:
+        """Append the (N, 4) boxes of the tracks with these ids."""
+        slots = self._slots_of(frame_idx, ids)
+        recorded = slots != FREE
+        slots, boxes = slots[recorded], boxes[recorded]
+        heads = self._heads[slots]
+        self._boxes[slots, heads] = boxes
+        self._boxes[slots, heads + self.length] = boxes
+        self._heads[slots] = (heads + 1) % self.length
+        self._counts[slots] = np.minimum(self._counts[slots] + 1, self.length)
+        self._last_seen[slots] = frame_idx
+
+    def trajectory(self, id_: int) -> np.ndarray:
+        """Return the (n, 4) last boxes of the track, oldest first, as a view."""
+        slot = self._slots.get(id_)
+        if slot is None:
+            return self._boxes[0, :0]
+        head = self._heads[slot]
+        return self._boxes[
+            slot, head + self.length - self._counts[slot] : head + self.length
+        ]
+
+    def trajectories(self, ids) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (N, length, 4) windows of the tracks and their box counts.
+
+        The last `count` boxes of each window are the recorded ones, tracks
+        without history have a count of 0.
+        """
+        slots = np.array([self._slots.get(id_, FREE) for id_ in ids], dtype=np.int64)
+        found = slots != FREE
+        windows = np.zeros((len(slots), self.length, 4), dtype=float)
+        counts = np.zeros(len(slots), dtype=np.int64)
+        if found.any():
+            starts = self._heads[slots[found]]
+            columns = starts[:, None] + np.arange(self.length)
+            windows[found] = self._boxes[slots[found][:, None], columns]
+            counts[found] = self._counts[slots[found]]
+        return windows, counts
+
+    def _slots_of(self, frame_idx: int, ids: np.ndarray) -> np.ndarray:
+        slots = np.array([self._slots.get(id_, FREE) for id_ in ids.tolist()])
+        slots = slots.astype(np.int64, copy=False)
+        for idx in np.flatnonzero(slots == FREE):
+            slot = self._allocate(ids)
+            if slot == FREE:
+                break
+            self._slots[int(ids[idx])] = slot
+            self._ids[slot] = ids[idx]
+            self._heads[slot] = 0
+            self._counts[slot] = 0
+            self._first_seen[slot] = frame_idx
+            slots[idx] = slot
+        return slots
+
+    def _allocate(self, ids: np.ndarray) -> int:
+        free = np.flatnonzero(self._ids == FREE)
+        if len(free):
+            return int(free[0])
+        # tracks being recorded keep their slots
+        candidates = np.flatnonzero(~np.isin(self._ids, ids))
+        if len(candidates) == 0:
+            return FREE
+        slot = _victim(self.eviction, self._first_seen, self._last_seen, candidates)
+        del self._slots[int(self._ids[slot])]
+        self._ids[slot] = FREE
+        return slot
+
+
+class LostTrackPool:
+    """Tracks dropped for missing too many frames, kept to recover their ids.
+
+    Holds at most `capacity` tracks in preallocated arrays. New detections that
+    match no live track are matched against the last boxes of the lost tracks,
+    a match brings the track back under its old id. Only pairs costing less
+    than `max_cost` and of the same class, unless either has none, can match.
+    Tracks lost for more than `max_age` frames are forgotten. When the pool is full, the least recently
+    seen track is evicted with `lru` and the first seen one with `oldest`.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 64,
+        max_age: Optional[int] = None,
+        eviction: str = "lru",
+        max_cost: float = 1.0,
+    ) -> None:
+        _check_policy(eviction)
+        self.capacity = capacity
+        self.max_age = max_age
+        self.max_cost = max_cost
+        self.eviction = eviction
+        self.size = 0
+        self.no_recovered = 0
+        self.no_evicted = 0
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._boxes = np.empty((capacity, 4), dtype=float)
+        self._classes = np.empty(capacity, dtype=np.int64)
+        self._scores = np.empty(capacity, dtype=float)
+        self._first_seen = np.empty(capacity, dtype=np.int64)
+        self._last_seen = np.empty(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def ids(self):
+        return self._ids[: self.size]
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        """Last (N, 6) x1, y1, x2, y2, class, score of the lost tracks."""
+        n = self.size
+        return np.column_stack((self._boxes[:n], self._classes[:n], self._scores[:n]))
+
+    def add(self, ids, boxes, classes, scores, first_seen, last_seen) -> None:
+        """Add tracks lost on this frame, evicting others if the pool is full."""
+        for row in zip(ids, boxes, classes, scores, first_seen, last_seen):
+            if self.capacity == 0:
+                return
+            if self.size == self.capacity:
+                victim = _victim(
+                    self.eviction,
+                    self._first_seen,
+                    self._last_seen,
+                    np.arange(self.size),
+                )
+                self._remove(np.arange(self.size) != victim)
+                self.no_evicted += 1
+            idx = self.size
+            (
+                self._ids[idx],
+                self._boxes[idx],
+                self._classes[idx],
+                self._scores[idx],
+                self._first_seen[idx],
+                self._last_seen[idx],
+            ) = row
+            self.size += 1
+
+    def recover(
+        self,
+        frame_idx: int,
+        bboxes,
+        cost_matrix_func: CostMatrixFunction,
+        assignment_func: AssignmentFunction,
+    ) -> Dict[int, Tuple[int, int]]:
+        """Match the bboxes to lost tracks and take the matched ones out.
+
+        Return {bbox_idx: (track id, first seen frame)}.
+        """
+        if self.max_age is not None:
+            self._remove(frame_idx - self._last_seen[: self.size] <= self.max_age)
+        if self.size == 0 or len(bboxes) == 0:
+            return {}
+        cost_matrix = cost_matrix_func(bboxes, self.bboxes)
+        classes = bbox_classes(bboxes)
+        lost_classes = self._classes[: self.size, None]
+        allowed = (cost_matrix < self.max_cost) & (
+            (lost_classes == classes)
+            | (lost_classes == NO_CLASS)
+            | (classes == NO_CLASS)
+        )
+        assignments = {
+            bbox_idx: idx
+            for bbox_idx, idx in assignment_func(
+                np.where(allowed, cost_matrix, GATED_COST)
+            ).items()
+            if allowed[idx, bbox_idx]
+        }
+        if not assignments:
+            return {}
+        recovered = {
+            bbox_idx: (int(self._ids[idx]), int(self._first_seen[idx]))
+            for bbox_idx, idx in assignments.items()
+        }
+        keep = np.ones(self.size, dtype=bool)
+        keep[list(assignments.values())] = False
+        self._remove(keep)
+        self.no_recovered += len(recovered)
+        return recovered
+
+    def _remove(self, keep: np.ndarray) -> None:
+        n_kept = int(keep.sum())
+        if n_kept == self.size:
+            return
+        for array in (
+            self._ids,
+            self._boxes,
+            self._classes,
+            self._scores,
+            self._first_seen,
+            self._last_seen,
+        ):
+            array[:n_kept] = array[: self.size][keep]
+        self.size = n_kept
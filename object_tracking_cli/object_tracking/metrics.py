@@ -0,0 +1,100 @@
+"""Tracking quality, against ground truth (CLEAR MOT) or without it."""
+from typing import Dict
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from .mot import MultiObjectTracker
+from .utils.bbox import pairwise_iou
+
+
+class ClearMOT:
+    """Accumulate matches between ground truth objects and tracks frame by frame.
+
+    Each frame, ground truth boxes and tracks are matched one to one by maximum
+    IoU, pairs below `iou_threshold` do not count. A ground truth object matched
+    to another track than the last time it was matched is an ID switch.
+    """
+
+    def __init__(self, iou_threshold: float = 0.5) -> None:
+        self.iou_threshold = iou_threshold
+        self.no_ground_truth = 0
+        self.no_tracks = 0
+        self.no_matches = 0
+        self.id_switches = 0
+        self.iou_sum = 0.0
+        self._last_match = {}
+
+    def update(self, gt_boxes, gt_ids, track_boxes, track_ids) -> None:
+        self.no_ground_truth += len(gt_ids)
+        self.no_tracks += len(track_ids)
+        if len(gt_ids) == 0 or len(track_ids) == 0:
+            return
+        iou = pairwise_iou(np.asarray(gt_boxes, float), np.asarray(track_boxes, float))
+        gt_idx, track_idx = linear_sum_assignment(iou, maximize=True)
+        matched = iou[gt_idx, track_idx] >= self.iou_threshold
+        gt_idx, track_idx = gt_idx[matched], track_idx[matched]
+        self.no_matches += len(gt_idx)
+        self.iou_sum += float(iou[gt_idx, track_idx].sum())
+        for gt_id, track_id in zip(
+            np.asarray(gt_ids)[gt_idx].tolist(),
+            np.asarray(track_ids)[track_idx].tolist(),
+        ):
+            last_track_id = self._last_match.get(gt_id)
+            if last_track_id is not None and last_track_id != track_id:
+                self.id_switches += 1
+            self._last_match[gt_id] = track_id
+
+    def update_from_tracker(self, gt_boxes, gt_ids, tracker: MultiObjectTracker):
+        track_ids, track_boxes, _, _ = tracker.tracks()
+        self.update(gt_boxes, gt_ids, track_boxes, track_ids)
+
+    def summary(self) -> Dict[str, float]:
+        misses = self.no_ground_truth - self.no_matches
+        false_positives = self.no_tracks - self.no_matches
+        return {
+            "mota": 1.0
+            - (misses + false_positives + self.id_switches)
+            / max(self.no_ground_truth, 1),
+            "motp": self.iou_sum / max(self.no_matches, 1),
+            "recall": self.no_matches / max(self.no_ground_truth, 1),
+            "precision": self.no_matches / max(self.no_tracks, 1),
+            "id_switches": self.id_switches,
+        }
+
+
+class TrackStatistics:
+    """Label-free statistics of the tracks, to compare trackers without ground truth.
+
+    Many tracks per detection and many short tracks point at fragmented
+    trajectories or spurious tracks, long tracks at stable identities.
+    """
+
+    def __init__(self, short_length: int = 5) -> None:
+        self.short_length = short_length
+        self.no_detections = 0
+        self.no_track_frames = 0
+        self._lengths = {}
+
+    def update(self, no_detections: int, track_ids) -> None:
+        self.no_detections += no_detections
+        self.no_track_frames += len(track_ids)
+        for track_id in track_ids.tolist():
+            self._lengths[track_id] = self._lengths.get(track_id, 0) + 1
+
+    def update_from_tracker(self, no_detections: int, tracker: MultiObjectTracker):
+        self.update(no_detections, tracker.tracks()[0])
+
+    def summary(self) -> Dict[str, float]:
+        lengths = np.fromiter(self._lengths.values(), dtype=np.int64)
+        no_tracks = len(lengths)
+        return {
+            "tracks": no_tracks,
+            "tracks_per_100_detections": 100 * no_tracks / max(self.no_detections, 1),
+            "mean_track_length": float(lengths.mean()) if no_tracks else 0.0,
+            "short_tracks": (
+                float((lengths < self.short_length).mean()) if no_tracks else 0.0
+            ),
+            "track_frames_per_detection": self.no_track_frames
+            / max(self.no_detections, 1),
+        }
@@ -1,6 +1,9 @@
+import inspect
 from collections import OrderedDict
 from functools import partial
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import numpy as np
 
 from ..object_detection.detection import Bbox_xyxy_with_class_and_score
 from .assignment import (
@@ -13,8 +16,33 @@ from .cost_matrix import (
     CostMatrixFunction,
     euclidean_cost_matrix,
 )
-from .motion_model import AVAILABLE_MOTION_MODELS, MotionAgnosticModel, MotionModel
-from .utils.bbox import calc_centroids
+from .gating import Gating
+from .history import LostTrackPool, TrajectoryStore
+from .motion_model import (
+    AVAILABLE_MOTION_MODELS,
+    MotionAgnosticModel,
+    MotionModel,
+    is_motion_agnostic,
+    is_motion_model_bank,
+)
+from .track_store import TrackStore
+from .utils.bbox import bboxes_to_array
+
+
+class _TrackView:
+    """Per-track view of the store, used in `objects` when tracks have no model.
+
+    That is with a motion model bank, or with MotionAgnosticModel, whose state
+    is the last measured box already held by the store.
+    """
+
+    def __init__(self, store: TrackStore, object_id: int):
+        self._store = store
+        self._object_id = object_id
+
+    @property
+    def bbox(self):
+        return self._store.bbox_of(self._object_id)
 
 
 class MultiObjectTracker:
@@ -24,14 +52,29 @@ class MultiObjectTracker:
         cost_matrix_func: CostMatrixFunction = euclidean_cost_matrix,
         motion_model_cls: MotionModel = MotionAgnosticModel,
         max_missing_frames: int = 3,
+        gating: Optional[Gating] = None,
+        history: Optional[TrajectoryStore] = None,
+        lost_tracks: Optional[LostTrackPool] = None,
     ):
         self._max_missing_frames = max_missing_frames
+        self.gating = gating
+        self.history = history
+        self.lost_tracks = lost_tracks
         self.assignment_func = assignment_func
+        # solvers taking the tracks' prices can start from the last frame's solution
+        self._takes_prices = (
+            "row_prices" in inspect.signature(assignment_func).parameters
+        )
         self.cost_matrix_func = cost_matrix_func
         self.motion_model_cls = motion_model_cls
         self._objects = OrderedDict()
-        self._missing_frames = OrderedDict()
+        self._store = TrackStore()
+        self._bank = (
+            motion_model_cls() if is_motion_model_bank(motion_model_cls) else None
+        )
+        self._motion_agnostic = is_motion_agnostic(motion_model_cls)
         self._next_object_id = 0
+        self._frame_idx = -1  # number of update and predict calls minus one
 
     @classmethod
     def from_config(cls, config: Dict):
@@ -50,96 +93,218 @@ class MultiObjectTracker:
             AVAILABLE_COST_MATRIX_FUNCS[cost_type], **cost_params
         )
         motion_model_cls = partial(AVAILABLE_MOTION_MODELS[model_type], **model_params)
+        gating = None
+        if "gating" in config:
+            gating_params = config["gating"]
+            gating = Gating(**({} if gating_params is None else gating_params))
+        history = None
+        if "history" in config:
+            history = TrajectoryStore(**(config["history"] or {}))
+        lost_tracks = None
+        if "lost_tracks" in config:
+            lost_tracks = LostTrackPool(**(config["lost_tracks"] or {}))
 
         return cls(
             assignment_func=assignment_func,
             cost_matrix_func=cost_matrix_func,
             motion_model_cls=motion_model_cls,
             max_missing_frames=config["max_missing_frames"],
+            gating=gating,
+            history=history,
+            lost_tracks=lost_tracks,
         )
 
+    def close(self) -> None:
+        """Release the worker threads of the gating stage, if any."""
+        if self.gating is not None:
+            self.gating.close()
+
     @property
     def object_centroids(self):
-        object_centroids = {}
-        ids = self.objects.keys()
-        centroids = calc_centroids([obj.bbox for obj in self.objects.values()])
-        for id_, centroid in zip(ids, centroids):
-            object_centroids[id_] = centroid
-        return object_centroids
+        centroids = self._store.centroids()
+        return dict(zip(self._store.ids.tolist(), centroids))
+
+    def tracks(self):
+        """Return the ids, (T, 4) xyxy boxes, classes and scores of the tracks.
+
+        Tracks without a class have NO_CLASS and without a score nan. The arrays
+        are views of the track store, valid until the next update.
+        """
+        store = self._store
+        return store.ids, store.boxes, store.classes, store.scores
 
     @property
     def objects(self):
+        """Tracks by id, in registration order.
+
+        The values are MotionModel instances only for per-object motion
+        models. With a motion model bank or MotionAgnosticModel they are
+        read-only views exposing `bbox` alone, without `predict_bbox` and
+        `update_bbox`: the tracker predicts and updates all the tracks at once.
+        """
         return self._objects
 
     @property
     def no_objects(self):
         return len(self._objects)
 
-    def register_object(self, object_):
-        self._objects[self._next_object_id] = self.motion_model_cls(object_)
-        self._missing_frames[self._next_object_id] = 0
-        self._next_object_id += 1
+    def register_object(
+        self,
+        object_,
+        object_id: Optional[int] = None,
+        first_frame: Optional[int] = None,
+    ):
+        """Start a track, under a new id unless it is a recovered track's."""
+        if object_id is None:
+            object_id = self._next_object_id
+            self._next_object_id += 1
+        if self._bank is not None:
+            self._bank.append(object_)
+        if self._bank is None and not self._motion_agnostic:
+            self._objects[object_id] = self.motion_model_cls(object_)
+        else:
+            self._objects[object_id] = _TrackView(self._store, object_id)
+        if first_frame is None:
+            first_frame = self._frame_idx
+        self._store.append(object_id, object_, first_frame)
 
     def deregister_object(self, object_id: int):
-        del self._objects[object_id]
-        del self._missing_frames[object_id]
+        self._deregister(self._store.ids != object_id)
 
     def handle_missing(self, object_id: int):
-        self._missing_frames[object_id] += 1
-        if self._missing_frames[object_id] >= self._max_missing_frames:
+        idx = self._store.index_of(object_id)
+        self._store.missing_frames[idx] += 1
+        if self._store.missing_frames[idx] >= self._max_missing_frames:
             self.deregister_object(object_id)
 
+    def max_position_variance(self) -> float:
+        """Largest variance of the tracks' centroid estimates in px², 0 if none."""
+        if self._bank is not None:
+            variances = self._bank.position_variances()
+        elif self._motion_agnostic:
+            return 0.0
+        else:
+            variances = [obj.position_variance for obj in self._objects.values()]
+        return float(np.max(variances)) if len(variances) else 0.0
+
+    def predict(self):
+        """Advance all the tracks with their motion model, without detections.
+
+        Used on frames that do not go through the detector, so the tracks are
+        not counted as missing.
+        """
+        self._frame_idx += 1
+        self._predict_boxes()
+        self._record_history()
+        return self._objects
+
     def update(self, bboxes: List[Bbox_xyxy_with_class_and_score]):
+        self._frame_idx += 1
         # update motion
-        for _, obj in self._objects.items():
-            obj.predict_bbox()
+        self._predict_boxes()
 
         # no new bounding boxes
         if len(bboxes) == 0:
-            to_deregister = []
-            for object_id in self._missing_frames.keys():
-                self._missing_frames[object_id] += 1
-                if self._missing_frames[object_id] > self._max_missing_frames:
-                    to_deregister.append(object_id)
-            for id_ in to_deregister:
-                self.deregister_object(id_)
-            return self._objects
+            self._store.missing_frames[:] += 1
+            self._deregister(self._store.missing_frames <= self._max_missing_frames)
 
         # no registered objects. Register all new bboxes
-        if len(self._objects) == 0:
-            for bbox in bboxes:
-                self.register_object(bbox)
+        elif len(self._objects) == 0:
+            self._register_new(bboxes)
 
         else:
-            object_ids = list(self._objects.keys())
-            registerd_bboxes = list([obj.bbox for obj in self._objects.values()])
-            self._handle_assignments(bboxes, object_ids, registerd_bboxes)
+            self._handle_assignments(bboxes)
+        self._record_history()
         return self._objects
 
-    def _post_assignment(self, assignments, bboxes, object_ids, registered_bboxes):
-        used_registered_bbox_idx = set()
-        used_bboxes_idx = set()
-        for bbox_idx, registered_bbox_idx in assignments.items():
-            object_id = object_ids[registered_bbox_idx]
-            self._objects[object_id].update_bbox(bboxes[bbox_idx])
-            self._missing_frames[object_id] = 0
-            used_registered_bbox_idx.add(registered_bbox_idx)
-            used_bboxes_idx.add(bbox_idx)
-        unused_registered_bboxes_idx = (
-            set(range(len(registered_bboxes))) - used_registered_bbox_idx
+    def _predict_boxes(self):
+        if self._bank is not None:
+            self._store.boxes[:] = self._bank.predict()
+        elif self._objects and not self._motion_agnostic:
+            # motion agnostic tracks stay where the store has them
+            for _, obj in self._objects.items():
+                obj.predict_bbox()
+            self._store.set_boxes([obj.bbox for obj in self._objects.values()])
+
+    def _register_new(self, bboxes: List[Bbox_xyxy_with_class_and_score]):
+        recovered = {}
+        if self.lost_tracks is not None:
+            recovered = self.lost_tracks.recover(
+                self._frame_idx, bboxes, self.cost_matrix_func, self.assignment_func
+            )
+        for idx, bbox in enumerate(bboxes):
+            self.register_object(bbox, *recovered.get(idx, (None, None)))
+
+    def _record_history(self):
+        if self.history is not None:
+            self.history.record(self._frame_idx, self._store.ids, self._store.boxes)
+
+    def _deregister(self, keep_mask):
+        lost = ~keep_mask
+        if self.lost_tracks is not None and lost.any():
+            store = self._store
+            self.lost_tracks.add(
+                store.ids[lost],
+                store.boxes[lost],
+                store.classes[lost],
+                store.scores[lost],
+                store.first_frames[lost],
+                self._frame_idx - store.missing_frames[lost],
+            )
+        if self._bank is not None:
+            self._bank.keep(keep_mask)
+        for object_id in self._store.keep(keep_mask).tolist():
+            del self._objects[object_id]
+
+    def _post_assignment(self, assignments, bboxes):
+        n_registered = len(self._store)
+        bbox_idx = np.fromiter(
+            assignments.keys(), dtype=np.int64, count=len(assignments)
+        )
+        registered_idx = np.fromiter(
+            assignments.values(), dtype=np.int64, count=len(assignments)
         )
-        unused_bboxes_idx = set(range(len(bboxes))) - used_bboxes_idx
-        for unused_registered_bbox_idx in unused_registered_bboxes_idx:
-            self.handle_missing(object_ids[unused_registered_bbox_idx])
-        for unused_bbox_idx in unused_bboxes_idx:
-            self.register_object(bboxes[unused_bbox_idx])
+        matched_bboxes = [bboxes[idx] for idx in bbox_idx]
+        if self._bank is not None:
+            updated_boxes = self._bank.update(registered_idx, matched_bboxes)
+        elif self._motion_agnostic:
+            updated_boxes = bboxes_to_array(matched_bboxes)
+        else:
+            matched_ids = self._store.ids[registered_idx].tolist()
+            updated_boxes = bboxes_to_array(
+                [
+                    self._objects[object_id].update_bbox(bbox)
+                    for object_id, bbox in zip(matched_ids, matched_bboxes)
+                ]
+            )
+        self._store.update_measurements(registered_idx, matched_bboxes)
+        self._store.boxes[registered_idx] = updated_boxes
 
-    def _handle_assignments(
-        self,
-        bboxes: List[Bbox_xyxy_with_class_and_score],
-        object_ids: List[int],
-        registered_bboxes: List[Bbox_xyxy_with_class_and_score],
-    ):  # noqa
-        cost_matrix = self.cost_matrix_func(bboxes, registered_bboxes)
-        assignments = self.assignment_func(cost_matrix)
-        self._post_assignment(assignments, bboxes, object_ids, registered_bboxes)
+        unmatched = np.ones(n_registered, dtype=bool)
+        unmatched[registered_idx] = False
+        self._store.missing_frames[unmatched] += 1
+        self._deregister(
+            ~unmatched | (self._store.missing_frames < self._max_missing_frames)
+        )
+
+        unused_bboxes = np.ones(len(bboxes), dtype=bool)
+        unused_bboxes[bbox_idx] = False
+        self._register_new([bboxes[idx] for idx in np.flatnonzero(unused_bboxes)])
+
+    def _handle_assignments(self, bboxes: List[Bbox_xyxy_with_class_and_score]):
+        row_prices = self._store.prices if self._takes_prices else None
+        if self.gating is not None:
+            assignments = self.gating.associate(
+                bboxes,
+                self._store.bboxes,
+                self.cost_matrix_func,
+                self.assignment_func,
+                row_prices,
+            )
+        else:
+            cost_matrix = self.cost_matrix_func(bboxes, self._store.bboxes)
+            if row_prices is None:
+                assignments = self.assignment_func(cost_matrix)
+            else:
+                assignments = self.assignment_func(cost_matrix, row_prices=row_prices)
+        self._post_assignment(assignments, bboxes)
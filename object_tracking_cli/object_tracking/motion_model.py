@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
+from functools import partial
+from typing import List
 
 import numpy as np
 from filterpy.kalman import KalmanFilter
 
 from ..object_detection.detection import Bbox_xyxy_with_class_and_score
-from .utils.bbox import calc_centroids
+from .utils.bbox import bboxes_to_array, calc_centroids, calc_centroids_array
+from .utils.kernels import boxes_from_centroids
 
 AVAILABLE_MOTION_MODELS = {}
 
@@ -27,6 +30,57 @@ class MotionModel(ABC):
     def bbox(self) -> Bbox_xyxy_with_class_and_score:
         """Return the current bbox."""
 
+    @property
+    def position_variance(self) -> float:
+        """Variance of the centroid estimate in px², 0 if the model has none."""
+        return 0.0
+
+
+class MotionModelBank(ABC):
+    """Motion model of all the tracks of a tracker at once.
+
+    Rows follow the order of the tracker's TrackStore: new tracks are appended
+    and `keep` compacts the rows with the same mask as the store.
+    """
+
+    @abstractmethod
+    def append(self, bbox: Bbox_xyxy_with_class_and_score) -> None:
+        """Start modelling a new track."""
+
+    @abstractmethod
+    def keep(self, mask: np.ndarray) -> None:
+        """Drop the tracks where mask is False."""
+
+    @abstractmethod
+    def predict(self) -> np.ndarray:
+        """Update all states based on the velocity model and return (T, 4) boxes."""
+
+    @abstractmethod
+    def update(
+        self, indices: np.ndarray, measurements: List[Bbox_xyxy_with_class_and_score]
+    ) -> np.ndarray:
+        """Refine the tracks at `indices` and return their (len(indices), 4) boxes."""
+
+    @abstractmethod
+    def position_variances(self) -> np.ndarray:
+        """Return the (T,) variances of the centroid estimates in px²."""
+
+
+def _model_class(model_cls):
+    while isinstance(model_cls, partial):
+        model_cls = model_cls.func
+    return model_cls
+
+
+def is_motion_model_bank(model_cls) -> bool:
+    model_cls = _model_class(model_cls)
+    return isinstance(model_cls, type) and issubclass(model_cls, MotionModelBank)
+
+
+def is_motion_agnostic(model_cls) -> bool:
+    """Whether tracks keep their last measured box, so need no model state."""
+    return _model_class(model_cls) is MotionAgnosticModel
+
 
 @register_model
 class MotionAgnosticModel(MotionModel):
@@ -58,11 +112,19 @@ class KFCentroidVelocityModel(MotionModel):
         self.kf = kf
         self._bbox = bbox
         self._centroid = centroid
+        x1, y1, x2, y2, _, _ = bbox
+        # fixed at registration, recomputing it from float coordinates would
+        # shrink the bbox through rounding errors
+        self._half_size = ((x2 - x1) // 2, (y2 - y1) // 2)
 
     @property
     def bbox(self):
         return self._bbox
 
+    @property
+    def position_variance(self):
+        return self.kf.P[0, 0] + self.kf.P[1, 1]
+
     def predict_bbox(self):
         """Update state based on the velocity model and return the updated bbox."""
         self.kf.predict()
@@ -79,12 +141,145 @@ class KFCentroidVelocityModel(MotionModel):
         return self.bbox
 
     def _reposition_bbox_and_centroid(self, new_centroid):
-        x1, y1, x2, y2, score, class_ = self.bbox
-        bbox_width = x2 - x1
-        bbox_height = y2 - y1
-        x1 = new_centroid[0] - (bbox_width // 2)
-        y1 = new_centroid[1] - (bbox_height // 2)
-        x2 = new_centroid[0] + (bbox_width // 2)
-        y2 = new_centroid[1] + (bbox_height // 2)
-        self._bbox = (x1, y1, x2, y2, score, class_)
+        class_, score = self._bbox[4:]
+        half_width, half_height = self._half_size
+        center_x, center_y = new_centroid.tolist()
+        self._bbox = (
+            center_x - half_width,
+            center_y - half_height,
+            center_x + half_width,
+            center_y + half_height,
+            class_,
+            score,
+        )
         self._centroid = new_centroid
+
+
+@register_model
+class BatchedKFCentroidVelocityModel(MotionModelBank):
+    """Batched equivalent of KFCentroidVelocityModel.
+
+    States are stacked in a (T, 4) array. The covariance of a constant velocity
+    filter depends only on its sequence of predicts and updates, so tracks with
+    the same history share one covariance (and gain) from a small table
+    indexed by `_groups`.
+    """
+
+    _F = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], float)
+    _H = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], float)
+
+    def __init__(
+        self, p: float = 1000.0, r: float = 10.0, q: float = 1.0, capacity: int = 64
+    ) -> None:
+        self._P0 = np.eye(4) * p
+        self._R = np.eye(2) * r
+        self._Q = np.eye(4) * q
+        self.size = 0
+        self._x = np.empty((capacity, 4))
+        self._half_sizes = np.empty((capacity, 2))
+        self._groups = np.empty(capacity, dtype=np.int64)
+        self._P = np.empty((0, 4, 4))
+
+    @property
+    def x(self):
+        return self._x[: self.size]
+
+    @property
+    def P(self):
+        """Per-track (T, 4, 4) covariances."""
+        self._materialize_new_tracks()
+        return self._P[self._groups[: self.size]]
+
+    @property
+    def no_covariance_groups(self):
+        return len(self._P)
+
+    @property
+    def boxes(self):
+        return boxes_from_centroids(self.x[:, :2], self._half_sizes[: self.size])
+
+    def position_variances(self) -> np.ndarray:
+        P = self.P
+        return P[:, 0, 0] + P[:, 1, 1]
+
+    def append(self, bbox: Bbox_xyxy_with_class_and_score) -> None:
+        if self.size == len(self._x):
+            self._grow()
+        x1, y1, x2, y2 = bbox[:4]
+        idx = self.size
+        self._x[idx, :2] = calc_centroids([bbox])[0]
+        self._x[idx, 2:] = 0
+        self._half_sizes[idx] = ((x2 - x1) // 2, (y2 - y1) // 2)
+        self._groups[idx] = -1  # initial covariance, materialized lazily
+        self.size += 1
+
+    def keep(self, mask: np.ndarray) -> None:
+        n_kept = int(mask.sum())
+        for array in (self._x, self._half_sizes, self._groups):
+            array[:n_kept] = array[: self.size][mask]
+        self.size = n_kept
+        self._drop_unused_groups()
+
+    def predict(self) -> np.ndarray:
+        self._materialize_new_tracks()
+        self._x[: self.size] = self.x @ self._F.T
+        self._P = self._F @ self._P @ self._F.T + self._Q
+        return self.boxes
+
+    def update(
+        self, indices: np.ndarray, measurements: List[Bbox_xyxy_with_class_and_score]
+    ) -> np.ndarray:
+        self._materialize_new_tracks()
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) == 0:
+            return np.zeros((0, 4))
+        z = calc_centroids_array(bboxes_to_array(measurements))
+
+        groups = self._groups[: self.size]
+        updated_groups, inverse = np.unique(groups[indices], return_inverse=True)
+        P = self._P[updated_groups]
+        PHT = P @ self._H.T
+        S = self._H @ PHT + self._R
+        K = PHT @ np.linalg.inv(S)
+        I_KH = np.eye(4) - K @ self._H
+        P_updated = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ self._R @ K.transpose(
+            0, 2, 1
+        )
+
+        y = z - self.x[indices, :2]
+        self._x[indices] += np.einsum("nij,nj->ni", K[inverse], y)
+
+        self._P = np.concatenate((self._P, P_updated))
+        groups[indices] = len(self._P) - len(updated_groups) + inverse.ravel()
+        self._drop_unused_groups()
+        return self.boxes[indices]
+
+    def _materialize_new_tracks(self):
+        groups = self._groups[: self.size]
+        new = groups == -1
+        if new.any():
+            groups[new] = len(self._P)
+            self._P = np.concatenate((self._P, self._P0[None]))
+            self._drop_unused_groups()
+
+    def _drop_unused_groups(self):
+        groups = self._groups[: self.size]
+        materialized = groups >= 0
+        used = np.unique(groups[materialized])
+        if len(used) < len(self._P):
+            remap = np.empty(len(self._P), dtype=np.int64)
+            remap[used] = np.arange(len(used))
+            self._P = self._P[used]
+            groups[materialized] = remap[groups[materialized]]
+
+    def _grow(self):
+        new_capacity = 2 * len(self._x)
+
+        def grow(array):
+            new_array = np.empty((new_capacity,) + array.shape[1:], dtype=array.dtype)
+            new_array[: self.size] = array[: self.size]
+            return new_array
+
+        self._x = grow(self._x)
+        self._half_sizes = grow(self._half_sizes)
+        self._groups = grow(self._groups)
@@ -0,0 +1,152 @@
+from typing import List
+
+import numpy as np
+
+from ..object_detection.detection import Bbox_xyxy_with_class_and_score
+from .utils.bbox import bboxes_to_array, calc_centroids_array
+
+NO_CLASS = -1
+
+
+class TrackStore:
+    """Struct-of-arrays storage of the live tracks.
+
+    Tracks occupy the first `size` rows of preallocated arrays in registration
+    order. The arrays grow by doubling, removals compact them in place.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.size = 0
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._boxes = np.empty((capacity, 4), dtype=float)
+        self._classes = np.empty(capacity, dtype=np.int64)
+        self._scores = np.empty(capacity, dtype=float)
+        self._missing_frames = np.empty(capacity, dtype=np.int64)
+        self._first_frames = np.empty(capacity, dtype=np.int64)
+        self._prices = np.empty(capacity, dtype=float)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self._ids)
+
+    @property
+    def ids(self):
+        return self._ids[: self.size]
+
+    @property
+    def boxes(self):
+        return self._boxes[: self.size]
+
+    @property
+    def classes(self):
+        return self._classes[: self.size]
+
+    @property
+    def scores(self):
+        return self._scores[: self.size]
+
+    @property
+    def missing_frames(self):
+        return self._missing_frames[: self.size]
+
+    @property
+    def first_frames(self):
+        return self._first_frames[: self.size]
+
+    @property
+    def prices(self):
+        """Dual prices of the tracks in the last assignment, for warm starts."""
+        return self._prices[: self.size]
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        """Return live tracks as an (N, 6) array of x1, y1, x2, y2, class, score."""
+        return np.column_stack((self.boxes, self.classes, self.scores))
+
+    def centroids(self) -> np.ndarray:
+        return calc_centroids_array(self.boxes)
+
+    def append(
+        self, id_: int, bbox: Bbox_xyxy_with_class_and_score, first_frame: int = 0
+    ) -> None:
+        if self.size == self.capacity:
+            self._grow()
+        idx = self.size
+        self._ids[idx] = id_
+        self._boxes[idx] = bbox[:4]
+        self._set_class_and_score(idx, bbox)
+        self._missing_frames[idx] = 0
+        self._first_frames[idx] = first_frame
+        self._prices[idx] = 0.0
+        self.size += 1
+
+    def extend(self, ids: List[int], bboxes: List[Bbox_xyxy_with_class_and_score]):
+        for id_, bbox in zip(ids, bboxes):
+            self.append(id_, bbox)
+
+    def update_measurements(
+        self, indices: np.ndarray, bboxes: List[Bbox_xyxy_with_class_and_score]
+    ) -> None:
+        """Reset missing counters and take class and score of the matched bboxes."""
+        self._missing_frames[indices] = 0
+        for idx, bbox in zip(indices, bboxes):
+            self._set_class_and_score(idx, bbox)
+
+    def set_boxes(self, bboxes: List[Bbox_xyxy_with_class_and_score]) -> None:
+        self.boxes[:] = bboxes_to_array(bboxes)
+
+    def bbox_of(self, id_: int) -> Bbox_xyxy_with_class_and_score:
+        idx = self.index_of(id_)
+        class_ = int(self._classes[idx])
+        score = float(self._scores[idx])
+        return (
+            *self._boxes[idx].tolist(),
+            None if class_ == NO_CLASS else class_,
+            None if np.isnan(score) else score,
+        )
+
+    def index_of(self, id_: int) -> int:
+        return int(np.flatnonzero(self.ids == id_)[0])
+
+    def keep(self, mask: np.ndarray) -> np.ndarray:
+        """Keep tracks where `mask` is True, preserving order. Return removed ids."""
+        removed_ids = self.ids[~mask].copy()
+        if len(removed_ids) == 0:
+            return removed_ids
+        n_kept = int(mask.sum())
+        for array in (
+            self._ids,
+            self._boxes,
+            self._classes,
+            self._scores,
+            self._missing_frames,
+            self._first_frames,
+            self._prices,
+        ):
+            array[:n_kept] = array[: self.size][mask]
+        self.size = n_kept
+        return removed_ids
+
+    def _set_class_and_score(self, idx: int, bbox: Bbox_xyxy_with_class_and_score):
+        _, _, _, _, class_, score = bbox
+        self._classes[idx] = NO_CLASS if class_ is None else class_
+        self._scores[idx] = np.nan if score is None else score
+
+    def _grow(self):
+        new_capacity = 2 * self.capacity
+
+        def grow(array):
+            new_array = np.empty((new_capacity,) + array.shape[1:], dtype=array.dtype)
+            new_array[: self.size] = array[: self.size]
+            return new_array
+
+        self._ids = grow(self._ids)
+        self._boxes = grow(self._boxes)
+        self._classes = grow(self._classes)
+        self._scores = grow(self._scores)
+        self._missing_frames = grow(self._missing_frames)
+        self._first_frames = grow(self._first_frames)
+        self._prices = grow(self._prices)
@@ -3,6 +3,7 @@ from typing import List
 import numpy as np
 
 from ...object_detection.detection import Bbox_xyxy_with_class_and_score
+from .kernels import centroids
 
 
 def iou(
@@ -26,9 +27,72 @@ def iou(
 
 
 def calc_centroids(bboxes: List[Bbox_xyxy_with_class_and_score]):
-    centroids = np.zeros((len(bboxes), 2), dtype="int")
-    for i, (x1, y1, x2, y2, _, _) in enumerate(bboxes):
-        center_x = int((x1 + x2) / 2.0)
-        center_y = int((y1 + y2) / 2.0)
-        centroids[i] = (center_x, center_y)
-    return centroids
+    """Integer (N, 2) centroids of the bboxes, truncated towards zero."""
+    return centroids(bboxes_to_array(bboxes))
+
+
+def calc_centroids_array(boxes: np.ndarray) -> np.ndarray:
+    """`calc_centroids` for an (N, 4) xyxy array."""
+    return centroids(boxes)
+
+
+def bboxes_to_array(bboxes: List[Bbox_xyxy_with_class_and_score]) -> np.ndarray:
+    """Stack the xyxy part of the bboxes into a float (N, 4) array."""
+    if isinstance(bboxes, np.ndarray):
+        return bboxes[:, :4].astype(float)
+    if len(bboxes) == 0:
+        return np.zeros((0, 4), dtype=float)
+    return np.array([bbox[:4] for bbox in bboxes], dtype=float)
+
+
+def _pairwise_intersection_and_union(boxes_1: np.ndarray, boxes_2: np.ndarray):
+    x1, y1, x2, y2 = (boxes_1[:, None, i] for i in range(4))
+    x3, y3, x4, y4 = (boxes_2[None, :, i] for i in range(4))
+    inter_w = np.maximum(0, np.minimum(x2, x4) - np.maximum(x1, x3))
+    inter_h = np.maximum(0, np.minimum(y2, y4) - np.maximum(y1, y3))
+    intersection_area = inter_w * inter_h
+    area_1 = (x2 - x1) * (y2 - y1)
+    area_2 = (x4 - x3) * (y4 - y3)
+    union_area = area_1 + area_2 - intersection_area
+    return intersection_area, union_area
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result, where=denominator > 0)
+    return result
+
+
+def pairwise_iou(boxes_1: np.ndarray, boxes_2: np.ndarray) -> np.ndarray:
+    """IoU between every box in (N, 4) `boxes_1` and every box in (M, 4) `boxes_2`."""
+    intersection_area, union_area = _pairwise_intersection_and_union(boxes_1, boxes_2)
+    return _safe_divide(intersection_area, union_area)
+
+
+def _enclosing_box(boxes_1: np.ndarray, boxes_2: np.ndarray):
+    x1 = np.minimum(boxes_1[:, None, 0], boxes_2[None, :, 0])
+    y1 = np.minimum(boxes_1[:, None, 1], boxes_2[None, :, 1])
+    x2 = np.maximum(boxes_1[:, None, 2], boxes_2[None, :, 2])
+    y2 = np.maximum(boxes_1[:, None, 3], boxes_2[None, :, 3])
+    return x1, y1, x2, y2
+
+
+def pairwise_giou(boxes_1: np.ndarray, boxes_2: np.ndarray) -> np.ndarray:
+    """Generalized IoU (in [-1, 1]) between two sets of xyxy boxes."""
+    intersection_area, union_area = _pairwise_intersection_and_union(boxes_1, boxes_2)
+    iou_ = _safe_divide(intersection_area, union_area)
+    x1, y1, x2, y2 = _enclosing_box(boxes_1, boxes_2)
+    enclosing_area = (x2 - x1) * (y2 - y1)
+    return iou_ - _safe_divide(enclosing_area - union_area, enclosing_area)
+
+
+def pairwise_diou(boxes_1: np.ndarray, boxes_2: np.ndarray) -> np.ndarray:
+    """Distance IoU (in [-1, 1]) between two sets of xyxy boxes."""
+    intersection_area, union_area = _pairwise_intersection_and_union(boxes_1, boxes_2)
+    iou_ = _safe_divide(intersection_area, union_area)
+    x1, y1, x2, y2 = _enclosing_box(boxes_1, boxes_2)
+    diagonal_sq = (x2 - x1) ** 2 + (y2 - y1) ** 2
+    centers_1 = (boxes_1[:, :2] + boxes_1[:, 2:]) / 2.0
+    centers_2 = (boxes_2[:, :2] + boxes_2[:, 2:]) / 2.0
+    center_dist_sq = ((centers_1[:, None, :] - centers_2[None, :, :]) ** 2).sum(axis=-1)
+    return iou_ - _safe_divide(center_dist_sq, diagonal_sq)
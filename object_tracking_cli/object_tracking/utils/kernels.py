@@ -0,0 +1,221 @@
+"""Hot loops of the tracker, compiled with Numba when it is installed.
+
+Every kernel but `shortest_augmenting_paths` also has a NumPy implementation
+with the same results. The backend is chosen once, at import: `numba` if it
+is installed, `numpy` otherwise or when the OBJECT_TRACKING_KERNELS
+environment variable is set to `numpy`. `BACKEND` is the active one. Numba is
+only imported, and a kernel compiled, on the first call of that kernel.
+"""
+import importlib.util
+import logging
+import os
+from typing import Tuple
+
+import numpy as np
+
+from ...object_detection.detection import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+KERNEL_BACKENDS = ("numba", "numpy")
+ENV_VARIABLE = "OBJECT_TRACKING_KERNELS"
+
+
+def numpy_centroids(boxes: np.ndarray) -> np.ndarray:
+    return ((boxes[:, :2] + boxes[:, 2:4]) / 2.0).astype(np.int64)
+
+
+def numpy_boxes_from_centroids(
+    centroids: np.ndarray, half_sizes: np.ndarray
+) -> np.ndarray:
+    return np.hstack((centroids - half_sizes, centroids + half_sizes))
+
+
+def numpy_greedy_match(cost_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # a row takes its cheapest column unless a row with a lower minimum did
+    rows = cost_matrix.min(axis=1).argsort(kind="stable")
+    cols = cost_matrix.argmin(axis=1)[rows]
+    _, first = np.unique(cols, return_index=True)
+    first.sort()
+    return rows[first], cols[first]
+
+
+def loop_centroids(boxes):
+    centroids = np.empty((boxes.shape[0], 2), dtype=np.int64)
+    for i in range(boxes.shape[0]):
+        centroids[i, 0] = int((boxes[i, 0] + boxes[i, 2]) / 2.0)
+        centroids[i, 1] = int((boxes[i, 1] + boxes[i, 3]) / 2.0)
+    return centroids
+
+
+def loop_boxes_from_centroids(centroids, half_sizes):
+    boxes = np.empty((centroids.shape[0], 4))
+    for i in range(centroids.shape[0]):
+        for j in range(2):
+            boxes[i, j] = centroids[i, j] - half_sizes[i, j]
+            boxes[i, j + 2] = centroids[i, j] + half_sizes[i, j]
+    return boxes
+
+
+def loop_greedy_match(cost_matrix):
+    n_rows, n_cols = cost_matrix.shape
+    row_mins = np.empty(n_rows)
+    best_cols = np.empty(n_rows, dtype=np.int64)
+    for row in range(n_rows):
+        best = 0
+        for col in range(1, n_cols):
+            if cost_matrix[row, col] < cost_matrix[row, best]:
+                best = col
+        best_cols[row] = best
+        row_mins[row] = cost_matrix[row, best]
+    used = np.zeros(n_cols, dtype=np.bool_)
+    rows = np.empty(n_rows, dtype=np.int64)
+    cols = np.empty(n_rows, dtype=np.int64)
+    n_matched = 0
+    for row in np.argsort(row_mins, kind="mergesort"):
+        col = best_cols[row]
+        if not used[col]:
+            used[col] = True
+            rows[n_matched] = row
+            cols[n_matched] = col
+            n_matched += 1
+    return rows[:n_matched], cols[:n_matched]
+
+
+def loop_shortest_augmenting_paths(cost_matrix, u, v, columns_priced):
+    """Minimum cost assignment of every row of an (n, m) matrix, n <= m.
+
+    Jonker-Volgenant, started from prices that can be left over from a similar
+    problem: the row potentials `u`, or the column potentials `v` when
+    `columns_priced`. The other side is derived from them, every column is
+    matched to a free row it is tight with, then the rows still free are
+    matched along shortest augmenting paths of reduced costs. Paths only lower
+    the potentials of matched columns, so the columns left free start with
+    the same, highest potential, which makes the result optimal. `u` and `v`
+    are updated in place, return the row matched to each column (-1 for none).
+    """
+    n, m = cost_matrix.shape
+    if columns_priced:
+        for i in range(n):
+            u[i] = cost_matrix[i, 0] - v[0]
+            for j in range(1, m):
+                u[i] = min(u[i], cost_matrix[i, j] - v[j])
+    # column m is virtual, it holds the row being matched
+    row_for_col = np.full(m + 1, -1, dtype=np.int64)
+    matched = np.zeros(n, dtype=np.bool_)
+    for j in range(m):
+        best_row = 0
+        v[j] = cost_matrix[0, j] - u[0]
+        for i in range(1, n):
+            if cost_matrix[i, j] - u[i] < v[j]:
+                v[j] = cost_matrix[i, j] - u[i]
+                best_row = i
+        if not matched[best_row]:
+            matched[best_row] = True
+            row_for_col[j] = best_row
+    if n < m:
+        # optimal only if the columns left free share the highest potential
+        top = np.inf
+        for j in range(m):
+            if row_for_col[j] == -1:
+                top = min(top, v[j])
+        for j in range(m):
+            if row_for_col[j] == -1:
+                v[j] = top
+            elif v[j] > top:
+                matched[row_for_col[j]] = False
+                row_for_col[j] = -1
+                v[j] = top
+    min_reduced = np.empty(m)
+    way = np.empty(m, dtype=np.int64)
+    used = np.empty(m + 1, dtype=np.bool_)
+    for row in range(n):
+        if matched[row]:
+            continue
+        row_for_col[m] = row
+        min_reduced[:] = np.inf
+        used[:] = False
+        j0 = m
+        while True:
+            used[j0] = True
+            i0 = row_for_col[j0]
+            delta = np.inf
+            j1 = -1
+            for j in range(m):
+                if not used[j]:
+                    reduced = cost_matrix[i0, j] - u[i0] - v[j]
+                    if reduced < min_reduced[j]:
+                        min_reduced[j] = reduced
+                        way[j] = j0
+                    if min_reduced[j] < delta:
+                        delta = min_reduced[j]
+                        j1 = j
+            for j in range(m):
+                if used[j]:
+                    u[row_for_col[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_reduced[j] -= delta
+            u[row] += delta
+            j0 = j1
+            if row_for_col[j0] == -1:
+                break
+        while j0 != m:
+            j1 = way[j0]
+            row_for_col[j0] = row_for_col[j1]
+            j0 = j1
+    return row_for_col[:m]
+
+
+def _select_backend() -> str:
+    requested = os.environ.get(ENV_VARIABLE, "").lower()
+    if requested and requested not in KERNEL_BACKENDS:
+        logger.warning(
+            "Unknown %s=%s, expected one of %s",
+            ENV_VARIABLE,
+            requested,
+            KERNEL_BACKENDS,
+        )
+    if requested == "numpy":
+        return "numpy"
+    if importlib.util.find_spec("numba") is None:
+        if requested == "numba":
+            logger.warning("%s=numba but Numba is not installed", ENV_VARIABLE)
+        return "numpy"
+    return "numba"
+
+
+class LazyKernel:
+    """A loop compiled by Numba on its first call.
+
+    The machine code is cached in CACHE_DIR, unless NUMBA_CACHE_DIR says
+    otherwise, the package itself can be installed read-only.
+    """
+
+    def __init__(self, loop) -> None:
+        self.loop = loop
+        self.compiled = None
+
+    def __call__(self, *args):
+        if self.compiled is None:
+            import numba
+
+            if not numba.config.CACHE_DIR:
+                numba.config.CACHE_DIR = str(CACHE_DIR / "numba")
+            self.compiled = numba.njit(cache=True)(self.loop)
+        return self.compiled(*args)
+
+
+BACKEND = _select_backend()
+
+if BACKEND == "numba":
+    centroids = LazyKernel(loop_centroids)
+    boxes_from_centroids = LazyKernel(loop_boxes_from_centroids)
+    greedy_match = LazyKernel(loop_greedy_match)
+    shortest_augmenting_paths = LazyKernel(loop_shortest_augmenting_paths)
+else:
+    centroids = numpy_centroids
+    boxes_from_centroids = numpy_boxes_from_centroids
+    greedy_match = numpy_greedy_match
+    # no NumPy version, jv_assignment solves with SciPy instead
+    shortest_augmenting_paths = None
@@ -1,4 +1,16 @@
+import colorsys
+
 import cv2
+import numpy as np
+
+
+def hls_palette(n_colors, h=0.01, l=0.6, s=0.65):
+    """BGR colors with evenly spaced hues, same as seaborn's "hls" palette."""
+    hues = (np.linspace(0, 1, n_colors + 1)[:-1] + h) % 1
+    return [
+        tuple(round(channel * 255) for channel in colorsys.hls_to_rgb(hue, l, s))[::-1]
+        for hue in hues
+    ]
 
 
 def plot_bboxes(frame, bboxes_with_class_and_score, class_to_color_and_name):
@@ -22,6 +34,8 @@ def plot_tracking(frame, tracker, tracker_name):
     thickness = 2
     color = (0, 0, 255)
     cv2.putText(frame, tracker_name, (10, 30), font, font_scale, (0, 0, 0), thickness)
+    if tracker.history is not None:
+        plot_trails(frame, tracker, color)
     for object_id, (x, y) in tracker.object_centroids.items():
         text = f"ID {object_id}"
         cv2.putText(
@@ -34,3 +48,63 @@ def plot_tracking(frame, tracker, tracker_name):
             thickness,
         )
         cv2.circle(frame, (x, y), 4, color, -1)
+
+
+def plot_trails(frame, tracker, color, thickness=1):
+    """Draw the recent centroids of every live track from the tracker's history."""
+    ids = tracker.tracks()[0]
+    windows, counts = tracker.history.trajectories(ids)
+    centroids = ((windows[..., :2] + windows[..., 2:]) / 2).astype(np.int32)
+    length = centroids.shape[1]
+    trails = [
+        trail[length - count :] for trail, count in zip(centroids, counts) if count > 1
+    ]
+    if trails:
+        cv2.polylines(frame, trails, False, color, thickness)
+
+
+def plot_stage_timings(frame, stage_summary):
+    """Draw rolling p50/p95/p99 of each stage in the bottom-left corner."""
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale = 0.4
+    line_height = 15
+    y = frame.shape[0] - 10 - line_height * (len(stage_summary) - 1)
+    for stage, summary in stage_summary.items():
+        text = (
+            f"{stage}: p50 {summary['p50_ms']:.1f} p95 {summary['p95_ms']:.1f} "
+            f"p99 {summary['p99_ms']:.1f} ms"
+        )
+        cv2.putText(frame, text, (10, y), font, font_scale, (0, 0, 0), 3)
+        cv2.putText(frame, text, (10, y), font, font_scale, (255, 255, 255), 1)
+        y += line_height
+
+
+def plot_frame_status(frame, detected: bool):
+    """Mark in the top-right corner whether the detector ran on the frame."""
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale = 0.5
+    text, color = (
+        ("detected", (0, 160, 0)) if detected else ("predicted", (0, 140, 255))
+    )
+    (width, _), _ = cv2.getTextSize(text, font, font_scale, 2)
+    position = (frame.shape[1] - width - 10, 30)
+    cv2.putText(frame, text, position, font, font_scale, color, 2)
+
+
+class SideBySideCanvas:
+    """Output image with one panel per tracker, reused across frames.
+
+    The array is reallocated only when the frame size or the number of panels
+    changes, so a rendered image is only valid until the next `panels` call.
+    """
+
+    def __init__(self) -> None:
+        self.array = None
+
+    def panels(self, frame, no_panels: int) -> np.ndarray:
+        """Return a (H, no_panels, W, 3) view of the canvas, panel i is [:, i]."""
+        height, width = frame.shape[:2]
+        shape = (height, no_panels * width) + frame.shape[2:]
+        if self.array is None or self.array.shape != shape:
+            self.array = np.empty(shape, dtype=frame.dtype)
+        return self.array.reshape((height, no_panels, width) + frame.shape[2:])
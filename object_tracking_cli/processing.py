@@ -1,32 +1,183 @@
+import itertools
+import logging
+import pathlib
 import time
-from typing import Dict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Optional
 
 import cv2
-import seaborn as sns
+import numpy as np
 
-from .object_detection.detection import YOLODetector
+from .frame_cache import cached_frame_file
+from .instrumentation import Profiler, make_exporter, make_profiler
+from .keyframes import KeyframeScheduler, make_keyframe_scheduler
+from .object_detection.cache import (
+    CachedDetector,
+    DetectionRecorder,
+    detection_cache_key,
+    is_cached,
+)
+from .object_detection.detection import (
+    DEFAULT_WEIGHTS,
+    Detector,
+    detector_params,
+    make_object_detector,
+)
 from .object_tracking.mot import MultiObjectTracker
-from .plotting import plot_bboxes, plot_tracking
+from .object_tracking.utils.kernels import BACKEND as KERNEL_BACKEND
+from .plotting import (
+    SideBySideCanvas,
+    hls_palette,
+    plot_bboxes,
+    plot_frame_status,
+    plot_stage_timings,
+    plot_tracking,
+)
+from .track_export import AVAILABLE_TRACK_EXPORTERS, TrackExporter, export_file_name
 from .utils.image_utils import resize_with_aspect_ratio
-from .video_streaming import VideoStream
+from .video_output import make_video_sink
+from .video_streaming import (
+    FRAME_FILE_EXTENSION,
+    FrameFileStream,
+    RealtimeClock,
+    VideoStream,
+    open_stream,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _map(func, iterable, executor: Optional[Executor] = None):
+    """Map in order, on the executor's workers if there is one."""
+    if executor is None:
+        return list(map(func, iterable))
+    return list(executor.map(func, iterable))
+
+
+def make_tracker_executor(config) -> Optional[Executor]:
+    tracker_workers = (config.get("processing") or {}).get("tracker_workers", 1)
+    if tracker_workers <= 1:
+        return None
+    return ThreadPoolExecutor(max_workers=tracker_workers)
+
+
+def update_trackers(
+    bboxes_with_class_and_score,
+    trackers,
+    executor: Optional[Executor] = None,
+    profiler: Optional[Profiler] = None,
+):
+    """Update the trackers, or only advance their motion models if bboxes is None."""
+
+    def step(tracker):
+        if bboxes_with_class_and_score is None:
+            tracker.predict()
+        else:
+            tracker.update(bboxes=bboxes_with_class_and_score)
+
+    def update(tracker_item):
+        tracker_name, tracker = tracker_item
+        if profiler is None:
+            step(tracker)
+        else:
+            short_name = tracker_name.split(TRACKER_PARAMS_SEPARATOR)[0]
+            with profiler.measure(f"track/{short_name}"):
+                step(tracker)
+
+    _map(update, trackers.items(), executor)
+
+
+def render_frame(
+    frame,
+    bboxes_with_class_and_score,
+    trackers: Dict[str, MultiObjectTracker],
+    class_to_color_and_name,
+    executor: Optional[Executor] = None,
+    profiler: Optional[Profiler] = None,
+    detected: Optional[bool] = None,
+    canvas: Optional[SideBySideCanvas] = None,
+):
+    """Draw each tracker on its own panel of the canvas, side by side.
+
+    The detections are the same for all the trackers, so they are drawn once
+    and copied to every panel. `detected` marks whether the detector ran on the
+    frame, None when every frame is detected. With a `canvas` reused across
+    frames the returned image is only valid until the next call.
+    """
+    if canvas is None:
+        canvas = SideBySideCanvas()
+    panels = canvas.panels(frame, len(trackers))
+    np.copyto(panels[:, 0], frame)
+    plot_bboxes(panels[:, 0], bboxes_with_class_and_score, class_to_color_and_name)
+    panels[:, 1:] = panels[:, :1]
+
+    def render(idx_and_tracker_item):
+        idx, (tracker_name, tracker) = idx_and_tracker_item
+        panel = panels[:, idx]
+        plot_tracking(panel, tracker, tracker_name)
+        if detected is not None:
+            plot_frame_status(panel, detected)
+
+    _map(render, enumerate(trackers.items()), executor)
+    if profiler is not None:
+        profiler.lap("plot")
+    return canvas.array
 
 
 def process_frame(
     frame,
-    detector: YOLODetector,
+    detector: Detector,
     trackers: Dict[str, MultiObjectTracker],
     class_to_color_and_name,
+    executor: Optional[Executor] = None,
 ):
     bboxes_with_class_and_score = detector.predict(frame)
-    processed_frames = []
-    for tracker_name, tracker in trackers.items():
-        frame_copy = frame.copy()
-        tracker.update(bboxes=bboxes_with_class_and_score)
-        plot_bboxes(frame_copy, bboxes_with_class_and_score, class_to_color_and_name)
-        plot_tracking(frame_copy, tracker, tracker_name)
-        processed_frames.append(frame_copy)
-    processed_frame = cv2.hconcat(processed_frames)
-    return processed_frame
+    update_trackers(bboxes_with_class_and_score, trackers, executor)
+    return render_frame(
+        frame, bboxes_with_class_and_score, trackers, class_to_color_and_name, executor
+    )
+
+
+def preprocess_frame(frame, detector, output_width, render: bool = True):
+    """Return the detector input and the display frame, None if not rendering.
+
+    Both are resized straight from the decoded frame, which can be released
+    right after. Detectors without `preprocess` take the display frame.
+    """
+    preprocess = getattr(detector, "preprocess", None)
+    display_frame = None
+    if isinstance(frame, np.memmap) and frame.shape[1] == output_width:
+        # a frame file view, already resized and valid until the stream ends
+        display_frame = frame
+    elif render or preprocess is None:
+        display_frame = resize_with_aspect_ratio(frame, target_width=output_width)
+    if preprocess is None:
+        return display_frame, display_frame
+    return preprocess(frame, output_width), display_frame
+
+
+def _keyframe_view(detector_input, display_frame):
+    """Image compared by the keyframe scheduler, without making another copy."""
+    if display_frame is not None:
+        return display_frame
+    return getattr(detector_input, "image", detector_input)
+
+
+def detect_keyframe(
+    detector_input,
+    detector,
+    trackers,
+    scheduler: Optional[KeyframeScheduler] = None,
+    display_frame=None,
+):
+    """Return the detections of the frame, or None if it is not a keyframe."""
+    if scheduler is None or scheduler.is_keyframe(
+        _keyframe_view(detector_input, display_frame), trackers
+    ):
+        return detector.predict(detector_input)
+    if isinstance(detector, CachedDetector):
+        detector.skip()
+    return None
 
 
 def fps_to_interval(fps: float):
@@ -41,58 +192,617 @@ def wait_for_next_frame(desired_interval: float, start_time: float) -> float:
 
 
 def make_class_to_color_and_name(class_id_to_name):
-    def hex_to_bgr(hex_color):
-        hex_color = hex_color.lstrip("#")
-        rgb_color = tuple(int(hex_color[i : i + 2], 16) for i in (0, 2, 4))
-        bgr_color = (rgb_color[2], rgb_color[1], rgb_color[0])
-        return bgr_color
-
-    colors_hex = sns.color_palette("hls", len(class_id_to_name)).as_hex()
-    colors_bgr = [hex_to_bgr(color_hex) for color_hex in colors_hex]
+    colors_bgr = hls_palette(len(class_id_to_name))
     return {
         class_id: (colors_bgr[class_id], name)
         for class_id, name in class_id_to_name.items()
     }
 
 
-def process_video(video_path: str, config):
-    # Setup video stream
-    video_stream = VideoStream.from_file(video_path)
-    video_stream.start()
+TRACKER_PARAMS_SEPARATOR = " params: "
 
-    # Setup Object Detector
-    object_detector = YOLODetector(**config["detection"])
 
-    # Setup Object Trackers
+def make_trackers(config) -> Dict[str, MultiObjectTracker]:
     object_trackers = {}
     for tracker in config["trackers"]:
         tracker_name, params = next(iter(tracker.items()))
-        name = f"{tracker_name} params: {params}"
+        name = f"{tracker_name}{TRACKER_PARAMS_SEPARATOR}{params}"
         object_trackers[name] = MultiObjectTracker.from_config(params)
+    return object_trackers
+
+
+def close_trackers(trackers: Dict[str, MultiObjectTracker]):
+    for tracker in trackers.values():
+        tracker.close()
+
+
+def make_track_exporters(
+    config, trackers, prefix: str = ""
+) -> Dict[str, TrackExporter]:
+    """One exporter per tracker, none if track_export.format is empty."""
+    track_export = config.get("track_export") or {}
+    if not track_export.get("format"):
+        return {}
+    exporter_cls = AVAILABLE_TRACK_EXPORTERS[track_export["format"]]
+    directory = pathlib.Path(track_export.get("dir") or "tracks")
+    directory.mkdir(parents=True, exist_ok=True)
+    exporters = {}
+    for idx, tracker_name in enumerate(trackers):
+        short_name = tracker_name.split(TRACKER_PARAMS_SEPARATOR)[0]
+        file_name = export_file_name(
+            f"{prefix}{idx} {short_name}", exporter_cls.extension
+        )
+        exporters[tracker_name] = exporter_cls(
+            directory / file_name, buffer_size=track_export.get("buffer_size", 4096)
+        )
+    return exporters
+
+
+def export_tracks(frame_idx: int, trackers, exporters: Dict[str, TrackExporter]):
+    for tracker_name, exporter in exporters.items():
+        exporter.write(frame_idx, trackers[tracker_name])
+
+
+def close_exporters(exporters: Dict[str, TrackExporter]):
+    for exporter in exporters.values():
+        exporter.close()
+
+
+def detection_cache_path(video_path: str, config, detection_cache_dir) -> pathlib.Path:
+    """Where the detections of the video under these detection settings go."""
+    backend, params = detector_params(config["detection"])
+    # detections depend on the resolution of the frames fed to the detector
+    settings = params | {
+        "backend": backend,
+        "output_width": config["video"]["output_width"],
+    }
+    # batching and threads do not change the detections
+    for name in ("batch_size", "intra_op_threads", "inter_op_threads"):
+        settings.pop(name, None)
+    if config["video"].get("frame_cache"):
+        # the detector sees the cached frames, already resized
+        settings["frame_cache"] = True
+    weights = params.get("weights") or DEFAULT_WEIGHTS
+    key = detection_cache_key(video_path, weights, settings)
+    return pathlib.Path(detection_cache_dir) / key
+
+
+def make_detector(video_path: str, config, detection_cache_dir=None):
+    if detection_cache_dir is None:
+        return make_object_detector(config["detection"])
+    if config["video"].get("realtime", False):
+        # dropped frames would be missing from the cache, or skipped in a replay
+        logger.info("Not using the detection cache, realtime drops frames")
+        return make_object_detector(config["detection"])
+    cache_path = detection_cache_path(video_path, config, detection_cache_dir)
+    if is_cached(cache_path):
+        logger.info("Using cached detections from %s", cache_path)
+        return CachedDetector(cache_path)
+    if make_keyframe_scheduler(config) is not None:
+        logger.info("Not caching detections, keyframes leave out frames")
+        return make_object_detector(config["detection"])
+    return DetectionRecorder(make_object_detector(config["detection"]), cache_path)
+
+
+def finish_detector(detector):
+    """Called once the whole video went through the detector."""
+    if isinstance(detector, DetectionRecorder):
+        detector.finish()
+    close_detector(detector)
+
+
+def close_detector(detector):
+    """Close the connection of a detector used through a detector server."""
+    if isinstance(detector, DetectionRecorder):
+        detector = detector.detector
+    close = getattr(detector, "close", None)
+    if close is not None:
+        close()
+
+
+def open_video_stream(video_path: str, config):
+    """Stream the video, from its cached frame file with `video.frame_cache`."""
+    frame_cache_dir = config["video"].get("frame_cache")
+    if not frame_cache_dir or pathlib.Path(video_path).suffix == FRAME_FILE_EXTENSION:
+        return open_stream(video_path)
+    return FrameFileStream.from_file(
+        cached_frame_file(video_path, config["video"]["output_width"], frame_cache_dir)
+    )
+
+
+def setup_pipeline(video_path: str, config, detection_cache_dir=None):
+    # Setup video stream
+    video_stream = open_video_stream(video_path, config)
+    video_stream.start()
+
+    # Setup Object Detector
+    object_detector = make_detector(video_path, config, detection_cache_dir)
+
+    # Setup Object Trackers
+    object_trackers = make_trackers(config)
 
     # Setup class_to_color
     class_to_color_and_name = make_class_to_color_and_name(
         object_detector.class_id_to_name
     )
+    return video_stream, object_detector, object_trackers, class_to_color_and_name
+
+
+def process_video(video_path: str, config, detection_cache_dir=None, output_path=None):
+    """Show the side-by-side video at the configured FPS.
+
+    It is also recorded to `output_path` if given, encoding on a background
+    thread so the display is not held back.
+    """
+    (
+        video_stream,
+        object_detector,
+        object_trackers,
+        class_to_color_and_name,
+    ) = setup_pipeline(video_path, config, detection_cache_dir)
+    executor = make_tracker_executor(config)
+    profiler = make_profiler(config)
+    exporter = make_exporter(config)
+    overlay = (config.get("instrumentation") or {}).get("overlay", False)
+    clock = make_realtime_clock(config)
+    scheduler = make_keyframe_scheduler(config)
+    canvas = SideBySideCanvas()
+    sink = None if output_path is None else make_video_sink(output_path, config)
+    exporters = make_track_exporters(config, object_trackers)
 
     desired_interval = fps_to_interval(config["video"]["desired_fps"])
     start_time = time.time()
+    try:
+        for frame_idx in itertools.count():
+            if clock is None:
+                start_time = wait_for_next_frame(desired_interval, start_time)
+                profiler.restart_lap()
+                frame = video_stream.get_last_frame()
+                profiler.lap("decode")
+            else:
+                profiler.restart_lap()
+                frame = clock.next_frame(video_stream)
+                profiler.lap("wait_and_decode")
+            if frame is None:
+                finish_detector(object_detector)
+                break
+            detector_input, frame = preprocess_frame(
+                frame, object_detector, config["video"]["output_width"]
+            )
+            profiler.lap("preprocess")
+            bboxes_with_class_and_score = detect_keyframe(
+                detector_input, object_detector, object_trackers, scheduler, frame
+            )
+            detected = bboxes_with_class_and_score is not None
+            profiler.lap("detect")
+            update_trackers(
+                bboxes_with_class_and_score, object_trackers, executor, profiler
+            )
+            profiler.lap("track")
+            if exporters:
+                export_tracks(frame_idx, object_trackers, exporters)
+                profiler.lap("export")
+            processed_frame = render_frame(
+                frame,
+                bboxes_with_class_and_score or [],
+                object_trackers,
+                class_to_color_and_name,
+                executor,
+                profiler,
+                detected=None if scheduler is None else detected,
+                canvas=canvas,
+            )
+            if overlay:
+                plot_stage_timings(processed_frame, profiler.summary())
+                profiler.lap("overlay")
+            if sink is not None:
+                sink.write(processed_frame)
+                profiler.lap("write")
+            cv2.imshow("Frame", processed_frame)
+            key = cv2.waitKey(1)
+            profiler.lap("imshow")
+            if clock is not None:
+                clock.frame_done()
+            if exporter is not None:
+                exporter.maybe_export(profiler)
+            if key & 0xFF == ord("q"):
+                video_stream.stop()
+                break
+    finally:
+        if not video_stream.stopped:
+            video_stream.stop()
+        if executor is not None:
+            executor.shutdown()
+        close_trackers(object_trackers)
+        close_detector(object_detector)
+    if sink is not None:
+        sink.close()
+    close_exporters(exporters)
+    if exporter is not None:
+        exporter.maybe_export(profiler, force=True)
+    if clock is not None:
+        log_realtime_summary(clock.summary())
+    if scheduler is not None:
+        log_keyframe_summary(scheduler.summary())
+    cv2.destroyAllWindows()
+
+
+def make_realtime_clock(config) -> Optional[RealtimeClock]:
+    if not config["video"].get("realtime", False):
+        return None
+    instrumentation = config.get("instrumentation") or {}
+    return RealtimeClock(window=instrumentation.get("window", 300))
+
+
+def log_realtime_summary(summary):
+    logger.info(
+        "Realtime: %d frames processed, %d dropped (%.1f%%), latency p50 %.1f "
+        "p95 %.1f p99 %.1f ms, jitter %.1f ms",
+        summary["frames"],
+        summary["dropped"],
+        100 * summary["drop_rate"],
+        summary["latency_p50_ms"],
+        summary["latency_p95_ms"],
+        summary["latency_p99_ms"],
+        summary["jitter_ms"],
+    )
+
+
+def log_keyframe_summary(summary):
+    logger.info(
+        "Keyframes: detected %d of %d frames (%.1f%%)",
+        summary["keyframes"],
+        summary["frames"],
+        100 * summary["detection_rate"],
+    )
+
+
+def _decoded_frames(
+    video_stream: VideoStream,
+    profiler: Profiler,
+    detector,
+    output_width,
+    render: bool,
+    clock: Optional[RealtimeClock] = None,
+):
+    """Yield the detector inputs and display frames, see `preprocess_frame`.
+
+    Preprocessing right away releases the stream's buffer slot.
+    """
     while True:
-        start_time = wait_for_next_frame(desired_interval, start_time)
-        frame = video_stream.get_last_frame()
+        if clock is None:
+            frame = video_stream.get_last_frame()
+            profiler.lap("decode")
+        else:
+            frame = clock.next_frame(video_stream)
+            profiler.lap("wait_and_decode")
         if frame is None:
-            break
-        frame = resize_with_aspect_ratio(
-            frame, target_width=config["video"]["output_width"]
-        )
-        processed_frame = process_frame(
-            frame,
-            detector=object_detector,
-            trackers=object_trackers,
-            class_to_color_and_name=class_to_color_and_name,
+            return
+        preprocessed = preprocess_frame(frame, detector, output_width, render)
+        profiler.lap("preprocess")
+        yield preprocessed
+
+
+def _batches(frames, batch_size: int):
+    frames = iter(frames)
+    while batch := list(itertools.islice(frames, batch_size)):
+        yield batch
+
+
+def process_video_headless(
+    video_path: str,
+    config,
+    output_path: Optional[str] = None,
+    detection_cache_dir=None,
+) -> Dict[str, float]:
+    """Process the video as fast as possible, without pacing and display.
+
+    The side-by-side frames are written to `output_path`, or not rendered at all
+    if it is None. Without rendering and with cached detections the video is not
+    even decoded. Return the throughput and the time spent in each stage.
+    """
+    (
+        video_stream,
+        object_detector,
+        object_trackers,
+        class_to_color_and_name,
+    ) = setup_pipeline(video_path, config, detection_cache_dir)
+    executor = make_tracker_executor(config)
+    profiler = make_profiler(config)
+    exporter = make_exporter(config)
+    clock = make_realtime_clock(config)
+    scheduler = make_keyframe_scheduler(config)
+    # batching would hold frames back, realtime processes them one by one. The
+    # keyframe decision depends on the tracks, updated frame by frame
+    if clock is not None or scheduler is not None:
+        batch_size = 1
+    else:
+        batch_size = object_detector.batch_size
+    canvas = SideBySideCanvas()
+
+    sink = None if output_path is None else make_video_sink(output_path, config)
+    exporters = make_track_exporters(config, object_trackers)
+    no_frames = 0
+    start_time = time.perf_counter()
+    profiler.restart_lap()
+    if output_path is None and isinstance(object_detector, CachedDetector):
+        video_stream.stop()
+        frames = itertools.repeat((None, None), len(object_detector))
+        clock = None  # no frames are decoded, so none is due
+    else:
+        frames = _decoded_frames(
+            video_stream,
+            profiler,
+            object_detector,
+            config["video"]["output_width"],
+            output_path is not None,
+            clock,
         )
-        cv2.imshow("Frame", processed_frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
+    try:
+        for batch in _batches(frames, batch_size):
+            if scheduler is None:
+                batch_bboxes = object_detector.predict_batch(
+                    [detector_input for detector_input, _ in batch]
+                )
+            else:
+                batch_bboxes = [
+                    detect_keyframe(
+                        detector_input,
+                        object_detector,
+                        object_trackers,
+                        scheduler,
+                        frame,
+                    )
+                    for detector_input, frame in batch
+                ]
+            profiler.lap("detect")
+            for (_, frame), bboxes_with_class_and_score in zip(batch, batch_bboxes):
+                update_trackers(
+                    bboxes_with_class_and_score, object_trackers, executor, profiler
+                )
+                profiler.lap("track")
+                if exporters:
+                    export_tracks(no_frames, object_trackers, exporters)
+                    profiler.lap("export")
+                if output_path is not None:
+                    detected = bboxes_with_class_and_score is not None
+                    processed_frame = render_frame(
+                        frame,
+                        bboxes_with_class_and_score or [],
+                        object_trackers,
+                        class_to_color_and_name,
+                        executor,
+                        profiler,
+                        detected=None if scheduler is None else detected,
+                        canvas=canvas,
+                    )
+                    sink.write(processed_frame)
+                    profiler.lap("write")
+                no_frames += 1
+                if clock is not None:
+                    clock.frame_done()
+                if exporter is not None:
+                    exporter.maybe_export(profiler)
+    finally:
+        if not video_stream.stopped:
             video_stream.stop()
-            break
-    cv2.destroyAllWindows()
+        if executor is not None:
+            executor.shutdown()
+        close_trackers(object_trackers)
+        close_detector(object_detector)
+    finish_detector(object_detector)
+    if exporter is not None:
+        exporter.maybe_export(profiler, force=True)
+    output_summary = None if sink is None else sink.close()
+    close_exporters(exporters)
+
+    total_time = time.perf_counter() - start_time
+    stats = {
+        "frames": no_frames,
+        "total_s": total_time,
+        "fps": no_frames / total_time if total_time > 0 else 0.0,
+        "tracking_kernels": KERNEL_BACKEND,
+    }
+    summary = profiler.summary()
+    for stage, stage_summary in summary.items():
+        stats[f"{stage}_ms_per_frame"] = (
+            1e3 * stage_summary["total_s"] / max(no_frames, 1)
+        )
+    logger.info(
+        "Processed %d frames in %.2fs (%.1f FPS), %s tracking kernels",
+        no_frames,
+        total_time,
+        stats["fps"],
+        KERNEL_BACKEND,
+    )
+    for stage, stage_summary in summary.items():
+        logger.info(
+            "  %-30s %8.2f ms/frame  p50 %7.2f  p95 %7.2f  p99 %7.2f ms",
+            stage,
+            stats[f"{stage}_ms_per_frame"],
+            stage_summary["p50_ms"],
+            stage_summary["p95_ms"],
+            stage_summary["p99_ms"],
+        )
+    if clock is not None:
+        realtime_summary = clock.summary()
+        log_realtime_summary(realtime_summary)
+        stats.update(
+            {f"realtime_{key}": value for key, value in realtime_summary.items()}
+        )
+    if scheduler is not None:
+        keyframe_summary = scheduler.summary()
+        log_keyframe_summary(keyframe_summary)
+        stats.update(
+            {f"keyframes_{key}": value for key, value in keyframe_summary.items()}
+        )
+    if output_summary is not None:
+        stats.update({f"output_{key}": value for key, value in output_summary.items()})
+    return stats
+
+
+class _Stream:
+    def __init__(self, idx: int, video_path: str, config) -> None:
+        self.name = f"{idx}: {pathlib.Path(video_path).name}"
+        self.output_name = f"{idx}_{pathlib.Path(video_path).stem}.mp4"
+        self.video_stream = open_video_stream(video_path, config)
+        self.video_stream.start()
+        self.trackers = make_trackers(config)
+        self.scheduler = make_keyframe_scheduler(config)
+        self.canvas = SideBySideCanvas()
+        self.exporters = make_track_exporters(
+            config, self.trackers, prefix=f"{idx} {pathlib.Path(video_path).stem} "
+        )
+        self.sink = None
+        self.no_frames = 0
+
+    def record(self, output_dir: str, config):
+        self.sink = make_video_sink(
+            str(pathlib.Path(output_dir) / self.output_name), config
+        )
+
+    def stop(self):
+        if not self.video_stream.stopped:
+            self.video_stream.stop()
+        if self.sink is not None:
+            self.sink.close()
+        close_exporters(self.exporters)
+        close_trackers(self.trackers)
+
+
+def _multi_stream_batches(
+    streams, detector, output_width, render: bool, profiler: Profiler
+):
+    """Yield one preprocessed frame from each stream that still has frames."""
+    live_streams = list(streams)
+    while live_streams:
+        batch = []
+        for stream in list(live_streams):
+            frame = stream.video_stream.get_last_frame()
+            if frame is None:
+                live_streams.remove(stream)
+                continue
+            batch.append(
+                (stream, *preprocess_frame(frame, detector, output_width, render))
+            )
+        profiler.lap("decode_and_preprocess")
+        if batch:
+            yield batch
+
+
+def process_videos(
+    video_paths, config, headless: bool = False, output_dir: Optional[str] = None
+) -> Dict[str, float]:
+    """Process several videos with one detector shared by all the streams.
+
+    Each stream has its own VideoStream, trackers and keyframe scheduler. Every
+    step takes one frame from each stream and runs the keyframes among them
+    through the detector in a single batch.
+    Without `headless` each stream is shown in its own window at the configured
+    FPS. The side-by-side videos are written to `output_dir` if given, in
+    headless mode nothing is rendered without it.
+    """
+    streams = [
+        _Stream(idx, video_path, config) for idx, video_path in enumerate(video_paths)
+    ]
+    object_detector = make_object_detector(config["detection"])
+    class_to_color_and_name = make_class_to_color_and_name(
+        object_detector.class_id_to_name
+    )
+    executor = make_tracker_executor(config)
+    profiler = make_profiler(config)
+    exporter = make_exporter(config)
+    render = not headless or output_dir is not None
+    if output_dir is not None:
+        pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
+        for stream in streams:
+            stream.record(output_dir, config)
+
+    desired_interval = fps_to_interval(config["video"]["desired_fps"])
+    start_time = time.perf_counter()
+    step_start_time = time.time()
+    profiler.restart_lap()
+    try:
+        for batch in _multi_stream_batches(
+            streams, object_detector, config["video"]["output_width"], render, profiler
+        ):
+            keyframes = [
+                idx
+                for idx, (stream, detector_input, frame) in enumerate(batch)
+                if stream.scheduler is None
+                or stream.scheduler.is_keyframe(
+                    _keyframe_view(detector_input, frame), stream.trackers
+                )
+            ]
+            batch_bboxes = [None] * len(batch)
+            if keyframes:
+                keyframe_bboxes = object_detector.predict_batch(
+                    [batch[idx][1] for idx in keyframes]
+                )
+                for idx, bboxes_with_class_and_score in zip(keyframes, keyframe_bboxes):
+                    batch_bboxes[idx] = bboxes_with_class_and_score
+            profiler.lap("detect")
+            for (stream, _, frame), bboxes_with_class_and_score in zip(
+                batch, batch_bboxes
+            ):
+                update_trackers(
+                    bboxes_with_class_and_score, stream.trackers, executor, profiler
+                )
+                profiler.lap("track")
+                if stream.exporters:
+                    export_tracks(stream.no_frames, stream.trackers, stream.exporters)
+                    profiler.lap("export")
+                stream.no_frames += 1
+                if not render:
+                    continue
+                detected = bboxes_with_class_and_score is not None
+                processed_frame = render_frame(
+                    frame,
+                    bboxes_with_class_and_score or [],
+                    stream.trackers,
+                    class_to_color_and_name,
+                    executor,
+                    profiler,
+                    detected=None if stream.scheduler is None else detected,
+                    canvas=stream.canvas,
+                )
+                if stream.sink is not None:
+                    stream.sink.write(processed_frame)
+                    profiler.lap("write")
+                if not headless:
+                    cv2.imshow(stream.name, processed_frame)
+                    profiler.lap("imshow")
+            if exporter is not None:
+                exporter.maybe_export(profiler)
+            if not headless:
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+                step_start_time = wait_for_next_frame(desired_interval, step_start_time)
+                profiler.restart_lap()
+    finally:
+        for stream in streams:
+            stream.stop()
+        if executor is not None:
+            executor.shutdown()
+        close_detector(object_detector)
+    if exporter is not None:
+        exporter.maybe_export(profiler, force=True)
+    if not headless:
+        cv2.destroyAllWindows()
+
+    total_time = time.perf_counter() - start_time
+    no_frames = sum(stream.no_frames for stream in streams)
+    stats = {
+        "streams": len(streams),
+        "frames": no_frames,
+        "total_s": total_time,
+        "fps": no_frames / total_time if total_time > 0 else 0.0,
+    }
+    logger.info(
+        "Processed %d frames from %d streams in %.2fs (%.1f FPS in total)",
+        no_frames,
+        len(streams),
+        total_time,
+        stats["fps"],
+    )
+    return stats
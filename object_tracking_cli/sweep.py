@@ -0,0 +1,252 @@
+"""Sweep tracker hyperparameters over the cached detections of a video.
+
+Every combination of the grid is a tracker config, replayed on the detections
+stored by `--detection-cache` on a pool of processes, without the detector or
+any rendering:
+
+    python -m object_tracking_cli.sweep test_car.mp4 --detection-cache DIR \\
+        --grid grid.yaml --output results.csv
+"""
+import copy
+import csv
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import click
+import numpy as np
+import yaml
+
+from .cli import load_config
+from .object_detection.cache import CachedDetector, is_cached
+from .object_tracking.metrics import ClearMOT, TrackStatistics
+from .object_tracking.mot import MultiObjectTracker
+from .track_export import read_mot
+
+logger = logging.getLogger(__name__)
+
+NO_GROUND_TRUTH = (np.zeros(0, dtype=np.int64), np.zeros((0, 4)))
+
+# detections and ground truth, loaded once per worker process by `_load`
+_replay = {}
+
+
+def _set(config: Dict, dotted_key: str, value) -> None:
+    *path, key = dotted_key.split(".")
+    for name in path:
+        if config.get(name) is None:
+            config[name] = {}
+        config = config[name]
+    config[key] = value
+
+
+def expand_grid(base: Dict, grid: Dict[str, List]) -> List[Tuple[Dict, Dict]]:
+    """Return (params, tracker config) for every combination of the grid values.
+
+    Grid keys are dotted paths into the tracker config, e.g.
+    `assignment_func.hungarian_assignment.th`, missing or empty sections on the
+    way are created.
+    """
+    keys = list(grid)
+    expanded = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        params = dict(zip(keys, values))
+        config = copy.deepcopy(base)
+        for key, value in params.items():
+            _set(config, key, copy.deepcopy(value))
+        expanded.append((params, config))
+    return expanded
+
+
+def _load(detections_path, ground_truth_path=None) -> None:
+    detector = CachedDetector(detections_path)
+    _replay["frames"] = [detector.detections(idx) for idx in range(len(detector))]
+    _replay["ground_truth"] = (
+        None if ground_truth_path is None else read_mot(ground_truth_path)
+    )
+
+
+def evaluate(tracker_config: Dict) -> Dict[str, float]:
+    """Replay the loaded detections through a tracker made from the config.
+
+    Only `update` is timed. Without ground truth the quality is described by
+    label-free track statistics, with it by the CLEAR MOT metrics as well.
+    """
+    frames, ground_truth = _replay["frames"], _replay["ground_truth"]
+    tracker = MultiObjectTracker.from_config(tracker_config)
+    statistics = TrackStatistics()
+    clear_mot = None if ground_truth is None else ClearMOT()
+    tracking_time = 0.0
+    try:
+        for frame_idx, bboxes in enumerate(frames):
+            start_time = time.perf_counter()
+            tracker.update(bboxes)
+            tracking_time += time.perf_counter() - start_time
+            statistics.update_from_tracker(len(bboxes), tracker)
+            if clear_mot is not None:
+                gt_ids, gt_boxes = ground_truth.get(frame_idx, NO_GROUND_TRUTH)
+                clear_mot.update_from_tracker(gt_boxes, gt_ids, tracker)
+    finally:
+        tracker.close()
+    results = {
+        "fps": len(frames) / max(tracking_time, 1e-9),
+        "ms_per_frame": 1000 * tracking_time / max(len(frames), 1),
+    }
+    results.update(statistics.summary())
+    if clear_mot is not None:
+        results.update(clear_mot.summary())
+    return results
+
+
+def sweep(
+    detections_path,
+    tracker_configs: List[Dict],
+    ground_truth_path=None,
+    workers: Optional[int] = None,
+) -> List[Dict[str, float]]:
+    """Evaluate the tracker configs, in order, on `workers` processes.
+
+    Each worker reads the detections once. With a single worker the configs
+    are evaluated in this process.
+    """
+    detections_path = str(detections_path)
+    ground_truth_path = None if ground_truth_path is None else str(ground_truth_path)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tracker_configs) <= 1:
+        _load(detections_path, ground_truth_path)
+        return [evaluate(config) for config in tracker_configs]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tracker_configs)),
+        initializer=_load,
+        initargs=(detections_path, ground_truth_path),
+    ) as executor:
+        return list(executor.map(evaluate, tracker_configs))
+
+
+def _cell(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    if isinstance(value, dict) and len(value) == 1:
+        # a component given by name, e.g. {"MotionAgnosticModel": None}
+        name, params = next(iter(value.items()))
+        return name if params is None else f"{name}{params}"
+    return str(value)
+
+
+def format_table(rows: List[Dict]) -> str:
+    columns = list(rows[0])
+    cells = [[_cell(row[column]) for column in columns] for row in rows]
+    widths = [
+        max(len(column), *(len(row[idx]) for row in cells))
+        for idx, column in enumerate(columns)
+    ]
+    lines = [columns, *cells]
+    return "\n".join(
+        "  ".join(cell.rjust(width) for cell, width in zip(line, widths))
+        for line in lines
+    )
+
+
+def _base_tracker(config, tracker_name: Optional[str]) -> Dict:
+    for tracker in config["trackers"]:
+        name, params = next(iter(tracker.items()))
+        if tracker_name is None or name == tracker_name:
+            return params
+    raise click.UsageError(f"No tracker named {tracker_name} in the config.")
+
+
+@click.command()
+@click.argument(
+    "video_file", type=click.Path(exists=True, dir_okay=False, readable=True)
+)
+@click.option(
+    "--detection-cache",
+    required=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="Directory of the detections cached by `object_tracking`.",
+)
+@click.option(
+    "--grid",
+    "grid_file",
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    help="YAML file with the `grid` of values and an optional `base` tracker.",
+)
+@click.option(
+    "--config",
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    help="Config the detections were cached with, its trackers are the base.",
+)
+@click.option(
+    "--tracker",
+    "tracker_name",
+    help="Base tracker of the config, by default the first one.",
+)
+@click.option(
+    "--ground-truth",
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    help="MOTChallenge ground truth of the video, adds the CLEAR MOT metrics.",
+)
+@click.option("--workers", type=int, help="Processes, by default one per CPU.")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Also write the table to this CSV file.",
+)
+def main(
+    video_file,
+    detection_cache,
+    grid_file,
+    config,
+    tracker_name,
+    ground_truth,
+    workers,
+    output,
+):
+    # imported here, it brings in OpenCV and the plotting code
+    from .processing import detection_cache_path
+
+    config = load_config(config) if config else load_config()
+    detections_path = detection_cache_path(video_file, config, detection_cache)
+    if not is_cached(detections_path):
+        raise click.UsageError(
+            f"No detections of {video_file} with these detection settings in "
+            f"{detection_cache}, cache them first with `object_tracking "
+            f"{video_file} --headless --detection-cache {detection_cache}`."
+        )
+    with open(grid_file, "r") as f:
+        grid_config = yaml.safe_load(f)
+    base = grid_config.get("base") or _base_tracker(config, tracker_name)
+    expanded = expand_grid(base, grid_config["grid"])
+    start_time = time.perf_counter()
+    results = sweep(
+        detections_path,
+        [tracker_config for _, tracker_config in expanded],
+        ground_truth,
+        workers,
+    )
+    logger.info(
+        "Evaluated %d configurations in %.1f s",
+        len(expanded),
+        time.perf_counter() - start_time,
+    )
+    rows = [params | metrics for (params, _), metrics in zip(expanded, results)]
+    click.echo(format_table(rows))
+    if output:
+        with open(output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(
+                    {
+                        key: value if isinstance(value, float) else _cell(value)
+                        for key, value in row.items()
+                    }
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import atexit
+import json
+import math
+import pathlib
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .object_tracking.mot import MultiObjectTracker
+from .object_tracking.track_store import NO_CLASS
+
+AVAILABLE_TRACK_EXPORTERS = {}
+
+META_FILE = "meta.json"
+
+
+def register_exporter(name: str):
+    def register(cls):
+        AVAILABLE_TRACK_EXPORTERS[name] = cls
+        return cls
+
+    return register
+
+
+class TrackExporter(ABC):
+    """Streams the tracks of one tracker to a file, frame by frame.
+
+    Records (frame, id, x1, y1, x2, y2, class, score) are buffered in
+    preallocated arrays of `buffer_size` rows and written in bulk whenever the
+    buffer is full, so memory stays constant however long the video. The buffer
+    is flushed by `close`, or at interpreter exit if `close` was not called.
+    """
+
+    extension = ""
+
+    def __init__(self, path, buffer_size: int = 4096) -> None:
+        self.path = pathlib.Path(path)
+        self.no_records = 0
+        self._frames = np.empty(buffer_size, dtype=np.int64)
+        self._ids = np.empty(buffer_size, dtype=np.int64)
+        self._boxes = np.empty((buffer_size, 4), dtype=np.float32)
+        self._classes = np.empty(buffer_size, dtype=np.int64)
+        self._scores = np.empty(buffer_size, dtype=np.float32)
+        self._no_buffered = 0
+        self._closed = False
+        self._open()
+        atexit.register(self.close)
+
+    def write(self, frame_idx: int, tracker: MultiObjectTracker) -> None:
+        ids, boxes, classes, scores = tracker.tracks()
+        start = 0
+        while start < len(ids):
+            if self._no_buffered == len(self._ids):
+                self.flush()
+            end = min(len(ids), start + len(self._ids) - self._no_buffered)
+            rows = slice(self._no_buffered, self._no_buffered + end - start)
+            self._frames[rows] = frame_idx
+            self._ids[rows] = ids[start:end]
+            self._boxes[rows] = boxes[start:end]
+            self._classes[rows] = classes[start:end]
+            self._scores[rows] = scores[start:end]
+            self._no_buffered += end - start
+            start = end
+
+    def flush(self) -> None:
+        if self._no_buffered == 0:
+            return
+        n = self._no_buffered
+        self._write_rows(
+            self._frames[:n],
+            self._ids[:n],
+            self._boxes[:n],
+            self._classes[:n],
+            self._scores[:n],
+        )
+        self.no_records += n
+        self._no_buffered = 0
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._close()
+        self._closed = True
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @abstractmethod
+    def _open(self) -> None:
+        """Create the output."""
+
+    @abstractmethod
+    def _write_rows(self, frames, ids, boxes, classes, scores) -> None:
+        """Append a block of records."""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Finish the output once the last records are written."""
+
+
+@register_exporter("mot")
+class MOTChallengeExporter(TrackExporter):
+    """MOTChallenge results: frame,id,left,top,width,height,conf,-1,-1,-1.
+
+    Frames and ids are 1-based as in the benchmark, the class is not part of
+    the format and a missing score is written as -1.
+    """
+
+    extension = ".txt"
+
+    def _open(self):
+        self._file = open(self.path, "w")
+
+    def _write_rows(self, frames, ids, boxes, classes, scores):
+        rows = np.empty((len(frames), 10))
+        rows[:, 0] = frames + 1
+        rows[:, 1] = ids + 1
+        rows[:, 2:4] = boxes[:, :2]
+        rows[:, 4:6] = boxes[:, 2:] - boxes[:, :2]
+        rows[:, 6] = np.where(np.isnan(scores), -1, scores)
+        rows[:, 7:] = -1
+        np.savetxt(
+            self._file,
+            rows,
+            fmt=["%d", "%d", "%.2f", "%.2f", "%.2f", "%.2f", "%.4f", "%d", "%d", "%d"],
+            delimiter=",",
+        )
+
+    def _close(self):
+        self._file.close()
+
+
+@register_exporter("jsonl")
+class JSONLExporter(TrackExporter):
+    """One JSON object per record, with null class and score when missing."""
+
+    extension = ".jsonl"
+
+    def _open(self):
+        self._file = open(self.path, "w")
+
+    def _write_rows(self, frames, ids, boxes, classes, scores):
+        lines = []
+        for frame_idx, id_, bbox, class_, score in zip(
+            frames.tolist(),
+            ids.tolist(),
+            boxes.round(2).tolist(),
+            classes.tolist(),
+            scores.tolist(),
+        ):
+            record = {
+                "frame": frame_idx,
+                "id": id_,
+                "bbox": bbox,
+                "class": None if class_ == NO_CLASS else class_,
+                "score": None if math.isnan(score) else round(score, 4),
+            }
+            lines.append(json.dumps(record))
+        self._file.write("\n".join(lines) + "\n")
+
+    def _close(self):
+        self._file.close()
+
+
+@register_exporter("columnar")
+class ColumnarExporter(TrackExporter):
+    """A directory with one raw binary file per column, read with `load_columns`.
+
+    Columns are appended as they come and described in meta.json on close.
+    """
+
+    COLUMNS = ("frames", "ids", "boxes", "classes", "scores")
+
+    def _open(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._files = {
+            column: open(self.path / f"{column}.bin", "wb") for column in self.COLUMNS
+        }
+
+    def _write_rows(self, frames, ids, boxes, classes, scores):
+        for column, array in zip(self.COLUMNS, (frames, ids, boxes, classes, scores)):
+            self._files[column].write(array.tobytes())
+
+    def _close(self):
+        columns = {
+            "frames": self._frames,
+            "ids": self._ids,
+            "boxes": self._boxes,
+            "classes": self._classes,
+            "scores": self._scores,
+        }
+        meta = {"no_records": self.no_records, "columns": {}}
+        for column, array in columns.items():
+            self._files[column].close()
+            meta["columns"][column] = {
+                "dtype": array.dtype.str,
+                "shape": [self.no_records, *array.shape[1:]],
+            }
+        with open(self.path / META_FILE, "w") as f:
+            json.dump(meta, f)
+
+
+def load_columns(path) -> Dict[str, np.ndarray]:
+    """Memory-map the columns written by ColumnarExporter."""
+    path = pathlib.Path(path)
+    with open(path / META_FILE, "r") as f:
+        meta = json.load(f)
+    columns = {}
+    for column, description in meta["columns"].items():
+        shape = tuple(description["shape"])
+        if shape[0] == 0:
+            columns[column] = np.empty(shape, dtype=description["dtype"])
+            continue
+        columns[column] = np.memmap(
+            path / f"{column}.bin", dtype=description["dtype"], mode="r", shape=shape
+        )
+    return columns
+
+
+def read_mot(path) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Read MOTChallenge boxes, e.g. ground truth, as {frame: (ids, xyxy boxes)}.
+
+    Frames and ids become 0-based like the exported tracks. Rows with a
+    confidence of 0, which MOTChallenge ground truth uses for ignored objects,
+    are left out.
+    """
+    rows = np.loadtxt(path, delimiter=",", ndmin=2)
+    rows = rows[rows[:, 6] != 0] if len(rows) else rows
+    if len(rows) == 0:
+        return {}
+    rows = rows[np.argsort(rows[:, 0], kind="stable")]
+    frames = rows[:, 0].astype(np.int64) - 1
+    ids = rows[:, 1].astype(np.int64) - 1
+    boxes = rows[:, 2:6].copy()
+    boxes[:, 2:] += boxes[:, :2]
+    starts = np.flatnonzero(np.diff(frames, prepend=frames[0] - 1))
+    ends = np.append(starts[1:], len(frames))
+    return {
+        int(frames[start]): (ids[start:end], boxes[start:end])
+        for start, end in zip(starts, ends)
+    }
+
+
+def export_file_name(tracker_name: str, extension: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "_", tracker_name).strip("_") + extension
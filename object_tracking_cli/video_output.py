@@ -0,0 +1,144 @@
+import logging
+import queue
+import time
+from threading import Thread
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("block", "drop")
+
+
+class VideoSink:
+    """Encodes frames with a `cv2.VideoWriter` on a background thread.
+
+    `write` copies the frame into one of `queue_size` preallocated buffers and
+    returns right away, the worker encodes the buffers in order and hands them
+    back. When every buffer is waiting for the encoder, the `block` policy makes
+    `write` wait for one, the `drop` policy drops the frame. The writer is
+    opened on the first frame, whose size all the frames must have.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        codec: str = "mp4v",
+        queue_size: int = 32,
+        policy: str = "block",
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy}, expected one of {POLICIES}")
+        if len(codec) != 4:
+            raise ValueError(f"A codec is a FourCC of 4 characters, got {codec}")
+        self.path = str(path)
+        self.fps = fps
+        self.codec = codec
+        self.queue_size = queue_size
+        self.policy = policy
+        self.no_written = 0
+        self.no_dropped = 0
+        self.encode_s = 0.0
+        self._free = queue.Queue()
+        self._pending = queue.Queue()
+        self._no_buffers = 0
+        self._error = None
+        self._start_time = time.perf_counter()
+        self._thread = Thread(target=self._encode_frames, daemon=True)
+        self._thread.start()
+
+    def write(self, frame: np.ndarray) -> bool:
+        """Queue a copy of the frame, return False if it was dropped."""
+        buffer = self._get_buffer(frame)
+        if self._error is not None:
+            raise RuntimeError(f"Encoding {self.path} failed") from self._error
+        if buffer is None:
+            self.no_dropped += 1
+            return False
+        np.copyto(buffer, frame)
+        self._pending.put(buffer)
+        return True
+
+    def close(self) -> Dict[str, float]:
+        """Encode the queued frames, release the writer and return the summary."""
+        self._pending.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"Encoding {self.path} failed") from self._error
+        summary = self.summary()
+        logger.info(
+            "Wrote %d frames to %s (%d dropped), encoding at %.1f FPS",
+            summary["frames"],
+            self.path,
+            summary["dropped"],
+            summary["encode_fps"],
+        )
+        return summary
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "frames": self.no_written,
+            "dropped": self.no_dropped,
+            "encode_s": self.encode_s,
+            "encode_fps": self.no_written / self.encode_s if self.encode_s else 0.0,
+            "wall_s": time.perf_counter() - self._start_time,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _get_buffer(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        if self._no_buffers < self.queue_size:
+            self._no_buffers += 1
+            return np.empty_like(frame)
+        if self.policy == "drop":
+            return None
+        return self._free.get()
+
+    def _encode_frames(self):
+        writer = None
+        try:
+            while (buffer := self._pending.get()) is not None:
+                start_time = time.perf_counter()
+                if writer is None:
+                    height, width = buffer.shape[:2]
+                    writer = cv2.VideoWriter(
+                        self.path,
+                        cv2.VideoWriter_fourcc(*self.codec),
+                        self.fps,
+                        (width, height),
+                    )
+                    if not writer.isOpened():
+                        raise IOError(f"Cannot open {self.path} with {self.codec}")
+                writer.write(buffer)
+                self.encode_s += time.perf_counter() - start_time
+                self.no_written += 1
+                self._free.put(buffer)
+        except Exception as error:
+            self._error = error
+            # unblock a write waiting for a buffer, it raises the error
+            self._free.put(None)
+        finally:
+            if writer is not None:
+                writer.release()
+
+
+def make_video_sink(path: str, config) -> VideoSink:
+    output = config.get("output") or {}
+    return VideoSink(
+        path,
+        config["video"]["desired_fps"],
+        codec=output.get("codec", "mp4v"),
+        queue_size=output.get("queue_size", 32),
+        policy=output.get("policy", "block"),
+    )
@@ -1,24 +1,109 @@
 import logging
 import pathlib
+import struct
 import time
-from queue import Queue
-from threading import Thread
+from threading import Condition, Thread
 
 import cv2
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 SUPPORTED_EXTENSIONS = [".mp4", ".webm"]
+IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".bmp"]
+FRAME_FILE_EXTENSION = ".frames"
+DEFAULT_FPS = 30.0
+
+# magic, no_frames, height, width, channels, fps, padded to HEADER_SIZE bytes
+FRAME_FILE_MAGIC = b"OTFRAME1"
+FRAME_FILE_HEADER = struct.Struct("<8sQIIId")
+HEADER_SIZE = 64
 
 
 class UnsupportedVideoFormat(Exception):
     pass
 
 
+class ImageSequenceCapture:
+    """Reads a directory of images in name order like a `cv2.VideoCapture`.
+
+    Only the part of the interface VideoStream uses is implemented. Frames are
+    timed at `fps`, as images carry no timestamps.
+    """
+
+    def __init__(self, directory, fps: float = DEFAULT_FPS) -> None:
+        self.paths = sorted(
+            path
+            for path in pathlib.Path(directory).iterdir()
+            if path.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        self.fps = fps
+        self._next_idx = 0
+
+    def isOpened(self) -> bool:
+        return len(self.paths) > 0
+
+    def read(self, image=None):
+        if self._next_idx >= len(self.paths):
+            return False, None
+        frame = cv2.imread(str(self.paths[self._next_idx]))
+        self._next_idx += 1
+        return frame is not None, frame
+
+    def get(self, prop_id) -> float:
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            return 1e3 * (self._next_idx - 1) / self.fps
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.paths))
+        return 0.0
+
+    def release(self) -> None:
+        pass
+
+
+def open_capture(file_path: str):
+    """A `cv2.VideoCapture` of the video, or an ImageSequenceCapture of a directory."""
+    path = pathlib.Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError("Video could not be found.")
+    if path.is_dir():
+        cap = ImageSequenceCapture(path)
+        if not cap.isOpened():
+            raise UnsupportedVideoFormat(
+                f"No images in {path}, expected one of {IMAGE_EXTENSIONS}"
+            )
+        return cap
+    if path.suffix not in SUPPORTED_EXTENSIONS:
+        raise UnsupportedVideoFormat(
+            f"Only these formats are supported: {SUPPORTED_EXTENSIONS}"
+        )
+    cap = cv2.VideoCapture(file_path)
+    assert cap.isOpened(), "The video could not be accessed for some reason"
+    return cap
+
+
 class VideoStream:
+    """Decodes frames on a background thread into a ring buffer.
+
+    Frame arrays are allocated once per slot and then refilled in place by
+    `VideoCapture.read`. The decoder blocks while the buffer is full and
+    `get_last_frame` blocks until a frame is available, both on a condition
+    variable. A returned frame is a view of its slot: it stays valid until the
+    next call to `get_last_frame`, copy it to keep it longer.
+    """
+
     def __init__(self, video_capture: cv2.VideoCapture, buffer_size: int = 128):
         self.stream = video_capture
-        self.buffer = Queue(maxsize=buffer_size)
+        self.buffer_size = buffer_size
+        # one more slot than buffered frames for the frame held by the consumer
+        self._slots = [None] * (buffer_size + 1)
+        self._timestamps_ms = [0.0] * (buffer_size + 1)
+        self._read_idx = 0
+        self._no_buffered = 0
+        self._holds_frame = False
+        self._condition = Condition()
         self.stopped = False
 
     def start(self):
@@ -28,38 +113,231 @@ class VideoStream:
 
     def stop(self):
         logger.info("Stopping gracefully")
-        self.stopped = True
+        with self._condition:
+            self.stopped = True
+            self._condition.notify_all()
         self.thread.join()
 
     def grab_frames(self):
-        while not self.stopped:
-            if self.buffer.full():
-                time.sleep(0.1)
-            else:
+        write_idx = 0
+        while True:
+            with self._condition:
+                while not self.stopped and self._no_buffered + self._holds_frame >= len(
+                    self._slots
+                ):
+                    self._condition.wait()
+                if self.stopped:
+                    break
+            slot = self._slots[write_idx]
+            if slot is None:
                 is_grabbed, frame = self.stream.read()
-                if is_grabbed:
-                    self.buffer.put(frame)
-                else:
-                    self.stopped = True
+            else:
+                is_grabbed, frame = self.stream.read(image=slot)
+            if not is_grabbed:
+                break
+            self._slots[write_idx] = frame
+            self._timestamps_ms[write_idx] = self.stream.get(cv2.CAP_PROP_POS_MSEC)
+            write_idx = (write_idx + 1) % len(self._slots)
+            with self._condition:
+                self._no_buffered += 1
+                self._condition.notify_all()
+        with self._condition:
+            self.stopped = True
+            self._condition.notify_all()
         self.stream.release()
 
     def get_last_frame(self):
-        while self.buffer.qsize() == 0:
-            if self.stopped:
-                self.stop()
-                return
-            time.sleep(0.0001)
-        return self.buffer.get()
+        frame_with_timestamp = self._get_frame()
+        if frame_with_timestamp is None:
+            return
+        return frame_with_timestamp[0]
+
+    def get_latest_frame(self, media_time_ms: float):
+        """Return the newest buffered frame due at `media_time_ms`, skipping
+        older ones.
+
+        Return (frame, timestamp_ms, no_dropped) or None at the end of the
+        stream. The frame can still be ahead of `media_time_ms` if no buffered
+        frame is due yet.
+        """
+        return self._get_frame(media_time_ms)
+
+    def _get_frame(self, media_time_ms=None):
+        with self._condition:
+            self._holds_frame = False  # the previous frame's slot can be refilled
+            self._condition.notify_all()
+            while self._no_buffered == 0 and not self.stopped:
+                self._condition.wait()
+            if self._no_buffered > 0:
+                no_dropped = 0
+                if media_time_ms is not None:
+                    no_dropped = self._drop_stale_frames(media_time_ms)
+                frame = self._slots[self._read_idx]
+                timestamp_ms = self._timestamps_ms[self._read_idx]
+                self._read_idx = (self._read_idx + 1) % len(self._slots)
+                self._no_buffered -= 1
+                self._holds_frame = True
+                return frame, timestamp_ms, no_dropped
+        self.stop()
+
+    def _drop_stale_frames(self, media_time_ms: float) -> int:
+        no_dropped = 0
+        next_idx = (self._read_idx + 1) % len(self._slots)
+        while self._no_buffered > 1 and self._timestamps_ms[next_idx] <= media_time_ms:
+            self._read_idx = next_idx
+            next_idx = (next_idx + 1) % len(self._slots)
+            self._no_buffered -= 1
+            no_dropped += 1
+        if no_dropped:
+            self._condition.notify_all()
+        return no_dropped
 
     @classmethod
-    def from_file(cls, file_path: str, buffer_size: int = 128) -> cv2.VideoCapture:
-        path = pathlib.Path(file_path)
-        if not path.exists():
-            raise FileNotFoundError("Video could not be found.")
-        if path.suffix not in SUPPORTED_EXTENSIONS:
-            raise UnsupportedVideoFormat(
-                f"Only these formats are supported: {SUPPORTED_EXTENSIONS}"
-            )
-        cap = cv2.VideoCapture(file_path)
-        assert cap.isOpened(), "The video could not be accessed for some reason"
-        return cls(cap, buffer_size)
+    def from_file(cls, file_path: str, buffer_size: int = 128) -> "VideoStream":
+        """Decode a video file, or the images of a directory in name order."""
+        return cls(open_capture(file_path), buffer_size)
+
+
+class FrameFile:
+    """Decoded frames of a clip, memory-mapped from a raw frame file.
+
+    The file is a `HEADER_SIZE` byte header followed by the (H, W, C) uint8
+    frames back to back, see `frame_cache.write_frame_file`. Indexing and
+    slicing return read-only views of the file, nothing is read until used.
+    """
+
+    def __init__(self, path) -> None:
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or not header.startswith(FRAME_FILE_MAGIC):
+            raise UnsupportedVideoFormat(f"{path} is not a frame file.")
+        _, no_frames, height, width, channels, fps = FRAME_FILE_HEADER.unpack_from(
+            header
+        )
+        self.fps = fps
+        self.frames = np.memmap(
+            path,
+            dtype=np.uint8,
+            mode="r",
+            offset=HEADER_SIZE,
+            shape=(no_frames, height, width, channels),
+        )
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, idx):
+        return self.frames[idx]
+
+    def timestamp_ms(self, frame_idx: int) -> float:
+        return 1e3 * frame_idx / self.fps
+
+
+class FrameFileStream:
+    """Plays a FrameFile with the interface of VideoStream, without decoding.
+
+    Frames are read-only views of the file that stay valid as long as the
+    stream, nothing is copied. Any frame can be reached directly, so
+    `get_latest_frame` skips stale frames without reading them.
+    """
+
+    def __init__(self, frame_file: FrameFile) -> None:
+        self.frame_file = frame_file
+        self._next_idx = 0
+        self.stopped = False
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.stopped = True
+
+    def get_last_frame(self):
+        if self._next_idx >= len(self.frame_file):
+            self.stop()
+            return
+        frame = self.frame_file[self._next_idx]
+        self._next_idx += 1
+        return frame
+
+    def get_latest_frame(self, media_time_ms: float):
+        """See `VideoStream.get_latest_frame`."""
+        if self._next_idx >= len(self.frame_file):
+            self.stop()
+            return
+        due_idx = int(media_time_ms * self.frame_file.fps / 1e3)
+        frame_idx = min(max(self._next_idx, due_idx), len(self.frame_file) - 1)
+        no_dropped = frame_idx - self._next_idx
+        self._next_idx = frame_idx + 1
+        return (
+            self.frame_file[frame_idx],
+            self.frame_file.timestamp_ms(frame_idx),
+            no_dropped,
+        )
+
+    @classmethod
+    def from_file(cls, file_path) -> "FrameFileStream":
+        if not pathlib.Path(file_path).exists():
+            raise FileNotFoundError("Frame file could not be found.")
+        return cls(FrameFile(file_path))
+
+
+def open_stream(file_path, buffer_size: int = 128):
+    """A FrameFileStream of a frame file, a decoding VideoStream otherwise."""
+    if pathlib.Path(file_path).suffix == FRAME_FILE_EXTENSION:
+        return FrameFileStream.from_file(file_path)
+    return VideoStream.from_file(str(file_path), buffer_size)
+
+
+class RealtimeClock:
+    """Plays a VideoStream in real time, always picking the newest due frame.
+
+    The media clock starts with the first frame. Frames whose successor is
+    already due are dropped, frames ahead of the clock are waited for. Call
+    `frame_done` once a frame is fully processed to measure the end-to-end
+    latency from the moment it was due.
+    """
+
+    def __init__(self, window: int = 300) -> None:
+        self.no_frames = 0
+        self.no_dropped = 0
+        self._start = None
+        self._due = None
+        self._latencies = np.zeros(window)
+
+    def next_frame(self, video_stream: VideoStream):
+        if self._start is None:
+            self._start = time.perf_counter()
+        media_time_ms = 1e3 * (time.perf_counter() - self._start)
+        latest = video_stream.get_latest_frame(media_time_ms)
+        if latest is None:
+            return
+        frame, timestamp_ms, no_dropped = latest
+        self.no_dropped += no_dropped
+        self._due = self._start + timestamp_ms / 1e3
+        time.sleep(max(0, self._due - time.perf_counter()))
+        return frame
+
+    def frame_done(self) -> float:
+        if self._due is None:
+            return 0.0  # no frame went through `next_frame`
+        latency = time.perf_counter() - self._due
+        self._latencies[self.no_frames % len(self._latencies)] = latency
+        self.no_frames += 1
+        return latency
+
+    def summary(self):
+        latencies = self._latencies[: min(self.no_frames, len(self._latencies))]
+        if len(latencies) == 0:
+            latencies = np.zeros(1)
+        p50, p95, p99 = np.percentile(latencies, (50, 95, 99)).tolist()
+        no_source_frames = self.no_frames + self.no_dropped
+        return {
+            "frames": self.no_frames,
+            "dropped": self.no_dropped,
+            "drop_rate": self.no_dropped / max(no_source_frames, 1),
+            "latency_p50_ms": 1e3 * p50,
+            "latency_p95_ms": 1e3 * p95,
+            "latency_p99_ms": 1e3 * p99,
+            "jitter_ms": 1e3 * float(latencies.std()),
+        }
@@ -22,3 +22,25 @@ def make_test_video():
         out.write(frame)
     out.release()
     cv2.destroyAllWindows()
+
+
+class FakeDetector:
+    """Finds the same box on every frame, registered in place of a real detector.
+
+    Every instance is appended to `instances` and records its batch sizes.
+    """
+
+    class_id_to_name = {0: "person"}
+    batch_size = 1
+    instances = []
+
+    def __init__(self, **_):
+        self.batch_sizes = []
+        FakeDetector.instances.append(self)
+
+    def predict(self, frame):
+        return self.predict_batch([frame])[0]
+
+    def predict_batch(self, frames):
+        self.batch_sizes.append(len(frames))
+        return [[(10, 10, 50, 50, 0, 0.9)] for _ in frames]
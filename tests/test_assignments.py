@@ -1,10 +1,13 @@
 import numpy as np
 import pytest
+from scipy.optimize import linear_sum_assignment
 
 from object_tracking_cli.object_tracking.assignment import (
     greedy_assignment,
     hungarian_assignment,
+    jv_assignment,
 )
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
 
 
 @pytest.fixture(scope="module")
@@ -47,3 +50,73 @@ def test_hungarian_on_missing_row():
     cost_matrix = np.array([[1, 2, 3], [4, 5, 6]])
     assignment = hungarian_assignment(cost_matrix)
     assert assignment == {0: 0}
+
+
+def _clipped_cost(cost_matrix, assignment, th):
+    """Cost of the assignment with unmatched pairs counted at th."""
+    n_unmatched = min(cost_matrix.shape) - len(assignment)
+    matched_cost = sum(cost_matrix[row, col] for col, row in assignment.items())
+    return matched_cost + (n_unmatched * th if n_unmatched else 0.0)
+
+
+def test_jv_on_global_problem(global_problem):
+    assert jv_assignment(global_problem, th=100) == {0: 0, 1: 1}
+
+
+def test_jv_leaves_pairs_at_threshold_apart():
+    cost_matrix = np.array([[0.2, 1.0, 1.0], [1.0, 1.0, 0.5]])
+    assert jv_assignment(cost_matrix) == {0: 0, 2: 1}
+    assert jv_assignment(cost_matrix, th=0.5) == {0: 0}
+    assert jv_assignment(np.zeros((0, 2))) == {}
+
+
+@pytest.mark.parametrize("warm_start", [False, True])
+def test_jv_is_optimal_on_rectangular_problems(warm_start):
+    rng = np.random.default_rng(0)
+    for case in range(200):
+        n_rows, n_cols = rng.integers(1, 20, 2)
+        cost_matrix = rng.random((n_rows, n_cols))
+        if case % 2:
+            cost_matrix = np.round(cost_matrix * 4) / 4  # ties
+        th = 0.8
+        row_prices = rng.normal(size=n_rows)
+        assignment = jv_assignment(cost_matrix, th, warm_start, row_prices)
+        clipped = np.minimum(cost_matrix, th)
+        rows, cols = linear_sum_assignment(clipped)
+        assert _clipped_cost(cost_matrix, assignment, th) == pytest.approx(
+            clipped[rows, cols].sum()
+        )
+        assert all(cost_matrix[row, col] < th for col, row in assignment.items())
+        assert list(assignment.values()) == sorted(assignment.values())
+
+
+@pytest.mark.parametrize("gating", [None, {"max_distance": 100}])
+def test_warm_started_tracker_follows_cold_one(gating):
+    config = {
+        "max_missing_frames": 2,
+        "cost_matrix_func": {"iou_cost_matrix": None},
+        "motion_model_cls": {"BatchedKFCentroidVelocityModel": None},
+    }
+    if gating is not None:
+        config["gating"] = gating
+    trackers = [
+        MultiObjectTracker.from_config(
+            config
+            | {"assignment_func": {"jv_assignment": {"th": 0.9, "warm_start": warm}}}
+        )
+        for warm in (False, True)
+    ]
+    rng = np.random.default_rng(1)
+    starts = rng.uniform(0, 500, (15, 2))
+    for t in range(20):
+        visible = rng.random(len(starts)) > 0.1
+        bboxes = [
+            (x + 3 * t, y + 2 * t, x + 3 * t + 40, y + 2 * t + 40, 0, 0.9)
+            for x, y in starts[visible]
+        ]
+        for tracker in trackers:
+            tracker.update(bboxes)
+        cold, warm = (tracker.tracks() for tracker in trackers)
+        np.testing.assert_array_equal(cold[0], warm[0])
+        np.testing.assert_allclose(cold[1], warm[1])
+    assert trackers[1]._takes_prices
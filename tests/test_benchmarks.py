@@ -0,0 +1,61 @@
+import numpy as np
+
+from benchmarks import bench_keyframes, bench_startup
+from benchmarks.bench_tracking import compare, run
+from benchmarks.metrics import ClearMOT
+from benchmarks.scene import SyntheticScene
+
+
+def test_synthetic_scene_is_reproducible():
+    frames_1 = list(SyntheticScene(50, seed=3).frames(10))
+    frames_2 = list(SyntheticScene(50, seed=3).frames(10))
+    assert frames_1 == frames_2
+
+
+def test_synthetic_scene_population():
+    scene = SyntheticScene(100, death_rate=0.0, occlusion_rate=0.0)
+    for detections, ids in scene.frames(5):
+        assert len(detections) == len(ids) == 100
+        for x1, y1, x2, y2, _, _ in detections:
+            assert x1 < x2 and y1 < y2
+
+
+def test_benchmark_covers_registered_components():
+    results = run(counts=[5], n_frames=3)
+    assert "cost_matrix/iou_cost_matrix/n=5" in results
+    assert (
+        "tracker_update/iou_cost_matrix+hungarian_assignment"
+        "+BatchedKFCentroidVelocityModel/n=5" in results
+    )
+    assert compare(results, results, tolerance=1.0) == []
+    slower = {key: 2 * seconds for key, seconds in results.items()}
+    assert len(compare(slower, results, tolerance=1.5)) == len(results)
+
+
+def test_clear_mot_on_perfect_tracks():
+    metrics = ClearMOT()
+    boxes = np.array([[0, 0, 10, 10], [20, 20, 30, 30]])
+    metrics.update(boxes, [7, 8], boxes, [1, 2])
+    metrics.update(boxes, [7, 8], boxes[::-1], [2, 1])
+    assert metrics.summary() == {
+        "mota": 1.0,
+        "motp": 1.0,
+        "recall": 1.0,
+        "precision": 1.0,
+        "id_switches": 0,
+    }
+    metrics.update(boxes, [7, 8], boxes, [2, 1])
+    assert metrics.summary()["id_switches"] == 2
+
+
+def test_keyframe_benchmark_detects_less_often():
+    results = bench_keyframes.run(intervals=[1, 4], n_objects=5, n_frames=8)
+    key = "BatchedKFCentroidVelocityModel/interval={}"
+    assert results[key.format(1)]["detection_rate"] == 1.0
+    assert results[key.format(4)]["detection_rate"] == 0.25
+
+
+def test_startup_benchmark_times_help_and_import():
+    results = bench_startup.run(repeat=1)
+    assert set(results) == {"help", "import"}
+    assert all(seconds > 0 for seconds in results.values())
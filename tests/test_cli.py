@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+from object_tracking_cli.cli import cli
+
+HEAVY_MODULES = ("cv2", "seaborn", "torch", "ultralytics")
+
+
+def test_help_does_not_import_heavy_dependencies():
+    code = (
+        "import sys\n"
+        "import object_tracking_cli.cli\n"
+        f"print(*[module for module in {HEAVY_MODULES} if module in sys.modules])\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    assert output.strip() == ""
+
+
+def test_help():
+    result = CliRunner().invoke(cli, ["--help"])
+    assert result.exit_code == 0
+    assert "--headless" in result.output
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from object_tracking_cli.object_tracking.cost_matrix import (
+    diou_cost_matrix,
+    giou_cost_matrix,
+    iou_cost_matrix,
+)
+from object_tracking_cli.object_tracking.utils.bbox import iou
+
+
+def _random_bboxes(rng, n):
+    x1 = rng.integers(0, 500, n)
+    y1 = rng.integers(0, 500, n)
+    # a degenerate box has no area, so not even a zero cost with itself
+    w = rng.integers(1, 100, n)
+    h = rng.integers(1, 100, n)
+    return [
+        (int(x), int(y), int(x + w_), int(y + h_), 0, 0.9)
+        for x, y, w_, h_ in zip(x1, y1, w, h)
+    ]
+
+
+@pytest.fixture(scope="module")
+def bboxes_pair():
+    rng = np.random.default_rng(0)
+    return _random_bboxes(rng, 30), _random_bboxes(rng, 40)
+
+
+def test_iou_cost_matrix_matches_scalar_iou(bboxes_pair):
+    bboxes, registered_bboxes = bboxes_pair
+    cost_matrix = iou_cost_matrix(bboxes, registered_bboxes)
+    expected = np.array(
+        [[1.0 - iou(bbox1, bbox2) for bbox2 in bboxes] for bbox1 in registered_bboxes]
+    )
+    assert cost_matrix.shape == (len(registered_bboxes), len(bboxes))
+    assert np.array_equal(cost_matrix, expected)
+
+
+@pytest.mark.parametrize("cost_matrix_func", [giou_cost_matrix, diou_cost_matrix])
+def test_iou_variants_are_normalized(bboxes_pair, cost_matrix_func):
+    bboxes, registered_bboxes = bboxes_pair
+    cost_matrix = cost_matrix_func(bboxes, registered_bboxes)
+    assert cost_matrix.shape == (len(registered_bboxes), len(bboxes))
+    assert np.all(cost_matrix >= 0.0) and np.all(cost_matrix <= 1.0)
+    assert np.allclose(np.diag(cost_matrix_func(bboxes, bboxes)), 0.0)
+
+
+def test_iou_cost_matrix_empty():
+    bboxes = [(0, 0, 10, 10, 0, 0.9)]
+    assert iou_cost_matrix([], bboxes).shape == (1, 0)
+    assert iou_cost_matrix(bboxes, []).shape == (0, 1)
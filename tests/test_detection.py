@@ -0,0 +1,98 @@
+import pathlib
+
+import numpy as np
+import pytest
+import torch
+import ultralytics
+from ultralytics.engine.results import Boxes
+
+from object_tracking_cli.object_detection import detection
+from object_tracking_cli.object_detection.detection import (
+    ONNXDetector,
+    YOLODetector,
+    detector_params,
+    export_onnx,
+)
+from object_tracking_cli.object_detection.preprocessing import PreprocessedFrame
+
+
+def _per_box_to_tuple(bbox):
+    x1, y1, x2, y2 = bbox.xyxy.numpy()[0]
+    class_ = bbox.cls.numpy()[0]
+    score = bbox.conf.numpy()[0]
+    return (int(x1), int(y1), int(x2), int(y2), int(class_), score)
+
+
+def test_bulk_conversion_matches_per_box_conversion():
+    torch.manual_seed(0)
+    xy = torch.rand(20, 2) * 500
+    wh = torch.rand(20, 2) * 100
+    conf = torch.rand(20, 1)
+    cls = torch.randint(0, 80, (20, 1)).float()
+    boxes = Boxes(torch.cat((xy, xy + wh, conf, cls), dim=1), (640, 640))
+    detector = YOLODetector.__new__(YOLODetector)
+    bboxes = detector._yolo_bboxes_to_bboxes_xyxy_with_classes_and_scores(boxes)
+    assert bboxes == [_per_box_to_tuple(bbox) for bbox in boxes]
+    assert detector._yolo_bboxes_to_bboxes_xyxy_with_classes_and_scores(boxes[:0]) == []
+
+
+def test_detector_params_merge_the_backend_section():
+    detection_config = {
+        "backend": "onnx",
+        "conf": 0.5,
+        "imgsz": 320,
+        "onnx": {"quantize": True, "intra_op_threads": 2},
+    }
+    assert detector_params(detection_config) == (
+        "onnx",
+        {"conf": 0.5, "imgsz": 320, "quantize": True, "intra_op_threads": 2},
+    )
+    assert detector_params({"conf": 0.5, "onnx": None})[0] == "ultralytics"
+    with pytest.raises(ValueError):
+        detector_params({"backend": "tensorrt"})
+
+
+def test_onnx_decode_applies_per_class_nms_and_maps_boxes():
+    detector = ONNXDetector.__new__(ONNXDetector)
+    detector.conf, detector.iou, detector.max_det = 0.3, 0.5, 300
+    # (cx, cy, w, h, score class 0, score class 1) per anchor
+    anchors = np.array(
+        [
+            [50, 50, 20, 20, 0.9, 0.0],
+            [51, 50, 20, 20, 0.8, 0.0],  # overlaps the first, same class
+            [51, 50, 20, 20, 0.0, 0.7],  # overlaps the first, other class
+            [150, 100, 40, 20, 0.1, 0.2],  # below conf
+        ],
+        dtype=np.float32,
+    )
+    frame = PreprocessedFrame(None, 2.0, (0, 16), (400, 200))
+    bboxes = detector._decode(anchors.T, frame)
+    assert [bbox[:5] for bbox in bboxes] == [
+        (20, 12, 30, 22, 0),
+        (20, 12, 30, 22, 1),
+    ]
+    np.testing.assert_allclose([bbox[5] for bbox in bboxes], [0.9, 0.7])
+
+
+def test_onnx_export_goes_to_the_cache_directory(monkeypatch, tmp_path):
+    exported = []
+
+    class FakeYOLO:
+        def __init__(self, weights):
+            self.weights = pathlib.Path(weights)
+
+        def export(self, format, **_):
+            # like Ultralytics, write next to the .pt file
+            path = self.weights.with_suffix(f".{format}")
+            path.write_bytes(b"onnx")
+            exported.append(path)
+
+    bundled_weights = tmp_path / "package" / "yolov3-tinyu.pt"
+    bundled_weights.parent.mkdir()
+    bundled_weights.write_bytes(b"pt")
+    monkeypatch.setattr(detection, "DEFAULT_WEIGHTS", bundled_weights)
+    monkeypatch.setattr(ultralytics, "YOLO", FakeYOLO)
+    for _ in range(2):
+        weights = export_onnx(directory=tmp_path / "cache")
+    assert exported == [weights] and weights.parent == tmp_path / "cache"
+    assert not list(bundled_weights.parent.glob("*.onnx"))
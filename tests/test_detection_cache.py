@@ -0,0 +1,59 @@
+import numpy as np
+
+from object_tracking_cli.object_detection.cache import (
+    CachedDetector,
+    DetectionRecorder,
+    detection_cache_key,
+    is_cached,
+)
+
+
+class FakeDetector:
+    class_id_to_name = {0: "person", 1: "car"}
+    batch_size = 1
+
+    def __init__(self, detections):
+        self._detections = iter(detections)
+
+    @property
+    def available_classes(self):
+        return self.class_id_to_name.values()
+
+    def predict(self, frame):
+        return next(self._detections)
+
+
+def test_recorded_detections_are_replayed(tmp_path):
+    detections = [
+        [(1, 2, 3, 4, 0, np.float32(0.5)), (5, 6, 7, 8, 1, np.float32(0.75))],
+        [],
+        [(9, 10, 11, 12, 1, np.float32(0.25))],
+    ]
+    path = tmp_path / "cache"
+    recorder = DetectionRecorder(FakeDetector(detections), path)
+    for _ in detections:
+        recorder.predict(None)
+    assert not is_cached(path)
+    recorder.finish()
+    assert is_cached(path)
+
+    cached_detector = CachedDetector(path)
+    assert len(cached_detector) == len(detections)
+    assert cached_detector.class_id_to_name == FakeDetector.class_id_to_name
+    assert [cached_detector.predict(None) for _ in detections] == detections
+    assert cached_detector.detections(2) == detections[2]
+
+
+def test_cache_key_depends_on_content_and_settings(tmp_path):
+    video_1 = tmp_path / "video_1.mp4"
+    video_2 = tmp_path / "video_2.mp4"
+    video_1.write_bytes(b"a")
+    video_2.write_bytes(b"b")
+    weights = tmp_path / "weights.pt"
+    settings = {"conf": 0.5, "iou": 0.5}
+    key = detection_cache_key(video_1, weights, settings)
+    assert key == detection_cache_key(video_1, weights, dict(settings))
+    assert key != detection_cache_key(video_2, weights, settings)
+    assert key != detection_cache_key(video_1, weights, settings | {"conf": 0.3})
+    weights.write_bytes(b"weights")
+    assert key != detection_cache_key(video_1, weights, settings)
@@ -0,0 +1,104 @@
+import socket
+from threading import Thread
+
+import numpy as np
+import pytest
+
+from object_tracking_cli.object_detection.detection import (
+    AVAILABLE_DETECTORS,
+    Detector,
+    make_object_detector,
+)
+from object_tracking_cli.object_detection.server import (
+    DetectorServer,
+    RemoteDetector,
+    parse_address,
+)
+from object_tracking_cli.processing import finish_detector
+
+AUTHKEY = b"test"
+
+
+class FakeDetector(Detector):
+    no_loads = 0
+
+    def __init__(self, conf=0.3, batch_size=1, imgsz=64):
+        FakeDetector.no_loads += 1
+        self.conf = conf
+        self.class_id_to_name = {0: "person"}
+        self.batch_size = batch_size
+        self.imgsz = imgsz
+        self.stride = 32
+
+    def predict_batch(self, frames):
+        if self.conf > 1:
+            raise ValueError("conf above 1")
+        return [[(0, 0, *frame.display_size, 0, self.conf)] for frame in frames]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setitem(AVAILABLE_DETECTORS, "fake", FakeDetector)
+    FakeDetector.no_loads = 0
+    server = DetectorServer("localhost:0", authkey=AUTHKEY)
+    thread = Thread(target=server.serve_forever)
+    thread.start()
+    yield "%s:%d" % server.address
+    server.close()
+    thread.join()
+
+
+def test_parse_address():
+    assert parse_address("localhost:7355") == ("localhost", 7355)
+    assert parse_address("/tmp/detector.sock") == "/tmp/detector.sock"
+
+
+def test_remote_detector_reuses_the_loaded_detector(server):
+    frame = np.zeros((48, 80, 3), dtype=np.uint8)
+    for _ in range(2):
+        detector = RemoteDetector(server, "fake", {"conf": 0.5}, authkey=AUTHKEY)
+        assert detector.class_id_to_name == {0: "person"}
+        assert detector.predict(frame) == [(0, 0, 80, 48, 0, 0.5)]
+        assert (
+            detector.predict_batch([detector.preprocess(frame, 40)] * 2)
+            == [[(0, 0, 40, 24, 0, 0.5)]] * 2
+        )
+        detector.close()
+    assert FakeDetector.no_loads == 1
+    RemoteDetector(server, "fake", {"conf": 0.6}, authkey=AUTHKEY).close()
+    assert FakeDetector.no_loads == 2
+
+
+def test_remote_errors_are_raised(server):
+    detector = RemoteDetector(server, "fake", {"conf": 2}, authkey=AUTHKEY)
+    with pytest.raises(RuntimeError, match="conf above 1"):
+        detector.predict(np.zeros((48, 80, 3), dtype=np.uint8))
+    with pytest.raises(RuntimeError, match="unexpected keyword"):
+        RemoteDetector(server, "fake", {"iou": 0.5}, authkey=AUTHKEY)
+
+
+def test_detector_is_loaded_locally_without_a_server(monkeypatch):
+    monkeypatch.setitem(AVAILABLE_DETECTORS, "fake", FakeDetector)
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        port = sock.getsockname()[1]
+    detector = make_object_detector(
+        {"backend": "fake", "conf": 0.5, "server": f"localhost:{port}"}
+    )
+    assert isinstance(detector, FakeDetector) and detector.conf == 0.5
+
+
+def test_detector_is_loaded_locally_with_the_wrong_key(server, monkeypatch):
+    monkeypatch.setattr(
+        "object_tracking_cli.object_detection.server.load_authkey", lambda: b"wrong"
+    )
+    detector = make_object_detector({"backend": "fake", "conf": 0.5, "server": server})
+    assert isinstance(detector, FakeDetector)
+    # the server rejected the connection and still serves the right key
+    RemoteDetector(server, "fake", {"conf": 0.5}, authkey=AUTHKEY).close()
+
+
+def test_finishing_the_video_closes_the_connection(server):
+    detector = RemoteDetector(server, "fake", {"conf": 0.5}, authkey=AUTHKEY)
+    finish_detector(detector)
+    assert detector._connection.closed
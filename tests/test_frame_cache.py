@@ -0,0 +1,105 @@
+import pathlib
+
+import cv2
+import numpy as np
+import pytest
+
+from object_tracking_cli import processing
+from object_tracking_cli.cli import load_config
+from object_tracking_cli.frame_cache import cached_frame_file, write_frame_file
+from object_tracking_cli.object_detection.detection import AVAILABLE_DETECTORS
+from object_tracking_cli.utils.image_utils import resize_with_aspect_ratio
+from object_tracking_cli.video_streaming import (
+    FrameFile,
+    FrameFileStream,
+    UnsupportedVideoFormat,
+    VideoStream,
+)
+from tests.setup import DURATION, FPS, VALID_VIDEO, FakeDetector, make_test_video
+
+
+@pytest.fixture(scope="module")
+def decoded_frames():
+    if not pathlib.Path(VALID_VIDEO).exists():
+        make_test_video()
+    cap = cv2.VideoCapture(VALID_VIDEO)
+    frames = []
+    while True:
+        is_grabbed, frame = cap.read()
+        if not is_grabbed:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_frame_file_holds_the_resized_frames(tmp_path, decoded_frames):
+    frame_file = write_frame_file(VALID_VIDEO, tmp_path / "clip.frames", 160)
+    assert len(frame_file) == DURATION * FPS
+    assert frame_file.fps == pytest.approx(FPS)
+    for idx in (0, 31, len(frame_file) - 1):
+        expected = resize_with_aspect_ratio(decoded_frames[idx], target_width=160)
+        np.testing.assert_array_equal(frame_file[idx], expected)
+    # slices are views of the mapped file
+    assert np.shares_memory(frame_file[10:20], frame_file.frames)
+    assert not frame_file[0].flags.writeable
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_not_a_frame_file(tmp_path):
+    path = tmp_path / "clip.frames"
+    path.write_bytes(b"not frames")
+    with pytest.raises(UnsupportedVideoFormat):
+        FrameFile(path)
+
+
+def test_latest_frame_skips_stale_frames(tmp_path):
+    stream = FrameFileStream(write_frame_file(VALID_VIDEO, tmp_path / "clip.frames"))
+    _, timestamp_ms, no_dropped = stream.get_latest_frame(0.0)
+    assert (timestamp_ms, no_dropped) == (0.0, 0)
+    _, timestamp_ms, no_dropped = stream.get_latest_frame(1e3 * 10.5 / FPS)
+    assert timestamp_ms == pytest.approx(1e3 * 10 / FPS) and no_dropped == 9
+    # a frame ahead of the clock is still returned, never one behind
+    _, timestamp_ms, no_dropped = stream.get_latest_frame(0.0)
+    assert timestamp_ms == pytest.approx(1e3 * 11 / FPS) and no_dropped == 0
+    assert stream.get_latest_frame(1e9)[2] == DURATION * FPS - 13
+    assert stream.get_latest_frame(1e9) is None and stream.stopped
+
+
+def test_image_directory_streams_like_a_video(tmp_path, decoded_frames):
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    for idx, frame in enumerate(decoded_frames[:12]):
+        cv2.imwrite(str(image_dir / f"{idx:04d}.png"), frame)
+    video_stream = VideoStream.from_file(str(image_dir), buffer_size=4)
+    video_stream.start()
+    for expected in decoded_frames[:12]:
+        np.testing.assert_array_equal(video_stream.get_last_frame(), expected)
+    assert video_stream.get_last_frame() is None
+    frame_file = write_frame_file(image_dir, tmp_path / "images.frames")
+    assert len(frame_file) == 12 and frame_file.fps == 30.0
+    empty_dir = tmp_path / "empty"
+    empty_dir.mkdir()
+    with pytest.raises(UnsupportedVideoFormat):
+        VideoStream.from_file(str(empty_dir))
+
+
+def test_frames_are_decoded_once(monkeypatch, tmp_path):
+    if not pathlib.Path(VALID_VIDEO).exists():
+        make_test_video()
+    FakeDetector.instances = []
+    monkeypatch.setitem(AVAILABLE_DETECTORS, "ultralytics", FakeDetector)
+    config = load_config()
+    config["video"]["frame_cache"] = str(tmp_path / "frames")
+    output_path = tmp_path / "output.mp4"
+    stats = processing.process_video_headless(
+        VALID_VIDEO, config, output_path=str(output_path)
+    )
+    assert stats["frames"] == DURATION * FPS
+    (path,) = (tmp_path / "frames").iterdir()
+    modified = path.stat().st_mtime_ns
+    assert cached_frame_file(VALID_VIDEO, 800, tmp_path / "frames") == path
+    stats = processing.process_video_headless(VALID_VIDEO, config)
+    assert stats["frames"] == DURATION * FPS
+    assert path.stat().st_mtime_ns == modified
+    assert output_path.exists()
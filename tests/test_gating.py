@@ -0,0 +1,95 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from object_tracking_cli.object_tracking.assignment import (
+    greedy_assignment,
+    hungarian_assignment,
+)
+from object_tracking_cli.object_tracking.cost_matrix import iou_cost_matrix
+from object_tracking_cli.object_tracking.gating import Gating, grid_candidate_pairs
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+
+
+@pytest.fixture(scope="module")
+def scene():
+    rng = np.random.default_rng(0)
+    n = 200
+    xy = rng.uniform(0, 2000, (n, 2))
+    wh = rng.uniform(20, 60, (n, 2))
+    classes = rng.integers(0, 3, n)
+    registered_bboxes = [
+        (x, y, x + w, y + h, int(class_), 0.9)
+        for (x, y), (w, h), class_ in zip(xy, wh, classes)
+    ]
+    shifts = rng.normal(0, 3, (n, 2))
+    bboxes = [
+        (x1 + dx, y1 + dy, x2 + dx, y2 + dy, class_, score)
+        for (x1, y1, x2, y2, class_, score), (dx, dy) in zip(registered_bboxes, shifts)
+    ]
+    bboxes = [bboxes[idx] for idx in rng.permutation(n)]
+    return bboxes, registered_bboxes
+
+
+def test_grid_candidate_pairs_match_brute_force():
+    rng = np.random.default_rng(1)
+    centroids = rng.uniform(-500, 500, (300, 2))
+    registered_centroids = rng.uniform(-500, 500, (200, 2))
+    rows, cols = grid_candidate_pairs(centroids, registered_centroids, 50.0)
+    distances = np.linalg.norm(
+        registered_centroids[:, None] - centroids[None, :], axis=-1
+    )
+    expected = set(zip(*np.nonzero(distances <= 50.0)))
+    assert set(zip(rows.tolist(), cols.tolist())) == expected
+
+
+@pytest.mark.parametrize(
+    "assignment_func", [greedy_assignment, partial(hungarian_assignment, th=0.9)]
+)
+@pytest.mark.parametrize("n_workers", [1, 4])
+def test_gated_association_matches_dense(scene, assignment_func, n_workers):
+    bboxes, registered_bboxes = scene
+    dense = assignment_func(iou_cost_matrix(bboxes, registered_bboxes))
+    with Gating(max_distance=100, n_workers=n_workers) as gating:
+        gated = gating.associate(
+            bboxes, registered_bboxes, iou_cost_matrix, assignment_func
+        )
+        threads = set() if n_workers == 1 else set(gating._executor._threads)
+    assert {int(k): int(v) for k, v in gated.items()} == {
+        int(k): int(v) for k, v in dense.items()
+    }
+    assert gating._executor is None
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_closing_the_tracker_shuts_down_the_gating_workers(scene):
+    bboxes, _ = scene
+    tracker = MultiObjectTracker.from_config(
+        {
+            "max_missing_frames": 3,
+            "cost_matrix_func": {"iou_cost_matrix": None},
+            "assignment_func": {"hungarian_assignment": {"th": 0.9}},
+            "motion_model_cls": {"MotionAgnosticModel": None},
+            "gating": {"n_workers": 2},
+        }
+    )
+    tracker.update(bboxes)
+    tracker.update(bboxes)
+    threads = set(tracker.gating._executor._threads)
+    tracker.close()
+    assert threads and not any(thread.is_alive() for thread in threads)
+
+
+def test_class_gate():
+    registered_bboxes = [(0, 0, 10, 10, 0, 0.9)]
+    bboxes = [(0, 0, 10, 10, 1, 0.9)]
+    assignment_func = partial(hungarian_assignment, th=0.9)
+    gated = Gating(match_classes=True).associate(
+        bboxes, registered_bboxes, iou_cost_matrix, assignment_func
+    )
+    assert gated == {}
+    ungated = Gating(match_classes=False).associate(
+        bboxes, registered_bboxes, iou_cost_matrix, assignment_func
+    )
+    assert ungated == {0: 0}
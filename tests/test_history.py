@@ -0,0 +1,132 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from object_tracking_cli.object_tracking.assignment import (
+    greedy_assignment,
+    hungarian_assignment,
+)
+from object_tracking_cli.object_tracking.cost_matrix import iou_cost_matrix
+from object_tracking_cli.object_tracking.history import LostTrackPool, TrajectoryStore
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+from object_tracking_cli.object_tracking.motion_model import (
+    BatchedKFCentroidVelocityModel,
+    MotionAgnosticModel,
+)
+from object_tracking_cli.plotting import plot_tracking
+
+
+def _box(x):
+    return np.array([[x, 0, x + 10, 10]], dtype=float)
+
+
+def test_ring_buffer_keeps_the_last_boxes_in_order():
+    store = TrajectoryStore(length=4)
+    for frame_idx in range(6):
+        store.record(frame_idx, np.array([7]), _box(frame_idx))
+    trajectory = store.trajectory(7)
+    np.testing.assert_array_equal(trajectory[:, 0], [2, 3, 4, 5])
+    assert np.shares_memory(trajectory, store._boxes)
+    windows, counts = store.trajectories([7, 8])
+    np.testing.assert_array_equal(windows[0, :, 0], [2, 3, 4, 5])
+    np.testing.assert_array_equal(counts, [4, 0])
+    assert len(store.trajectory(8)) == 0
+
+
+@pytest.mark.parametrize("eviction, evicted", [("lru", 1), ("oldest", 0)])
+def test_full_store_evicts_a_track_not_being_recorded(eviction, evicted):
+    store = TrajectoryStore(length=2, capacity=2, eviction=eviction)
+    store.record(0, np.array([0]), _box(0))
+    store.record(1, np.array([0, 1]), np.concatenate((_box(1), _box(1))))
+    store.record(2, np.array([0]), _box(2))
+    # track 0 seen first and last, neither is recorded on frame 3
+    store.record(3, np.array([2]), _box(3))
+    assert 2 in store and evicted not in store and 1 - evicted in store
+    # recorded tracks are never evicted, the extra one has no history
+    store.record(4, np.array([2, 1 - evicted, 3]), np.repeat(_box(4), 3, axis=0))
+    assert 3 not in store and len(store) == 2
+
+
+def test_memory_cap_lowers_the_capacity():
+    store = TrajectoryStore(length=32, capacity=10_000, max_memory_mb=1)
+    assert store.capacity < 10_000
+    assert store.nbytes <= 2**20
+
+
+@pytest.mark.parametrize("eviction, kept", [("lru", [0, 2]), ("oldest", [1, 2])])
+def test_full_pool_evicts_by_policy(eviction, kept):
+    pool = LostTrackPool(capacity=2, eviction=eviction)
+    # (id, first seen, last seen)
+    for id_, first_seen, last_seen in [(0, 0, 8), (1, 3, 5), (2, 9, 10)]:
+        pool.add([id_], _box(id_), [0], [0.9], [first_seen], [last_seen])
+    assert sorted(pool.ids.tolist()) == kept
+    assert pool.no_evicted == 1
+
+
+def test_pool_forgets_tracks_after_max_age():
+    pool = LostTrackPool(max_age=5)
+    pool.add(
+        [0, 1], np.concatenate((_box(0), _box(50))), [0, 0], [0.9, 0.9], [0, 0], [0, 4]
+    )
+    recovered = pool.recover(
+        8,
+        [(50, 0, 60, 10, 0, 0.9)],
+        iou_cost_matrix,
+        partial(hungarian_assignment, th=0.9),
+    )
+    assert recovered == {0: (1, 0)}
+    assert len(pool) == 0
+
+
+def test_recovery_rejects_far_away_and_other_class_detections():
+    pool = LostTrackPool(max_cost=0.9)
+    pool.add(
+        [0, 1], np.concatenate((_box(0), _box(50))), [0, 1], [0.9, 0.9], [0, 0], [4, 4]
+    )
+    bboxes = [(200, 0, 210, 10, 0, 0.9), (1, 0, 11, 10, 1, 0.9)]
+    assert pool.recover(5, bboxes, iou_cost_matrix, greedy_assignment) == {}
+    assert len(pool) == 2
+    bboxes = [(200, 0, 210, 10, 0, 0.9), (51, 0, 61, 10, None, 0.9)]
+    recovered = pool.recover(5, bboxes, iou_cost_matrix, greedy_assignment)
+    assert recovered == {1: (1, 0)}
+    assert pool.ids.tolist() == [0]
+
+
+@pytest.mark.parametrize(
+    "motion_model_cls", [MotionAgnosticModel, BatchedKFCentroidVelocityModel]
+)
+def test_lost_track_is_recovered_under_its_id(motion_model_cls):
+    tracker = MultiObjectTracker(
+        assignment_func=partial(hungarian_assignment, th=0.9),
+        cost_matrix_func=iou_cost_matrix,
+        motion_model_cls=motion_model_cls,
+        max_missing_frames=2,
+        history=TrajectoryStore(length=8),
+        lost_tracks=LostTrackPool(capacity=4),
+    )
+    bbox = (100, 100, 150, 150, 0, 0.9)
+    for _ in range(3):
+        tracker.update([bbox])
+    for _ in range(4):
+        tracker.update([])
+    assert tracker.no_objects == 0 and len(tracker.lost_tracks) == 1
+    tracker.update([(102, 100, 152, 150, 0, 0.8), (400, 400, 450, 450, 0, 0.9)])
+    assert tracker.tracks()[0].tolist() == [0, 1]
+    assert tracker.lost_tracks.no_recovered == 1
+    # the trail goes on from the frames before the track was lost
+    assert len(tracker.history.trajectory(0)) == 3 + 2 + 1
+
+
+def test_trails_are_drawn_from_the_history():
+    tracker = MultiObjectTracker(
+        assignment_func=partial(hungarian_assignment, th=0.9),
+        cost_matrix_func=iou_cost_matrix,
+        history=TrajectoryStore(length=8),
+    )
+    for t in range(5):
+        tracker.update([(10 + 10 * t, 50, 30 + 10 * t, 70, 0, 0.9)])
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    plot_tracking(frame, tracker, "")
+    # the trail runs through the centroids of the past boxes, (20, 60) to (60, 60)
+    assert frame[60, 25:55].any(axis=1).all()
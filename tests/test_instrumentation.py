@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from object_tracking_cli.instrumentation import MetricsExporter, Profiler, to_prometheus
+
+
+@pytest.fixture(scope="function")
+def profiler():
+    profiler = Profiler(window=10)
+    for ms in range(1, 21):
+        profiler.record("detect", ms / 1e3)
+    profiler.record("track", 0.5)
+    return profiler
+
+
+def test_rolling_percentiles(profiler):
+    percentiles = profiler.percentiles("detect")
+    assert percentiles[50] == pytest.approx(np.percentile(np.arange(11, 21), 50) / 1e3)
+    summary = profiler.summary()
+    assert summary["detect"]["count"] == 20
+    assert summary["detect"]["total_s"] == pytest.approx(sum(range(1, 21)) / 1e3)
+    assert summary["track"]["p99_ms"] == pytest.approx(500.0)
+
+
+def test_measure_and_lap():
+    profiler = Profiler()
+    with profiler.measure("block"):
+        pass
+    profiler.lap("lap")
+    assert set(profiler.stages) == {"block", "lap"}
+
+
+def test_jsonl_export(profiler, tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    exporter = MetricsExporter(path, fmt="jsonl", interval_s=1000)
+    assert not exporter.maybe_export(profiler)
+    assert exporter.maybe_export(profiler, force=True)
+    assert exporter.maybe_export(profiler, force=True)
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["stages"]["detect"]["count"] == 20
+
+
+def test_prometheus_export(profiler, tmp_path):
+    path = tmp_path / "metrics.prom"
+    MetricsExporter(path, fmt="prometheus").maybe_export(profiler, force=True)
+    text = path.read_text()
+    assert text == to_prometheus(profiler.summary())
+    assert 'object_tracking_stage_seconds_count{stage="detect"} 20' in text
+    assert 'object_tracking_stage_seconds{stage="track",quantile="0.5"}' in text
+
+
+def test_unsupported_export_format(tmp_path):
+    with pytest.raises(ValueError):
+        MetricsExporter(tmp_path / "metrics", fmt="xml")
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from scipy.optimize import linear_sum_assignment
+
+from object_tracking_cli.object_tracking.assignment import greedy_assignment
+from object_tracking_cli.object_tracking.utils import kernels
+
+
+def _cases(n_cases=50, seed=0):
+    rng = np.random.default_rng(seed)
+    for case in range(n_cases):
+        n_rows, n_cols = rng.integers(1, 30, 2)
+        if case % 2:
+            # few distinct costs, many ties
+            cost_matrix = rng.integers(0, 4, (n_rows, n_cols)).astype(float)
+        else:
+            cost_matrix = rng.random((n_rows, n_cols))
+        boxes = rng.uniform(-50, 2000, (n_rows, 4))
+        half_sizes = rng.integers(0, 60, (n_rows, 2)).astype(float)
+        yield cost_matrix, boxes, half_sizes
+
+
+def _assert_same_kernels(centroids, boxes_from_centroids, greedy_match):
+    for cost_matrix, boxes, half_sizes in _cases():
+        np.testing.assert_array_equal(centroids(boxes), kernels.numpy_centroids(boxes))
+        np.testing.assert_array_equal(
+            boxes_from_centroids(boxes[:, :2], half_sizes),
+            kernels.numpy_boxes_from_centroids(boxes[:, :2], half_sizes),
+        )
+        for result, expected in zip(
+            greedy_match(cost_matrix), kernels.numpy_greedy_match(cost_matrix)
+        ):
+            np.testing.assert_array_equal(result, expected)
+
+
+def test_loops_match_numpy_kernels():
+    _assert_same_kernels(
+        kernels.loop_centroids,
+        kernels.loop_boxes_from_centroids,
+        kernels.loop_greedy_match,
+    )
+
+
+def test_compiled_kernels_match_numpy_kernels():
+    numba = pytest.importorskip("numba")
+    _assert_same_kernels(
+        numba.njit(kernels.loop_centroids),
+        numba.njit(kernels.loop_boxes_from_centroids),
+        numba.njit(kernels.loop_greedy_match),
+    )
+
+
+def test_kernels_compile_on_first_call_into_the_user_cache(monkeypatch, tmp_path):
+    numba = pytest.importorskip("numba")
+    monkeypatch.setattr(numba.config, "CACHE_DIR", "")
+    monkeypatch.setattr(kernels, "CACHE_DIR", tmp_path)
+    kernel = kernels.LazyKernel(kernels.loop_centroids)
+    assert kernel.compiled is None
+    boxes = np.array([[0.0, 0.0, 10.0, 20.0], [5.0, 5.0, 7.0, 9.0]])
+    np.testing.assert_array_equal(kernel(boxes), kernels.numpy_centroids(boxes))
+    assert list((tmp_path / "numba").rglob("*.nbi"))
+
+
+def test_backend_is_reported():
+    assert kernels.BACKEND in kernels.KERNEL_BACKENDS
+
+
+def test_greedy_assignment_takes_cheapest_rows_first():
+    cost_matrix = np.array(
+        [
+            [0.5, 0.9, 0.9],
+            [0.1, 0.2, 0.9],
+            [0.9, 0.9, 0.5],
+        ]
+    )
+    # row 1 takes column 0, row 0 and row 2 (tied) want columns 0 and 2
+    assert greedy_assignment(cost_matrix) == {0: 1, 2: 2}
+    assert list(greedy_assignment(cost_matrix)) == [0, 2]
+    assert greedy_assignment(np.zeros((0, 3))) == {}
+
+
+@pytest.mark.parametrize("columns_priced", [False, True])
+def test_augmenting_paths_loop_is_optimal_from_any_prices(columns_priced):
+    rng = np.random.default_rng(2)
+    for _ in range(30):
+        n_rows = rng.integers(1, 12)
+        cost_matrix = rng.random((n_rows, n_rows + rng.integers(0, 5)))
+        u, v = rng.normal(size=cost_matrix.shape[0]), rng.normal(
+            size=cost_matrix.shape[1]
+        )
+        row_for_col = kernels.loop_shortest_augmenting_paths(
+            cost_matrix, u, v, columns_priced
+        )
+        cols = np.flatnonzero(row_for_col >= 0)
+        assert sorted(row_for_col[cols]) == list(range(n_rows))
+        rows, optimal_cols = linear_sum_assignment(cost_matrix)
+        assert cost_matrix[row_for_col[cols], cols].sum() == pytest.approx(
+            cost_matrix[rows, optimal_cols].sum()
+        )
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from object_tracking_cli.keyframes import KeyframeScheduler, make_keyframe_scheduler
+from object_tracking_cli.object_detection.cache import CachedDetector, DetectionRecorder
+from object_tracking_cli.object_tracking.cost_matrix import iou_cost_matrix
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+from object_tracking_cli.object_tracking.motion_model import (
+    BatchedKFCentroidVelocityModel,
+    KFCentroidVelocityModel,
+)
+from object_tracking_cli.processing import detect_keyframe
+
+BBOX = (10, 10, 50, 50, 0, 0.9)
+
+
+def test_keyframes_every_interval():
+    scheduler = KeyframeScheduler(interval=3)
+    keyframes = [scheduler.is_keyframe(None, {}) for _ in range(7)]
+    assert keyframes == [True, False, False, True, False, False, True]
+    assert scheduler.summary() == {
+        "frames": 7,
+        "keyframes": 3,
+        "detection_rate": 3 / 7,
+    }
+
+
+@pytest.mark.parametrize(
+    "motion_model_cls", [KFCentroidVelocityModel, BatchedKFCentroidVelocityModel]
+)
+def test_uncertain_tracks_trigger_keyframe(motion_model_cls):
+    tracker = MultiObjectTracker(
+        cost_matrix_func=iou_cost_matrix, motion_model_cls=motion_model_cls
+    )
+    trackers = {"tracker": tracker}
+    scheduler = KeyframeScheduler(interval=100, max_position_variance=50)
+    assert scheduler.is_keyframe(None, trackers)
+    for _ in range(5):
+        tracker.update([BBOX])
+    keyframes = []
+    for _ in range(30):
+        keyframes.append(scheduler.is_keyframe(None, trackers))
+        if keyframes[-1]:
+            tracker.update([BBOX])
+        else:
+            tracker.predict()
+    # the variance grows without measurements until it triggers a detection
+    assert 0 < sum(keyframes) < len(keyframes)
+
+
+def test_scene_change_triggers_keyframe():
+    scheduler = KeyframeScheduler(interval=100, scene_change_threshold=20)
+    dark = np.zeros((64, 64, 3), dtype=np.uint8)
+    bright = np.full((64, 64, 3), 200, dtype=np.uint8)
+    frames = [dark, dark, bright, bright, dark]
+    keyframes = [scheduler.is_keyframe(frame, {}) for frame in frames]
+    assert keyframes == [True, False, True, False, True]
+
+
+def test_no_scheduler_without_interval():
+    assert make_keyframe_scheduler({}) is None
+    assert make_keyframe_scheduler({"keyframes": {"interval": 1}}) is None
+    scheduler = make_keyframe_scheduler(
+        {"keyframes": {"interval": 4, "max_position_variance": None}}
+    )
+    assert scheduler.interval == 4
+
+
+class FakeDetector:
+    class_id_to_name = {0: "person"}
+    batch_size = 1
+
+    def __init__(self):
+        self.no_frames = 0
+
+    def predict(self, frame):
+        self.no_frames += 1
+        return [(self.no_frames, 0, self.no_frames + 10, 10, 0, 0.5)]
+
+
+def test_skipped_frames_keep_cached_detections_aligned(tmp_path):
+    recorder = DetectionRecorder(FakeDetector(), tmp_path / "cache")
+    expected = [recorder.predict(None) for _ in range(6)]
+    recorder.finish()
+
+    detector = CachedDetector(tmp_path / "cache")
+    scheduler = KeyframeScheduler(interval=2)
+    trackers = {"tracker": MultiObjectTracker()}
+    detections = [
+        detect_keyframe(None, detector, trackers, scheduler) for _ in range(6)
+    ]
+    assert detections[1::2] == [None] * 3
+    for cached, recorded in zip(detections[::2], expected[::2]):
+        assert [bbox[:5] for bbox in cached] == [bbox[:5] for bbox in recorded]
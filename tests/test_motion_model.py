@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from object_tracking_cli.object_tracking.motion_model import (
+    BatchedKFCentroidVelocityModel,
+    KFCentroidVelocityModel,
+)
+
+
+def _random_bbox(rng):
+    x, y = rng.integers(0, 500, 2)
+    w, h = rng.integers(5, 80, 2)
+    return (int(x), int(y), int(x + w), int(y + h), 0, 0.9)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batched_kf_matches_per_track_kf(seed):
+    rng = np.random.default_rng(seed)
+    bank = BatchedKFCentroidVelocityModel()
+    models = []
+    for _ in range(30):
+        if rng.random() < 0.3 or not models:
+            bbox = _random_bbox(rng)
+            bank.append(bbox)
+            models.append(KFCentroidVelocityModel(bbox))
+        if rng.random() < 0.1:
+            keep = rng.random(len(models)) > 0.2
+            bank.keep(keep)
+            models = [model for model, kept in zip(models, keep) if kept]
+        boxes = bank.predict()
+        expected = [model.predict_bbox()[:4] for model in models]
+        assert np.allclose(boxes, np.array(expected).reshape(-1, 4))
+        indices = np.flatnonzero(rng.random(len(models)) < 0.6)
+        measurements = [_random_bbox(rng) for _ in indices]
+        boxes = bank.update(indices, measurements)
+        expected = [
+            models[idx].update_bbox(measurement)[:4]
+            for idx, measurement in zip(indices, measurements)
+        ]
+        assert np.allclose(boxes, np.array(expected).reshape(-1, 4))
+        assert np.allclose(bank.P, np.array([model.kf.P for model in models]))
+        assert bank.no_covariance_groups <= len(models)
+
+
+def test_batched_kf_shares_covariances():
+    rng = np.random.default_rng(0)
+    bank = BatchedKFCentroidVelocityModel()
+    for _ in range(100):
+        bank.append(_random_bbox(rng))
+    for _ in range(5):
+        bank.predict()
+        bank.update(np.arange(50), [_random_bbox(rng) for _ in range(50)])
+    assert bank.no_covariance_groups == 2
@@ -11,7 +11,12 @@ from object_tracking_cli.object_tracking.cost_matrix import (
     euclidean_cost_matrix,
     iou_cost_matrix,
 )
+from object_tracking_cli.object_tracking.gating import Gating
 from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+from object_tracking_cli.object_tracking.motion_model import (
+    BatchedKFCentroidVelocityModel,
+    KFCentroidVelocityModel,
+)
 
 test_trackers = [
     (
@@ -39,6 +44,30 @@ test_trackers = [
             "cost_matrix_func": iou_cost_matrix,
         },
     ),
+    (
+        MultiObjectTracker,
+        {
+            "assignment_func": partial(hungarian_assignment, th=1.0),
+            "cost_matrix_func": euclidean_cost_matrix,
+            "motion_model_cls": KFCentroidVelocityModel,
+        },
+    ),
+    (
+        MultiObjectTracker,
+        {
+            "assignment_func": partial(hungarian_assignment, th=1.0),
+            "cost_matrix_func": euclidean_cost_matrix,
+            "motion_model_cls": BatchedKFCentroidVelocityModel,
+        },
+    ),
+    (
+        MultiObjectTracker,
+        {
+            "assignment_func": partial(hungarian_assignment, th=1.0),
+            "cost_matrix_func": iou_cost_matrix,
+            "gating": Gating(max_distance=10),
+        },
+    ),
 ]
 
 
@@ -121,3 +150,14 @@ def test_perfect_assignment(perfect_move, tracker_with_params):
         for object_id, centroid in updated_objects_centroids.items():
             _, y = centroid
             assert y == initial_centroids[object_id][1]
+
+
+def test_predict_does_not_count_missing_frames(perfect_move, tracker_with_params):
+    gen_bboxes, n_objects = perfect_move
+    tracker_class, params = tracker_with_params
+    tracker = tracker_class(**params | {"max_missing_frames": 1})
+    tracker.update(next(gen_bboxes))
+    for _ in range(5):
+        tracker.predict()
+    assert tracker.no_objects == n_objects
+    assert tracker.max_position_variance() >= 0
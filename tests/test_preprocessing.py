@@ -0,0 +1,77 @@
+import numpy as np
+
+from object_tracking_cli.object_detection.preprocessing import (
+    PAD_VALUE,
+    letterbox,
+    stack_images,
+    to_display_boxes,
+)
+from object_tracking_cli.processing import preprocess_frame
+from object_tracking_cli.utils.image_utils import resize_with_aspect_ratio
+
+
+def _frame(height=720, width=1280):
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = 255  # blue in BGR
+    return frame
+
+
+def test_letterbox_resizes_once_to_model_resolution():
+    preprocessed = letterbox(_frame(), imgsz=640, stride=32, display_width=800)
+    image = preprocessed.image
+    assert image.shape == (384, 640, 3)
+    assert preprocessed.pad == (0, 12)
+    assert preprocessed.display_size == (800, 450)
+    assert (image[:12] == PAD_VALUE).all() and (image[-12:] == PAD_VALUE).all()
+    # RGB, ready for the model
+    assert (image[12:-12] == (0, 0, 255)).all()
+
+
+def test_boxes_map_back_to_display_coordinates():
+    frame = _frame()
+    preprocessed = letterbox(frame, imgsz=640, stride=32, display_width=800)
+    display_frame = resize_with_aspect_ratio(frame, target_width=800)
+    assert preprocessed.display_size == display_frame.shape[1::-1]
+    display_boxes = np.array([[100.0, 50.0, 300.0, 400.0], [0.0, 0.0, 800.0, 450.0]])
+    pad_x, pad_y = preprocessed.pad
+    model_boxes = display_boxes * preprocessed.scale + [pad_x, pad_y, pad_x, pad_y]
+    assert np.allclose(to_display_boxes(model_boxes, preprocessed), display_boxes)
+    # boxes reaching into the padding are clipped to the frame
+    clipped = to_display_boxes(np.array([[0.0, 0.0, 700.0, 400.0]]), preprocessed)
+    assert clipped.tolist() == [[0.0, 0.0, 800.0, 450.0]]
+
+
+def test_stack_pads_smaller_images_after_the_image():
+    wide = letterbox(_frame(), imgsz=640)
+    tall = letterbox(_frame(1280, 720), imgsz=640)
+    batch = stack_images([wide, tall])
+    assert batch.shape == (2, 640, 640, 3)
+    assert np.array_equal(batch[0, : wide.image.shape[0]], wide.image)
+    assert np.array_equal(batch[1, :, : tall.image.shape[1]], tall.image)
+
+
+class _Detector:
+    def predict(self, frame):
+        return []
+
+
+def test_display_frame_only_when_rendering():
+    class Detector(_Detector):
+        def preprocess(self, frame, display_width=None):
+            return letterbox(frame, display_width=display_width)
+
+    detector_input, display_frame = preprocess_frame(
+        _frame(), Detector(), 800, render=False
+    )
+    assert display_frame is None
+    assert detector_input.display_size == (800, 450)
+    _, display_frame = preprocess_frame(_frame(), Detector(), 800)
+    assert display_frame.shape == (450, 800, 3)
+
+
+def test_detectors_without_preprocess_take_the_display_frame():
+    detector_input, display_frame = preprocess_frame(
+        _frame(), _Detector(), 800, render=False
+    )
+    assert detector_input is display_frame
+    assert display_frame.shape == (450, 800, 3)
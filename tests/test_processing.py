@@ -0,0 +1,187 @@
+import pathlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+
+from object_tracking_cli import processing
+from object_tracking_cli.cli import load_config
+from object_tracking_cli.object_detection.detection import AVAILABLE_DETECTORS
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+from object_tracking_cli.plotting import (
+    SideBySideCanvas,
+    plot_bboxes,
+    plot_frame_status,
+    plot_tracking,
+)
+from object_tracking_cli.processing import render_frame, update_trackers
+from object_tracking_cli.video_streaming import RealtimeClock
+from tests.setup import DURATION, FPS, VALID_VIDEO, FakeDetector, make_test_video
+
+CLASS_TO_COLOR_AND_NAME = {0: ((0, 255, 0), "person")}
+
+
+def _run(executor):
+    trackers = {f"tracker {idx}": MultiObjectTracker() for idx in range(3)}
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    processed_frame = None
+    for t in range(5):
+        bboxes = [(10 + t, 10, 40 + t, 40, 0, 0.9), (80, 60 + t, 100, 90 + t, 0, 0.8)]
+        update_trackers(bboxes, trackers, executor)
+        processed_frame = render_frame(
+            frame, bboxes, trackers, CLASS_TO_COLOR_AND_NAME, executor
+        )
+    return processed_frame
+
+
+def test_shared_detection_layer_matches_per_tracker_drawing():
+    trackers = {f"tracker {idx}": MultiObjectTracker() for idx in range(3)}
+    frame = np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    bboxes = [(10, 10, 40, 40, 0, 0.9), (80, 60, 100, 90, 0, 0.8)]
+    update_trackers(bboxes, trackers)
+    expected_panels = []
+    for tracker_name, tracker in trackers.items():
+        panel = frame.copy()
+        plot_bboxes(panel, bboxes, CLASS_TO_COLOR_AND_NAME)
+        plot_tracking(panel, tracker, tracker_name)
+        plot_frame_status(panel, True)
+        expected_panels.append(panel)
+    canvas = SideBySideCanvas()
+    processed_frame = render_frame(
+        frame, bboxes, trackers, CLASS_TO_COLOR_AND_NAME, detected=True, canvas=canvas
+    )
+    assert np.array_equal(processed_frame, cv2.hconcat(expected_panels))
+    # the canvas is reused for the next frames
+    assert (
+        render_frame(frame, [], trackers, CLASS_TO_COLOR_AND_NAME, canvas=canvas)
+        is processed_frame
+    )
+
+
+def test_concurrent_trackers_match_serial_trackers():
+    serial = _run(None)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        concurrent = _run(executor)
+    assert serial.shape == (120, 3 * 160, 3)
+    assert np.array_equal(serial, concurrent)
+
+
+def test_multi_stream_shares_one_batched_detector(monkeypatch, tmp_path):
+    if not pathlib.Path(VALID_VIDEO).exists():
+        make_test_video()
+    FakeDetector.instances = []
+    monkeypatch.setitem(AVAILABLE_DETECTORS, "ultralytics", FakeDetector)
+    stats = processing.process_videos(
+        [VALID_VIDEO, VALID_VIDEO],
+        load_config(),
+        headless=True,
+        output_dir=str(tmp_path),
+    )
+    assert stats["frames"] == 2 * DURATION * FPS
+    (detector,) = FakeDetector.instances
+    assert detector.batch_sizes == [2] * (DURATION * FPS)
+    assert len(list(tmp_path.glob("*.mp4"))) == 2
+
+
+def test_keyframes_skip_the_detector(monkeypatch, tmp_path):
+    if not pathlib.Path(VALID_VIDEO).exists():
+        make_test_video()
+    FakeDetector.instances = []
+    monkeypatch.setitem(AVAILABLE_DETECTORS, "ultralytics", FakeDetector)
+    config = load_config()
+    config["keyframes"] = {"interval": 3}
+    output_path = tmp_path / "output.mp4"
+    stats = processing.process_video_headless(
+        VALID_VIDEO, config, output_path=str(output_path)
+    )
+    no_frames = DURATION * FPS
+    assert stats["frames"] == no_frames
+    assert stats["keyframes_keyframes"] == -(-no_frames // 3)
+    (detector,) = FakeDetector.instances
+    assert sum(detector.batch_sizes) == stats["keyframes_keyframes"]
+    assert output_path.exists()
+
+
+def test_realtime_runs_neither_record_nor_replay_detections(monkeypatch, tmp_path):
+    if not pathlib.Path(VALID_VIDEO).exists():
+        make_test_video()
+
+    class SlowDetector(FakeDetector):
+        def predict_batch(self, frames):
+            time.sleep(0.05)  # slower than the 30 FPS source
+            return super().predict_batch(frames)
+
+    FakeDetector.instances = []
+    monkeypatch.setitem(AVAILABLE_DETECTORS, "ultralytics", SlowDetector)
+    config = load_config()
+    config["video"]["realtime"] = True
+    cache_dir = tmp_path / "detections"
+    stats = processing.process_video_headless(
+        VALID_VIDEO, config, detection_cache_dir=cache_dir
+    )
+    assert stats["realtime_dropped"] > 0
+    assert not cache_dir.exists() or not list(cache_dir.iterdir())
+    # a complete run records every frame, a realtime run does not replay them
+    config["video"]["realtime"] = False
+    stats = processing.process_video_headless(
+        VALID_VIDEO, config, detection_cache_dir=cache_dir
+    )
+    assert stats["frames"] == DURATION * FPS
+    config["video"]["realtime"] = True
+    processing.process_video_headless(
+        VALID_VIDEO, config, detection_cache_dir=cache_dir
+    )
+    assert len(FakeDetector.instances) == 3
+    replay = processing.make_detector(VALID_VIDEO, load_config(), cache_dir)
+    assert len(replay) == DURATION * FPS
+
+    # replaying without decoding has no frames to pace
+    monkeypatch.setattr(processing, "make_detector", lambda *_: replay)
+    stats = processing.process_video_headless(VALID_VIDEO, config)
+    assert stats["frames"] == DURATION * FPS
+    assert RealtimeClock().frame_done() == 0.0
+
+
+def test_class_colors_match_the_seaborn_palette():
+    sns = pytest.importorskip("seaborn")
+    class_id_to_name = {idx: str(idx) for idx in range(80)}
+    colors = [
+        color
+        for color, _ in processing.make_class_to_color_and_name(
+            class_id_to_name
+        ).values()
+    ]
+    expected = [
+        tuple(round(channel * 255) for channel in rgb)[::-1]
+        for rgb in sns.color_palette("hls", 80)
+    ]
+    assert colors == expected
+
+
+def test_tracker_executor_is_shut_down_when_processing_fails(monkeypatch):
+    if not pathlib.Path(VALID_VIDEO).exists():
+        make_test_video()
+
+    class FailingDetector(FakeDetector):
+        def predict_batch(self, frames):
+            raise RuntimeError("detector failed")
+
+    monkeypatch.setitem(AVAILABLE_DETECTORS, "ultralytics", FailingDetector)
+    config = load_config()
+    config["processing"] = None
+    assert processing.make_tracker_executor(config) is None
+    config["processing"] = {"tracker_workers": 2}
+    executors = []
+
+    def make_tracker_executor(config):
+        executors.append(ThreadPoolExecutor(max_workers=2))
+        return executors[-1]
+
+    monkeypatch.setattr(processing, "make_tracker_executor", make_tracker_executor)
+    with pytest.raises(RuntimeError):
+        processing.process_video_headless(VALID_VIDEO, config)
+    with pytest.raises(RuntimeError):
+        processing.process_videos([VALID_VIDEO], config, headless=True)
+    assert len(executors) == 2 and all(executor._shutdown for executor in executors)
@@ -0,0 +1,144 @@
+import pathlib
+
+import numpy as np
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from benchmarks.scene import SyntheticScene
+from object_tracking_cli.cli import load_config
+from object_tracking_cli.object_detection.cache import DetectionRecorder
+from object_tracking_cli.processing import detection_cache_path
+from object_tracking_cli.sweep import expand_grid, main, sweep
+from object_tracking_cli.track_export import read_mot
+
+TEST_VIDEO = pathlib.Path(__file__).parent / "test_video.mp4"
+
+BASE = {
+    "max_missing_frames": 5,
+    "cost_matrix_func": {"iou_cost_matrix": None},
+    "assignment_func": {"hungarian_assignment": {"th": 0.9}},
+    "motion_model_cls": {"MotionAgnosticModel": None},
+}
+
+
+class SceneDetector:
+    """Returns the detections of a synthetic scene, frame after frame."""
+
+    class_id_to_name = {0: "a", 1: "b", 2: "c"}
+    batch_size = 1
+
+    def __init__(self, scene_frames):
+        self._detections = (detections for detections, _ in scene_frames)
+
+    @property
+    def available_classes(self):
+        return self.class_id_to_name.values()
+
+    def predict(self, frame):
+        return next(self._detections)
+
+
+@pytest.fixture
+def scene_cache(tmp_path):
+    """Detections of a synthetic scene and their MOTChallenge ground truth."""
+    scene_frames = list(SyntheticScene(20).frames(40))
+    recorder = DetectionRecorder(SceneDetector(scene_frames), tmp_path / "detections")
+    rows = []
+    for frame_idx, (detections, ids) in enumerate(scene_frames):
+        recorder.predict(None)
+        for (x1, y1, x2, y2, _, _), id_ in zip(detections, ids):
+            rows.append((frame_idx + 1, id_ + 1, x1, y1, x2 - x1, y2 - y1, 1, -1, -1))
+    recorder.finish()
+    np.savetxt(tmp_path / "gt.txt", rows, delimiter=",", fmt="%g")
+    return tmp_path / "detections", tmp_path / "gt.txt"
+
+
+def test_grid_expands_dotted_keys_into_tracker_configs():
+    expanded = expand_grid(
+        BASE,
+        {
+            "max_missing_frames": [1, 10],
+            "assignment_func.hungarian_assignment.th": [0.5, 0.7, 0.9],
+            "gating.max_distance": [100],
+        },
+    )
+    assert len(expanded) == 6
+    params, config = expanded[1]
+    assert params == {
+        "max_missing_frames": 1,
+        "assignment_func.hungarian_assignment.th": 0.7,
+        "gating.max_distance": 100,
+    }
+    assert config["assignment_func"] == {"hungarian_assignment": {"th": 0.7}}
+    assert config["gating"] == {"max_distance": 100}
+    assert BASE["assignment_func"]["hungarian_assignment"]["th"] == 0.9
+
+
+def test_read_mot_groups_boxes_by_frame(tmp_path):
+    path = tmp_path / "gt.txt"
+    path.write_text(
+        "2,3,10,20,5,5,1,-1,-1\n1,1,0,0,10,10,1,-1,-1\n2,1,1,1,1,1,0,-1,-1\n"
+    )
+    ground_truth = read_mot(path)
+    assert sorted(ground_truth) == [0, 1]
+    ids, boxes = ground_truth[1]
+    np.testing.assert_array_equal(ids, [2])
+    np.testing.assert_array_equal(boxes, [[10, 20, 15, 25]])
+
+
+def test_sweep_on_workers_matches_in_process_results(scene_cache):
+    detections_path, gt_path = scene_cache
+    configs = [
+        config
+        for _, config in expand_grid(
+            BASE,
+            {
+                "motion_model_cls": [
+                    {"MotionAgnosticModel": None},
+                    {"BatchedKFCentroidVelocityModel": None},
+                ],
+                "max_missing_frames": [0, 5],
+            },
+        )
+    ]
+    results = sweep(detections_path, configs, gt_path, workers=1)
+    parallel_results = sweep(detections_path, configs, gt_path, workers=2)
+    timings = ("fps", "ms_per_frame")
+    for result, parallel_result in zip(results, parallel_results):
+        assert {k: v for k, v in result.items() if k not in timings} == {
+            k: v for k, v in parallel_result.items() if k not in timings
+        }
+        assert result["fps"] > 0 and result["mota"] > 0.5
+    # forgetting tracks right away fragments them
+    assert results[0]["tracks"] > results[1]["tracks"]
+
+
+def test_sweep_command_prints_and_writes_the_table(tmp_path):
+    config = load_config()
+    detections_path = detection_cache_path(str(TEST_VIDEO), config, tmp_path)
+    scene_frames = list(SyntheticScene(10).frames(20))
+    recorder = DetectionRecorder(SceneDetector(scene_frames), detections_path)
+    for _ in scene_frames:
+        recorder.predict(None)
+    recorder.finish()
+    grid_file = tmp_path / "grid.yaml"
+    grid_file.write_text(yaml.safe_dump({"grid": {"max_missing_frames": [0, 10]}}))
+    output = tmp_path / "results.csv"
+    result = CliRunner().invoke(
+        main,
+        [
+            str(TEST_VIDEO),
+            "--detection-cache",
+            str(tmp_path),
+            "--grid",
+            str(grid_file),
+            "--workers",
+            "1",
+            "--output",
+            str(output),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.split()[:3] == ["max_missing_frames", "fps", "ms_per_frame"]
+    assert len(output.read_text().splitlines()) == 3
@@ -0,0 +1,115 @@
+import json
+import pathlib
+from functools import partial
+
+import numpy as np
+import pytest
+
+from object_tracking_cli import processing
+from object_tracking_cli.cli import load_config
+from object_tracking_cli.object_detection.detection import AVAILABLE_DETECTORS
+from object_tracking_cli.object_tracking.assignment import hungarian_assignment
+from object_tracking_cli.object_tracking.cost_matrix import iou_cost_matrix
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+from object_tracking_cli.track_export import (
+    AVAILABLE_TRACK_EXPORTERS,
+    ColumnarExporter,
+    JSONLExporter,
+    MOTChallengeExporter,
+    load_columns,
+)
+from tests.setup import DURATION, FPS, VALID_VIDEO, FakeDetector, make_test_video
+
+NO_FRAMES = 7
+
+
+def _track(exporter):
+    tracker = MultiObjectTracker(
+        assignment_func=partial(hungarian_assignment, th=0.9),
+        cost_matrix_func=iou_cost_matrix,
+    )
+    for t in range(NO_FRAMES):
+        tracker.update(
+            [(10 + t, 10, 40 + t, 40, 2, 0.9), (80, 60 + t, 100, 90 + t, None, None)]
+        )
+        exporter.write(t, tracker)
+    return tracker
+
+
+def _path(tmp_path, exporter_cls):
+    return tmp_path / f"tracks{exporter_cls.extension}"
+
+
+def test_mot_records_are_one_based(tmp_path):
+    path = _path(tmp_path, MOTChallengeExporter)
+    with MOTChallengeExporter(path, buffer_size=3) as exporter:
+        _track(exporter)
+    rows = np.loadtxt(path, delimiter=",", ndmin=2)
+    assert rows.shape == (2 * NO_FRAMES, 10)
+    assert rows[0, 0] == 1 and rows[-1, 0] == NO_FRAMES
+    assert set(rows[:, 1]) == {1, 2}
+    first = rows[rows[:, 1] == 1][0]
+    np.testing.assert_allclose(first[2:7], [10, 10, 30, 30, 0.9])
+    assert (rows[rows[:, 1] == 2][:, 6] == -1).all()
+    assert (rows[:, 7:] == -1).all()
+
+
+def test_jsonl_writes_null_class_and_score(tmp_path):
+    path = _path(tmp_path, JSONLExporter)
+    with JSONLExporter(path, buffer_size=3) as exporter:
+        _track(exporter)
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 2 * NO_FRAMES
+    assert records[0] == {
+        "frame": 0,
+        "id": 0,
+        "bbox": [10.0, 10.0, 40.0, 40.0],
+        "class": 2,
+        "score": 0.9,
+    }
+    assert records[1]["class"] is None and records[1]["score"] is None
+
+
+@pytest.mark.parametrize("buffer_size", [1, 3, 4096])
+def test_columnar_round_trip(tmp_path, buffer_size):
+    path = tmp_path / "tracks"
+    with ColumnarExporter(path, buffer_size=buffer_size) as exporter:
+        tracker = _track(exporter)
+    assert exporter.no_records == 2 * NO_FRAMES
+    columns = load_columns(path)
+    np.testing.assert_array_equal(columns["frames"], np.repeat(range(NO_FRAMES), 2))
+    np.testing.assert_array_equal(columns["ids"], [0, 1] * NO_FRAMES)
+    ids, boxes, classes, scores = tracker.tracks()
+    np.testing.assert_allclose(columns["boxes"][-2:], boxes)
+    np.testing.assert_array_equal(columns["classes"][-2:], classes)
+    np.testing.assert_allclose(columns["scores"][-2:], scores, rtol=1e-6)
+
+
+@pytest.mark.parametrize("name", sorted(AVAILABLE_TRACK_EXPORTERS))
+def test_export_without_tracks(tmp_path, name):
+    exporter_cls = AVAILABLE_TRACK_EXPORTERS[name]
+    path = _path(tmp_path, exporter_cls)
+    exporter = exporter_cls(path)
+    exporter.write(0, MultiObjectTracker())
+    exporter.close()
+    exporter.close()
+    assert exporter.no_records == 0
+    if name == "columnar":
+        assert load_columns(path)["boxes"].shape == (0, 4)
+    else:
+        assert path.read_text() == ""
+
+
+def test_headless_exports_every_tracker(monkeypatch, tmp_path):
+    if not pathlib.Path(VALID_VIDEO).exists():
+        make_test_video()
+    FakeDetector.instances = []
+    monkeypatch.setitem(AVAILABLE_DETECTORS, "ultralytics", FakeDetector)
+    config = load_config()
+    config["track_export"] = {"format": "jsonl", "dir": str(tmp_path)}
+    processing.process_video_headless(VALID_VIDEO, config)
+    paths = sorted(tmp_path.glob("*.jsonl"))
+    assert len(paths) == len(config["trackers"])
+    for path in paths:
+        frames = [json.loads(line)["frame"] for line in path.read_text().splitlines()]
+        assert frames == list(range(DURATION * FPS))
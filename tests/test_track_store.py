@@ -0,0 +1,47 @@
+from functools import partial
+
+import numpy as np
+
+from object_tracking_cli.object_tracking.assignment import hungarian_assignment
+from object_tracking_cli.object_tracking.cost_matrix import iou_cost_matrix
+from object_tracking_cli.object_tracking.mot import MultiObjectTracker
+from object_tracking_cli.object_tracking.motion_model import (
+    MotionAgnosticModel,
+    MotionModel,
+)
+from object_tracking_cli.object_tracking.track_store import NO_CLASS, TrackStore
+from object_tracking_cli.object_tracking.utils.bbox import calc_centroids
+
+
+def test_append_grows_capacity():
+    store = TrackStore(capacity=2)
+    bboxes = [(i, i, i + 2, i + 2, 1, 0.5) for i in range(5)]
+    store.extend(range(5), bboxes)
+    assert len(store) == 5
+    assert store.capacity >= 5
+    assert store.ids.tolist() == list(range(5))
+    assert np.array_equal(store.centroids(), calc_centroids(bboxes))
+
+
+def test_keep_preserves_order():
+    store = TrackStore()
+    store.extend(range(4), [(0, 0, 2, 2, None, None)] * 4)
+    removed_ids = store.keep(np.array([True, False, True, False]))
+    assert removed_ids.tolist() == [1, 3]
+    assert store.ids.tolist() == [0, 2]
+    assert store.classes.tolist() == [NO_CLASS, NO_CLASS]
+    assert np.isnan(store.scores).all()
+
+
+def test_motion_agnostic_tracks_live_in_the_store():
+    tracker = MultiObjectTracker(
+        assignment_func=partial(hungarian_assignment, th=0.9),
+        cost_matrix_func=iou_cost_matrix,
+        motion_model_cls=MotionAgnosticModel,
+    )
+    tracker.update([(0, 0, 10, 10, 0, 0.9), (50, 50, 60, 60, 1, 0.8)])
+    tracker.update([(1, 0, 11, 10, 0, 0.7)])
+    assert not any(isinstance(obj, MotionModel) for obj in tracker.objects.values())
+    assert tracker.objects[0].bbox == (1.0, 0.0, 11.0, 10.0, 0, 0.7)
+    _, boxes, _, _ = tracker.tracks()
+    np.testing.assert_array_equal(boxes, [[1, 0, 11, 10], [50, 50, 60, 60]])
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from object_tracking_cli import video_output
+from object_tracking_cli.video_output import VideoSink
+
+
+def _frames(n, height=48, width=64):
+    for idx in range(n):
+        yield np.full((height, width, 3), 10 * idx % 256, dtype=np.uint8)
+
+
+def test_all_frames_are_encoded(tmp_path):
+    path = tmp_path / "output.mp4"
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    with VideoSink(path, fps=10, queue_size=4) as sink:
+        for frame in _frames(20):
+            assert sink.write(frame)
+            frame[:] = 255  # the sink encodes a copy
+    summary = sink.summary()
+    assert summary["frames"] == 20 and summary["dropped"] == 0
+    assert summary["encode_fps"] > 0
+    capture = cv2.VideoCapture(str(path))
+    assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == 20
+    capture.release()
+
+
+class SlowWriter:
+    release_frames = None
+
+    def __init__(self, *_):
+        self.frames = []
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        SlowWriter.release_frames.wait()
+        self.frames.append(frame.copy())
+
+    def release(self):
+        pass
+
+
+@pytest.mark.parametrize("policy", ["drop", "block"])
+def test_full_queue_policy(monkeypatch, tmp_path, policy):
+    SlowWriter.release_frames = threading.Event()
+    monkeypatch.setattr(video_output.cv2, "VideoWriter", SlowWriter)
+    sink = VideoSink(tmp_path / "output.mp4", fps=10, queue_size=2, policy=policy)
+    # one buffer held by the encoder, one queued
+    for frame in _frames(2):
+        assert sink.write(frame)
+    time.sleep(0.05)
+    if policy == "drop":
+        assert not sink.write(next(_frames(1)))
+        SlowWriter.release_frames.set()
+    else:
+        threading.Timer(0.1, SlowWriter.release_frames.set).start()
+        start_time = time.perf_counter()
+        assert sink.write(next(_frames(1)))
+        assert time.perf_counter() - start_time > 0.05
+    summary = sink.close()
+    assert summary["frames"] == (2 if policy == "drop" else 3)
+    assert summary["dropped"] == (1 if policy == "drop" else 0)
+
+
+def test_encoding_errors_are_raised(monkeypatch, tmp_path):
+    class ClosedWriter(SlowWriter):
+        def isOpened(self):
+            return False
+
+    monkeypatch.setattr(video_output.cv2, "VideoWriter", ClosedWriter)
+    sink = VideoSink(tmp_path / "output.mp4", fps=10)
+    sink.write(next(_frames(1)))
+    with pytest.raises(RuntimeError):
+        sink.close()
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        VideoSink("output.mp4", fps=10, policy="wait")
+    with pytest.raises(ValueError):
+        VideoSink("output.mp4", fps=10, codec="h264x")
@@ -1,9 +1,15 @@
 import pathlib
 import time
 
+import cv2
+import numpy as np
 import pytest
 
-from object_tracking_cli.video_streaming import UnsupportedVideoFormat, VideoStream
+from object_tracking_cli.video_streaming import (
+    RealtimeClock,
+    UnsupportedVideoFormat,
+    VideoStream,
+)
 from tests.setup import DURATION, FPS, VALID_VIDEO, make_test_video
 
 
@@ -61,3 +67,34 @@ def test_interruption(video_stream):
     video_stream.stop()
     assert video_stream.stopped
     assert video_stream.thread.is_alive() == False
+
+
+def test_frames_match_video_capture(video_stream):
+    cap = cv2.VideoCapture(VALID_VIDEO)
+    video_stream.start()
+    slots = set()
+    while True:
+        frame = video_stream.get_last_frame()
+        is_grabbed, expected = cap.read()
+        if frame is None:
+            assert not is_grabbed
+            break
+        assert np.array_equal(frame, expected)
+        slots.add(frame.ctypes.data)
+    cap.release()
+    assert len(slots) <= video_stream.buffer_size + 1
+
+
+def test_realtime_drops_stale_frames(video_stream):
+    video_stream.start()
+    clock = RealtimeClock()
+    start_time = time.perf_counter()
+    while clock.next_frame(video_stream) is not None:
+        time.sleep(0.1)  # slower than the 30 FPS source
+        clock.frame_done()
+    elapsed = time.perf_counter() - start_time
+    summary = clock.summary()
+    assert summary["frames"] + summary["dropped"] == DURATION * FPS
+    assert summary["dropped"] > 0
+    assert summary["latency_p99_ms"] < 200
+    assert elapsed < DURATION + 0.5